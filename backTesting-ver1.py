@@ -1,10 +1,20 @@
-import pyupbit
 import numpy as np
+import pandas as pd
 import time
 
+from candle_store import CandleStore
+from indicator_cache import shared_cache
+from indicators import sma_values, rsi_values
+from ledger import index_ns
+
 class CustomBackTest:
-    def __init__(self, df, start_cash=1_000_000, risk_ratio=0.5, rsi_limit=45, take_profit_ratio=1.10, stop_loss_ratio=0.95, fee=0.0005):
+    def __init__(self, df, start_cash=1_000_000, risk_ratio=0.5, rsi_limit=45, take_profit_ratio=1.10, stop_loss_ratio=0.95, fee=0.0005,
+                 minute_df=None, bar_minutes=240, cache=shared_cache, ledger=None):
         self.df = df.copy()
+        self.cache = cache                    # 같은 봉의 MA20 / RSI 를 파라미터 조합마다 다시 계산하지 않음 (None 이면 매번 계산)
+        self.minute_df = minute_df            # 봉 안에서 익절/손절 중 먼저 닿은 쪽을 판단할 1분봉 (exit_mode="intrabar")
+        self.bar_minutes = bar_minutes
+        self.exit_info = None
         self.start_cash = start_cash
         self.current_cash = start_cash
         self.highest_cash = start_cash
@@ -22,24 +32,47 @@ class CustomBackTest:
         self.stop_loss_ratio = stop_loss_ratio        # 손절 목표 배수 (예: 0.95 = 5% 손실)
 
         self.total_fee_paid = 0               # 누적 수수료 총액
+        self.ledger = ledger                  # TradeLedger 를 주면 거래별로 기록 (매수 봉 시가 진입 → 같은 봉 안에서 청산)
 
     def calculate_indicators(self):
         df = self.df
-        df['ma20'] = df['close'].rolling(window=20).mean()
-
-        delta = df['close'].diff()
-        gain = delta.clip(lower=0)
-        loss = -delta.clip(upper=0)
-        avg_gain = gain.rolling(window=14).mean()
-        avg_loss = loss.rolling(window=14).mean()
-        rs = avg_gain / avg_loss
-        df['rsi'] = 100 - (100 / (1 + rs))
+        if self.cache is not None:
+            df['ma20'] = self.cache.get(df, "sma", interval=self.bar_minutes, window=20)
+            df['rsi'] = self.cache.get(df, "rsi", interval=self.bar_minutes, period=14)
+        else:
+            df['ma20'] = sma_values(df['close'], window=20)
+            df['rsi'] = rsi_values(df['close'], period=14)
 
         self.df = df
 
-    def execute(self, name="코인"):
+    def exit_prices(self, exit_mode="optimistic"):
+        """봉별 청산가 배열 (optimistic 이면 None: 익절가와 손절가가 한 봉 안에 모두 있으면 익절로 봄)"""
+        if exit_mode == "optimistic":
+            return None
+        if exit_mode != "intrabar":
+            raise ValueError(f"지원하지 않는 청산 판단 방식: {exit_mode}")
+        if self.minute_df is None:
+            raise ValueError("intrabar 방식에는 minute_df (1분봉) 가 필요합니다")
+
+        df = self.df
+        if 'rsi' not in df:
+            self.calculate_indicators()
+            df = self.df
+        starts, ends = sub_bar_index(pd.DatetimeIndex(df.index).as_unit('ns').asi8,
+                                     pd.DatetimeIndex(self.minute_df.index).as_unit('ns').asi8,
+                                     self.bar_minutes)
+        exit_price, self.exit_info = resolve_intrabar_exits(
+            *(df[col].to_numpy(dtype=np.float64) for col in ('open', 'high', 'low', 'close')),
+            self.take_profit_ratio, self.stop_loss_ratio, starts, ends,
+            self.minute_df['high'].to_numpy(dtype=np.float64), self.minute_df['low'].to_numpy(dtype=np.float64),
+            buy=((df['close'] > df['ma20']) & (df['rsi'] < self.rsi_limit)).to_numpy()
+        )
+        return exit_price
+
+    def execute(self, name="코인", verbose=True, exit_mode="optimistic"):
         self.calculate_indicators()
         df = self.df
+        exits = self.exit_prices(exit_mode)
 
         for i in range(20, len(df)):
             row = df.iloc[i]
@@ -62,7 +95,9 @@ class CustomBackTest:
                 take_profit = entry * self.take_profit_ratio
                 stop_loss = entry * self.stop_loss_ratio
 
-                if high >= take_profit:
+                if exits is not None:
+                    exit_price = exits[i]
+                elif high >= take_profit:
                     exit_price = take_profit
                 elif low <= stop_loss:
                     exit_price = stop_loss
@@ -77,6 +112,11 @@ class CustomBackTest:
 
                 ror = exit_price / entry
                 self.win_count += 1 if ror > 1 else 0
+
+                if self.ledger is not None:
+                    entry_time = pd.Timestamp(df.index[i])
+                    self.ledger.record(name, entry_time, entry_time + pd.Timedelta(minutes=self.bar_minutes), entry,
+                                       exit_price, trade_amount, trade_amount * ror, buy_fee + sell_fee)
             else:
                 ror = 1
 
@@ -90,7 +130,51 @@ class CustomBackTest:
             dd = (self.highest_cash - self.current_cash) / self.highest_cash * 100
             self.mdd = max(self.mdd, dd)
 
-        self.result(name)
+        if verbose:
+            self.result(name)
+
+    def indicator_arrays(self):
+        """벡터화 계산에 쓰이는 (open, high, low, close, ma20, rsi) 배열 (20번째 봉부터)"""
+        if 'rsi' not in self.df:
+            self.calculate_indicators()
+        df = self.df
+        return tuple(df[col].to_numpy(dtype=np.float64)[20:] for col in ('open', 'high', 'low', 'close', 'ma20', 'rsi'))
+
+    def execute_vectorized(self, name="코인", verbose=True, exit_mode="optimistic"):
+        """execute()와 같은 결과를 행 단위 반복 없이 NumPy 배열 연산으로 계산"""
+        self.calculate_indicators()
+        exits = self.exit_prices(exit_mode)
+        stats = simulate_vectorized(
+            *self.indicator_arrays(),
+            exit_price=None if exits is None else exits[20:],
+            start_cash=self.start_cash,
+            risk_ratio=self.risk_ratio,
+            rsi_limit=self.rsi_limit,
+            take_profit_ratio=self.take_profit_ratio,
+            stop_loss_ratio=self.stop_loss_ratio,
+            fee=self.fee
+        )
+
+        self.equity = stats.pop('equity')
+        self.trade_ror = stats.pop('trade_ror')
+        trade_index = stats.pop('trade_index')
+        if self.ledger is not None:
+            self.record_trades(name, trade_index)
+        for key, value in stats.items():
+            setattr(self, key, value)
+
+        if verbose:
+            self.result(name)
+
+    def record_trades(self, name, index):
+        """벡터화 결과 (매수한 봉 번호) 로 거래 기록을 한 번에 추가, execute() 의 기록과 같은 값"""
+        open_ = self.df['open'].to_numpy(dtype=np.float64)[20:][index]
+        cash_before = np.concatenate(([self.start_cash], self.equity[:-1]))[index]
+        trade_amount = cash_before * self.risk_ratio
+        entry_time = index_ns(self.df.index[20:][index])
+        self.ledger.extend(name, entry_time, entry_time + self.bar_minutes * 60 * 10**9, open_, open_ * self.trade_ror,
+                           trade_amount, trade_amount * self.trade_ror,
+                           trade_amount * self.fee + trade_amount * self.trade_ror * self.fee)
 
     def result(self, name="코인"):
         profit_amount = self.current_cash - self.start_cash
@@ -113,59 +197,169 @@ class CustomBackTest:
         print("=" * 60)
 
 
-# 총 투자금 1,000,000 원을 각 코인별 비중에 맞게 분배
-total_investment = 1_000_000
-allocation = {
-    "KRW-BTC": 0.0,  # 40%
-    "KRW-BLAST": 0.5,  # 40%
-    "KRW-ARK": 0.5  # 20%
-}
-
-tickers = ["KRW-BTC", "KRW-BLAST", "KRW-ARK"]
-
-for ticker in tickers:
-    print(f"=== {ticker} 데이터 로딩 중 ... ===")
-    df = pyupbit.get_ohlcv(ticker, interval="minute240", count=1080)  # 4시간봉, 3개월치
-    if df is None or df.empty:
-        print(f"[{ticker}] 데이터가 없습니다.")
-        continue
-
-    invested_cash = total_investment * allocation[ticker]
-
-    if invested_cash <= 0:
-        print(f"[{ticker}] 투자 금액이 0 이하이므로 백테스트를 건너뜁니다.")
-        continue
-
-    # 코인별 전략 파라미터 세팅
-    if ticker == "KRW-BTC":
-        backtest = CustomBackTest(
-            df,
-            start_cash=invested_cash,
-            risk_ratio=1.0,
-            rsi_limit=42,    
-            take_profit_ratio=1.15,
-            stop_loss_ratio=0.97 
-        )
+def simulate_vectorized(open_, high, low, close, ma20, rsi, start_cash=1_000_000, risk_ratio=0.5,
+                        rsi_limit=45, take_profit_ratio=1.10, stop_loss_ratio=0.95, fee=0.0005, exit_price=None):
+    """CustomBackTest.execute() 의 봉 단위 반복을 NumPy 배열 연산으로 계산
 
-    elif ticker == "KRW-BLAST":
-        backtest = CustomBackTest(
-            df,
-            start_cash=invested_cash,
-            risk_ratio=1.0,
-            rsi_limit=60,      
-            take_profit_ratio=1.15,  
-            stop_loss_ratio=0.92   
-        )
+    결과는 CustomBackTest 의 속성 이름과 같은 키를 가진 dict 로 반환 (+ 'equity' 잔액 곡선)
+    exit_price 를 주면 봉별 청산가로 사용 (resolve_intrabar_exits 결과 등)
+    """
+    # NaN 비교는 False 이므로 반복문 버전과 동일하게 매수하지 않음
+    buy = (close > ma20) & (rsi < rsi_limit)
 
-    elif ticker == "KRW-ARK":
-        backtest = CustomBackTest(
-            df,
-            start_cash=invested_cash,
-            risk_ratio=1.0,
-            rsi_limit=60,           
-            take_profit_ratio=1.15,
-            stop_loss_ratio=0.92       
-        )
+    if exit_price is None:
+        take_profit = open_ * take_profit_ratio
+        stop_loss = open_ * stop_loss_ratio
+        exit_price = np.where(high >= take_profit, take_profit,
+                              np.where(low <= stop_loss, stop_loss, close))
+
+    stats = {
+        'trade_count': 0,
+        'win_count': 0,
+        'total_fee_paid': 0.0,
+        'current_cash': start_cash,
+        'highest_cash': start_cash,
+        'lowest_cash': start_cash,
+        'mdd': 0,
+        'accumulated_ror': 1,
+    }
+
+    # 반복문 버전처럼 float 오버플로우(inf)는 경고 없이 그대로 둠
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        ror = np.where(buy, exit_price / open_, 1.0)
+
+        # 봉마다 잔액이 (1 + 투자비율 * (수익률 - 1)) 배로 변함
+        growth = 1 + risk_ratio * (ror - 1)
+        equity = start_cash * np.cumprod(growth)
+        cash_before = np.concatenate(([start_cash], equity[:-1]))
+
+        # 매수 수수료 + 매도 수수료 (거래금액 대비)
+        trade_amount = cash_before * risk_ratio
+        fees = np.where(buy, trade_amount * fee * (1 + ror), 0.0)
+
+        stats['trade_count'] = int(buy.sum())
+        stats['win_count'] = int((buy & (ror > 1)).sum())
+        stats['total_fee_paid'] = float(fees.sum())
+
+        if len(equity):
+            running_max = np.maximum.accumulate(np.maximum(equity, start_cash))
+            stats['current_cash'] = float(equity[-1])
+            stats['highest_cash'] = float(running_max[-1])
+            stats['lowest_cash'] = float(min(start_cash, equity.min()))
+            stats['mdd'] = float(np.nanmax((running_max - equity) / running_max * 100))
+            stats['accumulated_ror'] = stats['current_cash'] / start_cash
+
+    stats['equity'] = equity
+    stats['trade_ror'] = ror[buy]  # 거래별 수익률 (몬테카를로 재표본 추출용)
+    stats['trade_index'] = np.flatnonzero(buy)  # 매수한 봉 번호 (거래 장부 기록용)
+    return stats
+
+
+def sub_bar_index(bar_times, minute_times, bar_minutes=240):
+    """봉마다 그 봉에 속한 1분봉 구간 [starts, ends) (시각은 ns 정수, 둘 다 정렬되어 있어야 함)"""
+    bar_times = np.asarray(bar_times, dtype=np.int64)
+    starts = np.searchsorted(minute_times, bar_times, side='left')
+    ends = np.searchsorted(minute_times, bar_times + bar_minutes * 60 * 10**9, side='left')
+    return starts, ends
+
+
+def resolve_intrabar_exits(open_, high, low, close, take_profit_ratio, stop_loss_ratio,
+                           starts, ends, minute_high, minute_low, buy=None):
+    """익절가와 손절가가 모두 한 봉 안에 있는 봉은 1분봉을 보고 먼저 닿은 쪽으로 청산가를 정함
+
+    - 같은 1분봉에서 둘 다 닿았으면 손절로 봄 (보수적으로)
+    - 1분봉이 없거나 1분봉으로는 어느 쪽에도 닿지 않으면 기존처럼 익절로 두고 unresolved 로 셈
+    반환: (봉별 청산가, {'ambiguous', 'stop_first', 'unresolved'} 개수)
+    """
+    take_profit = open_ * take_profit_ratio
+    stop_loss = open_ * stop_loss_ratio
+    hit_tp = high >= take_profit
+    exit_price = np.where(hit_tp, take_profit, np.where(low <= stop_loss, stop_loss, close))
+
+    ambiguous = hit_tp & (low <= stop_loss)
+    if buy is not None:
+        ambiguous &= buy
+    bars = np.flatnonzero(ambiguous)
+    lengths = ends[bars] - starts[bars]
+    info = {'ambiguous': len(bars), 'stop_first': 0, 'unresolved': int((lengths <= 0).sum())}
+    bars, lengths = bars[lengths > 0], lengths[lengths > 0]
+    if not len(bars):
+        return exit_price, info
+
+    # 해당 봉들의 1분봉을 이어붙여 한 번에 비교하고, 봉별로 처음 닿은 위치를 reduceat 으로 구함
+    offsets = np.cumsum(lengths) - lengths
+    pos = np.arange(lengths.sum()) - np.repeat(offsets, lengths)
+    flat = np.repeat(starts[bars], lengths) + pos
+    never = np.iinfo(np.int64).max
+    first_tp = np.minimum.reduceat(np.where(minute_high[flat] >= np.repeat(take_profit[bars], lengths), pos, never), offsets)
+    first_sl = np.minimum.reduceat(np.where(minute_low[flat] <= np.repeat(stop_loss[bars], lengths), pos, never), offsets)
+
+    stop_first = (first_sl <= first_tp) & (first_sl != never)
+    exit_price[bars[stop_first]] = stop_loss[bars[stop_first]]
+    info['stop_first'] = int(stop_first.sum())
+    info['unresolved'] += int(((first_tp == never) & (first_sl == never)).sum())
+    return exit_price, info
+
+
+def main():
+    candles = CandleStore()
+
+    # 총 투자금 1,000,000 원을 각 코인별 비중에 맞게 분배
+    total_investment = 1_000_000
+    allocation = {
+        "KRW-BTC": 0.0,  # 40%
+        "KRW-BLAST": 0.5,  # 40%
+        "KRW-ARK": 0.5  # 20%
+    }
+
+    tickers = ["KRW-BTC", "KRW-BLAST", "KRW-ARK"]
+
+    for ticker in tickers:
+        print(f"=== {ticker} 데이터 로딩 중 ... ===")
+        df = candles.get_ohlcv(ticker, interval="minute240", count=1080)  # 4시간봉, 3개월치
+        if df is None or df.empty:
+            print(f"[{ticker}] 데이터가 없습니다.")
+            continue
+
+        invested_cash = total_investment * allocation[ticker]
+
+        if invested_cash <= 0:
+            print(f"[{ticker}] 투자 금액이 0 이하이므로 백테스트를 건너뜁니다.")
+            continue
+
+        # 코인별 전략 파라미터 세팅
+        if ticker == "KRW-BTC":
+            backtest = CustomBackTest(
+                df,
+                start_cash=invested_cash,
+                risk_ratio=1.0,
+                rsi_limit=42,    
+                take_profit_ratio=1.15,
+                stop_loss_ratio=0.97 
+            )
+
+        elif ticker == "KRW-BLAST":
+            backtest = CustomBackTest(
+                df,
+                start_cash=invested_cash,
+                risk_ratio=1.0,
+                rsi_limit=60,      
+                take_profit_ratio=1.15,  
+                stop_loss_ratio=0.92   
+            )
+
+        elif ticker == "KRW-ARK":
+            backtest = CustomBackTest(
+                df,
+                start_cash=invested_cash,
+                risk_ratio=1.0,
+                rsi_limit=60,           
+                take_profit_ratio=1.15,
+                stop_loss_ratio=0.92       
+            )
+
+        backtest.execute(name=ticker)
+        time.sleep(1)
 
-    backtest.execute(name=ticker)
-    time.sleep(1)
+if __name__ == "__main__":
+    main()
@@ -1,33 +1,24 @@
 import pyupbit
-import pandas as pd
 import numpy as np
-import time
 
-def get_rsi(df, period=14):
-    delta = df['close'].diff()
-    gain = np.where(delta > 0, delta, 0)
-    loss = np.where(delta < 0, -delta, 0)
-    avg_gain = pd.Series(gain).rolling(window=period).mean()
-    avg_loss = pd.Series(loss).rolling(window=period).mean()
-    rs = avg_gain / avg_loss
-    rsi = 100 - (100 / (1 + rs))
-    return rsi
+from candle_store import CandleStore
+from scanner import Scanner
+from screener import align, indicators
+
+candles = CandleStore()
+scanner = Scanner(rate=10)  # 업비트 시세 조회 초당 10회 제한
 
 def get_top_volume_tickers(ratio=0.1):
     # 모든 KRW 마켓 시세 받아오기 (업비트 ticker API)
     tickers = pyupbit.get_tickers(fiat="KRW")
     volumes = []
 
-    for ticker in tickers:
-        try:
-            df = pyupbit.get_ohlcv(ticker, interval="day", count=1)
-            if df is None or len(df) == 0:
-                continue
-            volume = df['volume'].iloc[-1]
-            volumes.append((ticker, volume))
-            time.sleep(0.05)  # API 부하 방지
-        except Exception:
+    # 초당 요청 한도 안에서 동시에 조회
+    for ticker, df in scanner.scan(tickers, lambda t: candles.get_ohlcv(t, interval="day", count=1)):
+        if len(df) == 0:
             continue
+        volume = df['volume'].iloc[-1]
+        volumes.append((ticker, volume))
 
     # 거래량 기준 내림차순 정렬
     volumes.sort(key=lambda x: x[1], reverse=True)
@@ -42,29 +33,20 @@ def main():
     top_tickers = get_top_volume_tickers(ratio=0.1)  # 상위 10%
     print(f"🔍 거래량 상위 10% 코인 {len(top_tickers)}개 필터링 중...\n")
 
-    for ticker in top_tickers:
-        try:
-            df = pyupbit.get_ohlcv(ticker, interval="minute60", count=50)
-            if df is None or len(df) < 20:
-                continue
-
-            df['ma20'] = df['close'].rolling(window=20).mean()
-            df['rsi'] = get_rsi(df)
-
-            current_price = df['close'].iloc[-1]
-            ma20 = df['ma20'].iloc[-1]
-            rsi = df['rsi'].iloc[-1]
+    # 모든 티커의 60분봉을 티커 x 봉 배열 하나로 모아서 MA20 / RSI 를 한 번에 계산
+    frames = dict(scanner.scan(top_tickers, lambda t: candles.get_ohlcv(t, interval="minute60", count=50)))
+    # 봉이 20개 미만인 티커 (상장 직후) 는 MA20 을 채운 값으로만 계산하게 되므로 제외
+    frames = {ticker: df for ticker, df in frames.items() if df is not None and len(df) >= 20}
+    matrix = align(frames, 50, 60)
+    ma, rsi = indicators(matrix.close)
 
-            lower_bound = ma20 * 0.95
-            upper_bound = ma20 * 1.05
+    current_price = matrix.close[:, -1]
+    ma20 = ma[:, -1]
+    with np.errstate(invalid='ignore'):
+        near = (ma20 * 0.95 <= current_price) & (current_price <= ma20 * 1.05)
 
-            if lower_bound <= current_price <= upper_bound:
-                print(f"📈 {ticker} | 현재가: {current_price:.2f} | MA20: {ma20:.2f} (±5%) | RSI: {rsi:.2f}")
-
-            time.sleep(0.1)
-
-        except Exception:
-            continue
+    for i in np.flatnonzero(near):
+        print(f"📈 {matrix.tickers[i]} | 현재가: {current_price[i]:.2f} | MA20: {ma20[i]:.2f} (±5%) | RSI: {rsi[i, -1]:.2f}")
 
 if __name__ == "__main__":
     main()
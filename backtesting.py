@@ -0,0 +1,22 @@
+import importlib.util
+import os
+import sys
+
+# 파일명에 하이픈이 들어간 백테스트 스크립트를 다른 모듈에서 import 할 수 있도록 불러옴
+base_dir = os.path.dirname(os.path.abspath(__file__))
+
+def load_script(file_name, module_name):
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+    spec = importlib.util.spec_from_file_location(module_name, os.path.join(base_dir, file_name))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+ver1 = load_script("backTesting-ver1.py", "backtesting_ver1")
+
+CustomBackTest = ver1.CustomBackTest
+simulate_vectorized = ver1.simulate_vectorized
+sub_bar_index = ver1.sub_bar_index
+resolve_intrabar_exits = ver1.resolve_intrabar_exits
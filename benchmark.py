@@ -0,0 +1,1261 @@
+import argparse
+import asyncio
+import contextlib
+import datetime
+import functools
+import json
+import multiprocessing as mp
+import os
+import platform
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+import requests
+import websockets
+
+from backtesting import CustomBackTest
+from candle_store import CandleStore, kst_now
+from indicators import SMA, RSI, get_rsi, sma_values, rsi_values
+from indicator_cache import IndicatorCache
+from scanner import Scanner
+from exit_engine import ExitEngine
+from notifier import Notifier
+from journal import PositionJournal
+from positions import PositionBook
+from portfolio import KrwBudget
+from sim_exchange import SimExchange
+from intrabar_report import compare, report
+from metrics import Registry, LatencyHistogram
+from http_client import HttpClient
+from scheduler import Scheduler, SimClock
+from screener import align, indicators, screen
+from paper_exchange import ReplayClock, PaperExchange, PaperFeed, NullWebClient
+from ledger import TradeLedger, day_ns, summary, pnl_by_ticker, pnl_by_day, drawdown, exposure
+
+def make_ohlcv(count, seed=0, start_price=10_000, freq="240min", volatility=0.02):
+    """시드 고정된 가상 OHLCV 데이터 생성 (랜덤 워크, volatility = 봉당 수익률 표준편차)"""
+    rng = np.random.default_rng(seed)
+    close = start_price * np.exp(np.cumsum(rng.normal(0, volatility, count)))
+    open_ = np.concatenate(([start_price], close[:-1]))
+    spread = np.abs(rng.normal(0, volatility * 0.75, count))
+    high = np.maximum(open_, close) * (1 + spread)
+    low = np.minimum(open_, close) * (1 - spread)
+    volume = rng.uniform(100, 10_000, count)
+    index = pd.date_range("2025-01-01", periods=count, freq=freq)
+    return pd.DataFrame({"open": open_, "high": high, "low": low, "close": close, "volume": volume}, index=index)
+
+def timeit(func, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def bench_backtest(count, loop_limit=50_000, repeat=3):
+    """반복문 execute() 와 execute_vectorized() 속도 비교
+
+    반복문 버전은 너무 느리므로 loop_limit 봉까지만 측정하고 선형으로 환산함
+    """
+    df = make_ohlcv(count)
+    params = dict(risk_ratio=1.0, rsi_limit=60, take_profit_ratio=1.15, stop_loss_ratio=0.92, cache=None)
+
+    loop_count = min(count, loop_limit)
+    loop_time = timeit(lambda: CustomBackTest(df.iloc[:loop_count], **params).execute(verbose=False), repeat=1)
+    loop_time *= count / loop_count
+    vec_time = timeit(lambda: CustomBackTest(df, **params).execute_vectorized(verbose=False), repeat=repeat)
+
+    estimated = " (추정)" if loop_count < count else ""
+    print(f"[{count:,} 봉] 반복문: {loop_time:.3f}s{estimated} | 벡터화: {vec_time:.4f}s | "
+          f"속도 향상: {loop_time / vec_time:,.0f}배")
+
+    # 동일 데이터에서 결과가 같은지 확인
+    loop = CustomBackTest(df.iloc[:loop_count], ledger=TradeLedger(), **params)
+    loop.execute(verbose=False)
+    vec = CustomBackTest(df.iloc[:loop_count], ledger=TradeLedger(), **params)
+    vec.execute_vectorized(verbose=False)
+    loop_trades, vec_trades = loop.ledger.trades(), vec.ledger.trades()
+    same_trades = len(loop_trades) == len(vec_trades) and all(
+        np.allclose(loop_trades[name], vec_trades[name]) for name in ("entry_time", "exit_time", "sell_price", "profit"))
+    print(f"    누적 수익률 {loop.accumulated_ror:.6f} / {vec.accumulated_ror:.6f} | "
+          f"MDD {loop.mdd:.4f}% / {vec.mdd:.4f}% | 수수료 {loop.total_fee_paid:,.0f} / {vec.total_fee_paid:,.0f} | "
+          f"거래 기록 {len(loop_trades)}건 {'일치' if same_trades else '불일치'}")
+
+def bench_indicators(count=10_000, lookback=50):
+    """새 봉 하나당 전체 재계산 (get_rsi + rolling) 과 스트리밍 갱신 비용 비교"""
+    df = make_ohlcv(count)
+    closes = df['close'].to_numpy()
+
+    # 전체 재계산: 매수 주기마다 최근 lookback 봉으로 rolling 을 다시 계산
+    updates = 200
+    start = time.perf_counter()
+    for i in range(count - updates, count):
+        window = df.iloc[i - lookback:i]
+        window['close'].rolling(window=20).mean().iloc[-1]
+        get_rsi(window).iloc[-1]
+    full_cost = (time.perf_counter() - start) / updates
+
+    sma, rsi = SMA(20, closes[:lookback]), RSI(14, closes[:lookback])
+    start = time.perf_counter()
+    for close in closes[lookback:]:
+        sma.update(close)
+        rsi.update(close)
+    stream_cost = (time.perf_counter() - start) / (count - lookback)
+
+    print(f"[지표 갱신] 전체 재계산: {full_cost * 1e6:,.1f}µs | 스트리밍: {stream_cost * 1e6:,.2f}µs | "
+          f"속도 향상: {full_cost / stream_cost:,.0f}배")
+
+    # pandas rolling 결과와 비교
+    sma_expected = df['close'].rolling(window=20).mean().to_numpy()
+    rsi_expected = get_rsi(df).to_numpy()
+    sma, rsi = SMA(20), RSI(14)
+    sma_values = np.array([sma.update(close) for close in closes])
+    rsi_values = np.array([rsi.update(close) for close in closes])
+    print(f"    최대 오차 MA20 {np.nanmax(np.abs(sma_values - sma_expected)):.2e} | "
+          f"RSI {np.nanmax(np.abs(rsi_values - rsi_expected)):.2e}")
+
+def bench_indicator_cache(count=1080, combos=500, tickers=20, max_mb=1):
+    """파라미터 탐색 (같은 봉으로 CustomBackTest 를 combos 번) 과 새 봉 추가, 용량 제한 / 디스크 내보내기 확인"""
+    df = make_ohlcv(count)
+    params = dict(risk_ratio=1.0, take_profit_ratio=1.15, stop_loss_ratio=0.92)
+    limits = np.linspace(30, 90, combos)
+
+    def sweep(cache):
+        return [CustomBackTest(df, cache=cache, rsi_limit=limit, **params) for limit in limits]
+
+    def indicators(backtests):
+        for backtest in backtests:
+            backtest.calculate_indicators()
+
+    cache = IndicatorCache()
+    plain, cached = sweep(None), sweep(cache)
+    plain_time = timeit(lambda: indicators(plain), repeat=1)
+    cached_time = timeit(lambda: indicators(cached), repeat=1)
+    same = all(np.array_equal(a.df[col], b.df[col], equal_nan=True)
+               for a, b in zip(plain, cached) for col in ('ma20', 'rsi'))
+    print(f"[지표 캐시] 파라미터 {combos}개 x {count:,}봉: 매번 계산 {plain_time * 1000:,.1f}ms | "
+          f"캐시 {cached_time * 1000:,.1f}ms | 속도 향상 {plain_time / cached_time:,.1f}배 | 결과 동일 {same}")
+    print(f"    {cache.summary()}")
+
+    # 새 봉이 하나씩 붙는 경우: 이전 데이터의 지표를 재사용하고 뒤쪽만 계산
+    big = make_ohlcv(count * 100, seed=1)
+    windows = [big.iloc[:len(big) - 50 + i] for i in range(50)]
+    full_time = timeit(lambda: [(sma_values(w['close']), rsi_values(w['close'])) for w in windows], repeat=1)
+    cache = IndicatorCache()
+    cache.get(windows[0], "sma", ticker="KRW-T0", window=20)
+    cache.get(windows[0], "rsi", ticker="KRW-T0", period=14)
+    started = time.perf_counter()
+    extended = [(cache.get(w, "sma", ticker="KRW-T0", window=20), cache.get(w, "rsi", ticker="KRW-T0", period=14))
+                for w in windows[1:]]
+    extend_time = time.perf_counter() - started
+    error = max(np.nanmax(np.abs(sma - sma_values(w['close']))) for w, (sma, _) in zip(windows[1:], extended))
+    print(f"    새 봉 추가 ({len(big):,}봉): 전체 재계산 {full_time / 50 * 1000:.2f}ms | "
+          f"이어 계산 {extend_time / 49 * 1000:.2f}ms | MA20 최대 오차 {error:.1e}")
+
+    # 용량을 넘으면 오래 안 쓴 것부터 디스크로 내보내고, 새 캐시 (다른 프로세스) 에서도 다시 읽음
+    frames = [make_ohlcv(count * 10, seed=seed) for seed in range(tickers)]
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = IndicatorCache(max_bytes=max_mb * 2**20, spill_dir=tmp)
+        for frame in frames * 2:
+            cache.get(frame, "rsi", period=14)
+        print(f"    용량 {max_mb}MB, 티커 {tickers}개 x 2회: {cache.summary()}")
+        reopened = IndicatorCache(spill_dir=tmp)
+        for frame in frames:
+            reopened.get(frame, "rsi", period=14)
+        print(f"    새 캐시에서 다시 읽기: {reopened.summary()}")
+
+class StubHandler(BaseHTTPRequestHandler):
+    """업비트 캔들 API 를 흉내내는 로컬 서버 (응답 지연을 인위적으로 줌)"""
+    latency = 0.15
+    hits = []
+
+    def do_GET(self):
+        self.hits.append(time.monotonic())
+        time.sleep(self.latency)
+        body = json.dumps([{"opening_price": 1.0, "high_price": 1.0, "low_price": 1.0,
+                            "trade_price": 1.0, "candle_acc_trade_volume": 1.0}]).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def max_per_second(hits):
+    hits = sorted(hits)
+    return max(sum(1 for h in hits[i:] if h - start < 1.0) for i, start in enumerate(hits)) if hits else 0
+
+def bench_scanner(count=30, rate=10):
+    """기존 순차 조회 (요청 + sleep 0.05) 와 Scanner 처리량 비교"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/v1/candles/days?count=1&market="
+
+    def fetch(ticker):
+        with urllib.request.urlopen(url + ticker) as res:
+            return json.loads(res.read())
+
+    tickers = [f"KRW-T{i}" for i in range(count)]
+
+    start = time.perf_counter()
+    for ticker in tickers:
+        fetch(ticker)
+        time.sleep(0.05)
+    serial_time = time.perf_counter() - start
+
+    StubHandler.hits = []
+    start = time.perf_counter()
+    done = sum(1 for _ in Scanner(rate=rate).scan(tickers, fetch))
+    scan_time = time.perf_counter() - start
+    server.shutdown()
+
+    print(f"[시세 조회 {count}개] 순차: {serial_time:.2f}s ({count / serial_time:.1f} req/s) | "
+          f"Scanner: {scan_time:.2f}s ({done / scan_time:.1f} req/s) | "
+          f"1초 최대 요청 수: {max_per_second(StubHandler.hits)} (한도 {rate})")
+
+class LimitedStubHandler(BaseHTTPRequestHandler):
+    """keep-alive 를 지원하고 Remaining-Req 헤더를 주는 업비트 흉내 서버 (초당 limit 회 초과 시 429)"""
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    latency = 0.002
+    limit = 30
+    lock = threading.Lock()
+    window = [0.0, 0]  # [구간 시작, 구간 내 요청 수]
+    rejected = 0
+
+    def do_GET(self):
+        with self.lock:
+            now = time.monotonic()
+            if now - self.window[0] >= 1.0:
+                self.window[:] = [now, 0]
+            self.window[1] += 1
+            remaining = self.limit - self.window[1]
+            if remaining < 0:
+                LimitedStubHandler.rejected += 1
+        time.sleep(self.latency)
+        body = b'{"name":"too_many_requests"}' if remaining < 0 else b'[{"trade_price": 1.0}]'
+        self.send_response(429 if remaining < 0 else 200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Remaining-Req", f"group=market; min=1800; sec={max(remaining, 0)}")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def bench_http_client(count=300, workers=8):
+    """요청마다 새 연결 (requests.get) 과 공유 연결 풀 (HttpClient) 의 처리량 / p99 지연 비교"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), LimitedStubHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/v1/ticker?markets=KRW-BTC"
+
+    def run(get, limit):
+        time.sleep(1.0)  # 이전 측정의 서버 구간이 끝나길 기다림
+        LimitedStubHandler.limit = limit
+        LimitedStubHandler.rejected = 0
+        hist = LatencyHistogram()
+
+        def call(_):
+            started = time.perf_counter()
+            get(url)
+            hist.observe(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(call, range(count)))
+        return count / (time.perf_counter() - started), hist, LimitedStubHandler.rejected
+
+    client = HttpClient(pool_size=workers)
+    for name, get in (("요청마다 새 연결", requests.get), ("HttpClient", client.get)):
+        rate, hist, rejected = run(get, limit=10**9)
+        print(f"[HTTP {name}] {rate:,.0f} req/s | p50<={hist.percentile(50) * 1000:.2f}ms "
+              f"p99<={hist.percentile(99) * 1000:.2f}ms")
+
+    # 서버 한도 (초당 30회) 를 Remaining-Req 헤더로 지키는지 확인
+    limited = HttpClient(pool_size=workers)
+    rate, hist, rejected = run(limited.get, limit=30)
+    print(f"    한도 초당 30회: {rate:.1f} req/s | 429 응답 {rejected}회 | 재시도 {limited.retry_count}회 | "
+          f"한도 대기 {limited.limiter.waits}회")
+    server.shutdown()
+
+def bench_exit_engine(ticks=20_000, seed=0):
+    """로컬 웹소켓 서버로 기록된 체결을 재생하며 체결 수신 → 매도 주문 (모의 거래소 sell_market_order) 지연 시간 측정"""
+    rng = np.random.default_rng(seed)
+    prices = 10_000 * np.exp(np.cumsum(rng.normal(0, 0.002, ticks)))
+    messages = [json.dumps({"type": "trade", "code": "KRW-TEST", "trade_price": float(p)}).encode() for p in prices]
+
+    async def replay(ws):
+        await ws.recv()  # 구독 메시지
+        for message in messages:
+            await ws.send(message)
+        await ws.close()
+
+    async def serve(ready, stop):
+        async with websockets.serve(replay, "127.0.0.1", 0) as server:
+            ready.append(server.sockets[0].getsockname()[1])
+            while not stop:
+                await asyncio.sleep(0.05)
+
+    ready, stop = [], []
+    threading.Thread(target=lambda: asyncio.run(serve(ready, stop)), daemon=True).start()
+    while not ready:
+        time.sleep(0.01)
+
+    fired = []
+    # 네트워크 왕복을 뺀 주문 경로 (잔고 확인 / 체결 기록) 를 포함하도록 모의 거래소에 실제로 매도 주문
+    first = pd.DataFrame({"open": [prices[0]], "high": [prices[0]], "low": [prices[0]], "close": [prices[0]],
+                          "volume": [1.0]}, index=[pd.Timestamp("2025-01-01")])
+    exchange = SimExchange({"KRW-TEST": first}, start_cash=10**12)
+    exchange.set_time("2025-01-01")
+    exchange.buy_market_order("KRW-TEST", 10**9)
+
+    def on_exit(ticker, target, price, received_at):
+        exchange.sell_market_order(ticker, 1.0)
+        fired.append(price)
+        # 매도 후 바로 다시 매수했다고 보고 현재가 기준으로 익절/손절가 재설정
+        engine.set_levels(ticker, price, 1.01, 0.99)
+
+    engine = ExitEngine(on_exit, url=f"ws://127.0.0.1:{ready[0]}")
+    engine.set_levels("KRW-TEST", prices[0], 1.01, 0.99)
+    start = time.perf_counter()
+    engine.start(["KRW-TEST"])
+    while engine.ws is None and time.perf_counter() - start < 5:
+        time.sleep(0.01)
+    while engine.ws is not None and time.perf_counter() - start < 60:
+        time.sleep(0.01)
+    elapsed = time.perf_counter() - start
+    engine.stop()
+    stop.append(True)
+
+    print(f"[실시간 매도] 체결 {ticks:,}건 재생 {elapsed:.2f}s ({ticks / elapsed:,.0f} 건/s) | "
+          f"매도 주문 {len(fired)}회 (체결 {len(exchange.trades) - 1}건)")
+    print("    " + engine.latency.summary("체결→매도 주문"))
+    print(engine.latency.table())
+
+class SlowWebClient:
+    """일부러 느리게 응답하는 슬랙 WebClient 대역"""
+    def __init__(self, delay=0.5):
+        self.delay = delay
+        self.messages = []
+
+    def chat_postMessage(self, channel, text):
+        time.sleep(self.delay)
+        self.messages.append(text)
+
+def bench_notifier(count=500, delay=0.5):
+    """느린 슬랙 응답에도 post() 가 바로 반환되는지, 몇 번의 전송으로 합쳐지는지 측정"""
+    client = SlowWebClient(delay)
+    notifier = Notifier(client, "C-TEST", backlog=200)
+
+    start = time.perf_counter()
+    worst = 0.0
+    for i in range(count):
+        t = time.perf_counter()
+        notifier.post(f"[KRW-T{i}] 매수 조건 미충족", low_priority=True)
+        worst = max(worst, time.perf_counter() - t)
+    enqueue_time = time.perf_counter() - start
+    notifier.flush(timeout=30)
+
+    print(f"[슬랙 알림] 메시지 {count}건 enqueue 평균 {enqueue_time / count * 1e6:.1f}µs, 최대 {worst * 1e6:.1f}µs "
+          f"(슬랙 응답 {delay}s) | 실제 전송 {len(client.messages)}회")
+    return worst, len(client.messages)
+
+def journal_writer(snapshot_path, compact_every):
+    journal = PositionJournal(snapshot_path, compact_every=compact_every)
+    journal.load()
+    i = 0
+    while True:
+        ticker = f"KRW-T{i % 50}"
+        journal.record("buy", ticker, {"buy_price": float(i), "buy_time": "", "amount_krw": 10_000.0}, sync=False)
+        if i % 3 == 0:
+            journal.record("sell", ticker, sync=False)
+        i += 1
+
+def bench_journal(count=2000, kills=5):
+    """포지션 로그 쓰기 처리량과, 쓰는 도중 프로세스를 강제 종료했을 때 복구되는지 확인"""
+    with tempfile.TemporaryDirectory() as tmp:
+        info = {"buy_price": 100.0, "buy_time": "2025-01-01T00:00:00", "amount_krw": 10_000.0}
+        results = []
+        for sync in (True, False):
+            journal = PositionJournal(os.path.join(tmp, f"sync{sync}.json"), compact_every=500)
+            journal.load()
+            start = time.perf_counter()
+            for i in range(count):
+                journal.record("buy", f"KRW-T{i % 50}", info, sync=sync)
+            journal.close()
+            results.append(count / (time.perf_counter() - start))
+
+        # 기존 방식: 매번 buy_log.json 전체를 다시 씀 (포지션 50개)
+        positions = {f"KRW-T{i}": info for i in range(50)}
+        path = os.path.join(tmp, "rewrite.json")
+        start = time.perf_counter()
+        for i in range(count):
+            with open(path, "w") as f:
+                json.dump(positions, f)
+        rewrite = count / (time.perf_counter() - start)
+
+        print(f"[포지션 로그] 이벤트마다 fsync: {results[0]:,.0f}건/s | fsync 묶음: {results[1]:,.0f}건/s | "
+              f"전체 재작성(fsync 없음): {rewrite:,.0f}건/s")
+
+        # 장애 주입: 쓰는 중간에 SIGKILL 후 다시 로드
+        ctx = mp.get_context("fork")
+        recovered = 0
+        for k in range(kills):
+            snapshot_path = os.path.join(tmp, f"kill{k}.json")
+            writer = ctx.Process(target=journal_writer, args=(snapshot_path, 200))
+            writer.start()
+            time.sleep(0.05 + 0.05 * k)
+            os.kill(writer.pid, signal.SIGKILL)
+            writer.join()
+
+            # 잘린 마지막 줄 흉내
+            with open(os.path.splitext(snapshot_path)[0] + ".journal", "ab") as f:
+                f.write(b'deadbeef {"kind":"buy","tic')
+
+            journal = PositionJournal(snapshot_path)
+            positions = journal.load()
+            ok = all(set(p) == {"buy_price", "buy_time", "amount_krw"} for p in positions.values())
+            journal.record("reset", "KRW-T0")  # 복구 후 이어서 기록 가능해야 함
+            journal.close()
+            recovered += ok and PositionJournal(snapshot_path).load().get("KRW-T0") is None
+        print(f"    강제 종료 후 복구 성공 {recovered}/{kills}")
+        assert recovered == kills, f"강제 종료 {kills}회 중 {kills - recovered}회 복구 실패"
+
+def bench_intrabar(tickers=10, days=90):
+    """3개월치 1분봉 x 10종목으로 intrabar 청산 판단 비교에 걸리는 시간"""
+    data, params = {}, {}
+    for seed in range(tickers):
+        minute_df = make_ohlcv(60 * 24 * days, seed=seed, freq="1min", volatility=0.002)
+        df = minute_df.resample("240min", origin=pd.Timestamp("1970-01-01 09:00")).agg(
+            {"open": "first", "high": "max", "low": "min", "close": "last", "volume": "sum"}).dropna()
+        ticker = f"KRW-T{seed}"
+        data[ticker] = (df, minute_df)
+        params[ticker] = {"risk_ratio": 1.0, "rsi_limit": 60, "take_profit_ratio": 1.03, "stop_loss_ratio": 0.97}
+
+    started = time.perf_counter()
+    table = compare(data, params)
+    elapsed = time.perf_counter() - started
+    print(f"[intrabar 청산 판단] {tickers}종목 x 1분봉 {60 * 24 * days:,}개: {elapsed:.2f}s")
+    report(table)
+
+    # 반복문 버전과 벡터화 버전이 같은 청산가를 쓰는지 확인
+    df, minute_df = data["KRW-T0"]
+    loop = CustomBackTest(df, minute_df=minute_df, **params["KRW-T0"])
+    loop.execute(verbose=False, exit_mode="intrabar")
+    print(f"    반복문 / 벡터화 누적 수익률 {loop.accumulated_ror:.6f} / {table['ror_intrabar'][0]:.6f}")
+
+def bench_metrics(count=200_000, call_time=0.03):
+    """span 하나를 기록하는 데 드는 비용 (trace 꺼짐 / 주기 트레이스 켜짐) 과 거래소 호출 대비 비율"""
+    def noop():
+        pass
+
+    def bare():
+        for _ in range(count):
+            noop()
+
+    registry = Registry()
+    timed = registry.timed(noop, "exchange", method="noop")
+
+    def spans():
+        for _ in range(count):
+            timed()
+
+    base = timeit(bare)
+    off = (timeit(spans) - base) / count
+
+    with tempfile.TemporaryDirectory() as tmp:
+        traced = Registry(trace_path=os.path.join(tmp, "trace.jsonl"))
+        timed = traced.timed(noop, "exchange", method="noop")
+        with traced.cycle("buy_cycle"):
+            on = (timeit(spans, repeat=1) - base) / count
+
+    print(f"[지표 기록] span 1회 비용: {off * 1e6:.2f}µs (트레이스 켜짐 {on * 1e6:.2f}µs) | "
+          f"거래소 호출 {call_time * 1000:.0f}ms 대비 {off / call_time * 100:.4f}%")
+
+def bench_positions(threads=16, ops=300, tickers=4):
+    """여러 스레드가 같은 티커들을 동시에 매수 / 추가 매수 / 매도할 때 포지션이 어긋나지 않는지 확인"""
+    names = [f"KRW-T{i}" for i in range(tickers)]
+    with tempfile.TemporaryDirectory() as tmp:
+        book = PositionBook(PositionJournal(os.path.join(tmp, "buy_log.json")))
+        history = {ticker: [] for ticker in names}  # 잠금 안에서 실제로 적용된 순서
+
+        def worker(seed):
+            rng = random.Random(seed)
+            for _ in range(ops):
+                ticker = rng.choice(names)
+                with book.lock(ticker):
+                    if rng.random() < 0.7:
+                        amount, price = rng.randint(5000, 50000), rng.uniform(90, 110)
+                        book.add(ticker, amount, price, "2025-01-01T00:00:00")
+                        history[ticker].append((amount, price))
+                    else:
+                        book.remove(ticker)
+                        history[ticker].append(None)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            list(pool.map(worker, range(threads)))
+        elapsed = time.perf_counter() - started
+
+        # 기록된 순서대로 다시 계산한 포지션 / 로그 재생 결과 / 메모리 상태가 모두 같아야 함
+        expected = {}
+        for ticker, events in history.items():
+            amount = cost = 0
+            for event in events:
+                if event is None:
+                    amount = cost = 0
+                else:
+                    amount += event[0]
+                    cost += event[0] * event[1]
+            if amount:
+                expected[ticker] = (amount, cost / amount)
+        current = {t: (info["amount_krw"], info["buy_price"]) for t, info in book.items()}
+        book.journal.close()
+        replayed = {t: (info["amount_krw"], info["buy_price"])
+                    for t, info in PositionJournal(os.path.join(tmp, "buy_log.json")).load().items()}
+        consistent = all(t in current and current[t][0] == a and abs(current[t][1] - p) < 1e-9 * p
+                         for t, (a, p) in expected.items()) and len(current) == len(expected) and replayed == current
+        print(f"[포지션 동시 변경] {threads}스레드 x {ops}회: {threads * ops / elapsed:,.0f} 회/s | "
+              f"기록 순서 / 로그 재생과 일치: {consistent}")
+        assert consistent, "포지션이 잠금 안에서 적용된 순서 / 로그 재생 결과와 다름"
+
+    bench_bot_positions(threads=threads)
+
+def bench_bot_positions(threads=16, ops=100, tickers=3):
+    """CoinBot.buy_ticker (추가 매수) 와 sell_position 을 같은 티커에 동시에 호출한 뒤 거래소 잔고와 포지션 비교"""
+    from portfolio_backtest import SilentWebClient
+    from trading import CoinBot
+
+    index = pd.date_range("2025-01-01", periods=60 * 24 * 20, freq="1min")
+    close = np.linspace(10_000, 20_000, len(index))  # 꾸준한 상승 → 항상 종가 > MA20
+    minute_df = pd.DataFrame({"open": close, "high": close * 1.001, "low": close * 0.999, "close": close,
+                              "volume": 1.0}, index=index)
+    names = [f"KRW-T{i}" for i in range(tickers)]
+    exchange = SimExchange({ticker: minute_df for ticker in names}, start_cash=10**9)
+    exchange.set_time(index[-1])
+    param = {"rsi_limit": 101, "take_profit_ratio": 1.1, "stop_loss_ratio": 0.9, "risk_ratio": 1.0}
+
+    with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(open(os.devnull, "w")):
+        bot = CoinBot(None, None, "bench", exchange=exchange, web_client=SilentWebClient(),
+                      buy_log_path=os.path.join(tmp, "buy_log.json"), config={t: param for t in names},
+                      ledger_path=os.path.join(tmp, "trades"))
+
+        def worker(seed):
+            rng = random.Random(seed)
+            for _ in range(ops):
+                ticker = rng.choice(names)
+                if rng.random() < 0.7:
+                    # 매번 목표 금액을 키워서 이미 보유 중이면 추가 매수가 일어나게 함
+                    invested = (bot.buy_flag.get(ticker) or {}).get("amount_krw", 0)
+                    bot.buy_ticker(ticker, param, invested + rng.randint(10_000, 100_000), KrwBudget(10**9))
+                else:
+                    bot.sell_position(ticker, exchange.price(ticker))
+
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            list(pool.map(worker, range(threads)))
+        bot.notifier.flush()
+
+        # 포지션 금액 = 마지막 매도 이후 거래소 매수 금액 합, 포지션이 있으면 코인 보유
+        mismatched = []
+        for ticker in names:
+            bought = 0.0
+            for trade in exchange.trades:
+                if trade["market"] == ticker:
+                    bought = 0.0 if trade["side"] == "ask" else bought + trade["price"] * trade["volume"]
+            info = bot.buy_flag.get(ticker)
+            held = exchange.get_balance(ticker)
+            if (info is None) != (held == 0) or abs((info or {}).get("amount_krw", 0) - bought) > 1e-6 * max(bought, 1):
+                mismatched.append(ticker)
+        bot.journal.close()
+
+    print(f"    CoinBot 동시 매수 / 매도 {threads}스레드 x {ops}회: 주문 {len(exchange.trades)}건 | "
+          f"거래소 잔고와 어긋난 티커 {len(mismatched)}개")
+    assert not mismatched, f"거래소 잔고와 포지션이 어긋난 티커: {', '.join(mismatched)}"
+
+def bench_scheduler(tickers=30, days=7, real_jobs=20, real_seconds=3.0):
+    """모의 시계로 봇의 일주일치 예약 (4시간봉 매수 + 5분 매도 + 티커별 1분 매도) 을 실행하고 실행 시각 / 횟수 확인,
+    실제 시각에서는 예약 시각 대비 지연과 깨어난 횟수 측정"""
+    clock = SimClock(1_735_689_600.5)  # 2025-01-01 09:00 KST (UTC 0시) 직후
+    scheduler = Scheduler(clock)
+    fired = []
+    scheduler.every(4 * 3600, lambda: fired.append(("buy", clock.now())), offset=60, key="buy", group="trading")
+    scheduler.every(300, lambda: fired.append(("sell", clock.now())), key="sell", group="trading")
+    for i in range(tickers):
+        scheduler.every(60, lambda: fired.append(("exit", clock.now())), key=("sell", f"KRW-T{i}"), group="trading")
+
+    end = clock.now() + days * 86400
+    started = time.perf_counter()
+    scheduler.run_until(end - 86400)
+    scheduler.cancel(group="trading")  # 마지막 하루는 "종료" 상태
+    scheduler.run_until(end)
+    elapsed = time.perf_counter() - started
+
+    counts = {kind: sum(1 for k, _ in fired if k == kind) for kind in ("buy", "sell", "exit")}
+    expected = {"buy": (days - 1) * 6, "sell": (days - 1) * 288, "exit": (days - 1) * 1440 * tickers}
+    aligned = all((t - 60) % (4 * 3600) == 0 if kind == "buy" else t % 60 == 0 for kind, t in fired)
+    ordered = all(a[1] <= b[1] for a, b in zip(fired, fired[1:]))
+    print(f"[예약 실행] 모의 {days}일 ({tickers}개 티커 1분 매도 검사): 작업 {len(fired):,}회 {elapsed * 1000:.0f}ms | "
+          f"예상 횟수 일치 {counts == expected}, 봉 경계 정렬 {aligned}, 시각 순서 {ordered}")
+
+    # 실제 시각: 0.1 ~ 0.3초 주기 작업들의 예약 시각 대비 실행 지연
+    scheduler = Scheduler()
+    lateness = []
+    for i in range(real_jobs):
+        interval = 0.1 + 0.01 * i
+        job = scheduler.every(interval, lambda: None)
+        job.func = lambda job=job: lateness.append(time.time() - (job.deadline - job.interval))
+    thread = scheduler.start()
+    time.sleep(real_seconds)
+    scheduler.stop()
+    thread.join()
+    lateness = np.array(lateness) * 1000
+    print(f"    실제 시각 {real_seconds:.0f}초: 실행 {len(lateness)}회, 깨어남 {scheduler.wakeups}회 | "
+          f"지연 p50 {np.percentile(lateness, 50):.2f}ms, p99 {np.percentile(lateness, 99):.2f}ms "
+          f"(이전 5초 간격 폴링은 최대 5000ms)")
+
+def bench_ledger(rows=2_000_000, tickers=50, seed=0):
+    """파일 장부에 rows 개 거래를 쌓고 집계 쿼리 시간 측정, 티커 / 일별 손익은 pandas groupby 결과와 비교"""
+    rng = np.random.default_rng(seed)
+    exit_time = np.sort(rng.integers(0, 365 * day_ns, rows)) + pd.Timestamp("2025-01-01").value
+    entry_time = exit_time - rng.integers(60, 7 * 86400, rows) * 10**9
+    ticker = rng.integers(0, tickers, rows)
+    amount = rng.uniform(10_000, 1_000_000, rows)
+    ror = rng.normal(1.0, 0.05, rows)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ledger = TradeLedger(os.path.join(tmp, "trades"))
+        started = time.perf_counter()
+        for i in range(tickers):
+            mask = ticker == i
+            ledger.extend(f"KRW-T{i}", entry_time[mask], exit_time[mask], 100.0, 100.0 * ror[mask],
+                          amount[mask], amount[mask] * ror[mask], amount[mask] * 0.001 * (1 + ror[mask]))
+        write_time = time.perf_counter() - started
+        ledger.close()
+
+        started = time.perf_counter()
+        ledger = TradeLedger(os.path.join(tmp, "trades"))
+        trades = ledger.trades()
+        open_time = time.perf_counter() - started
+
+        timings = {}
+        for name, query in (("요약", lambda: summary(trades)),
+                            ("티커별", lambda: pnl_by_ticker(trades, ledger.tickers)),
+                            ("일별", lambda: pnl_by_day(trades)),
+                            ("MDD", lambda: drawdown(trades, 10**10)),
+                            ("보유 투자금", lambda: exposure(trades))):
+            timings[name] = timeit(query)
+
+        frame = pd.DataFrame({name: np.asarray(trades[name]) for name in ("ticker", "exit_time", "profit")})
+        by_ticker = frame.groupby("ticker")["profit"].sum()
+        by_day = frame.groupby(frame["exit_time"] // day_ns)["profit"].sum()
+        ticker_ok = np.allclose(pnl_by_ticker(trades, ledger.tickers)["net_profit"].to_numpy(), by_ticker.to_numpy())
+        day_ok = np.allclose(pnl_by_day(trades)["net_profit"].to_numpy(), by_day.to_numpy())
+        ledger.close()
+
+    print(f"[거래 장부] {rows:,}건 기록 {write_time:.2f}s, 열기 {open_time * 1000:.1f}ms | " +
+          ", ".join(f"{name} {elapsed * 1000:.1f}ms" for name, elapsed in timings.items()))
+    print(f"    pandas groupby 와 일치: 티커별 {ticker_ok}, 일별 {day_ok}")
+
+def bench_screener(markets=250, count=200):
+    """KRW 마켓 전체 (markets 개) 의 최근 count 개 봉으로 매수 조건을 티커별 pandas 반복 대비 한 번에 계산"""
+    frames = {}
+    for i in range(markets):
+        df = make_ohlcv(count + 20, seed=i)
+        frames[f"KRW-T{i}"] = df.drop(df.index[[5 + i % 50]]) if i % 10 == 0 else df  # 일부는 거래 없는 봉이 빠짐
+
+    def per_ticker():
+        rows = {}
+        for ticker, df in frames.items():
+            df = df.iloc[-count:]
+            rows[ticker] = (df['close'].rolling(window=20).mean().iloc[-1], get_rsi(df).iloc[-1])
+        return rows
+
+    matrix = align(frames, count, 240)
+    loop_time = timeit(per_ticker, repeat=1)
+    align_time = timeit(lambda: align(frames, count, 240))
+    screen_time = timeit(lambda: screen(matrix, rsi_limit=45))
+
+    # 빠진 봉이 없는 티커는 pandas 결과와 같아야 함
+    ma, rsi = indicators(matrix.close)
+    expected = per_ticker()
+    rows = [i for i, ticker in enumerate(matrix.tickers) if len(frames[ticker]) == count + 20]
+    same = all(np.isclose(ma[i, -1], expected[matrix.tickers[i]][0]) and
+               np.isclose(rsi[i, -1], expected[matrix.tickers[i]][1]) for i in rows)
+    table = screen(matrix, rsi_limit=45)
+    print(f"[전체 마켓 스크리너] {markets}개 x {count}봉: 티커별 pandas {loop_time * 1000:.1f}ms | "
+          f"배열 정렬 {align_time * 1000:.1f}ms + 조건 계산 {screen_time * 1000:.2f}ms | "
+          f"매수 후보 {int(table['buy'].sum())}개 | pandas 와 일치 {same}")
+
+def bench_paper(sizes=(5, 20, 80), speed=100, latency=0.05, error_rate=0.02):
+    """모의 거래소 (호출마다 latency 초 지연, error_rate 확률로 연결 오류) 를 speed 배속으로 재생하며
+    4시간봉 마감 직후 매수 주기가 티커 수에 따라 얼마나 걸리는지 측정 (데이터 시각 기준 지연 = 실제 시장에서 늦어지는 시간)"""
+    from trading import CoinBot, buy_delay
+
+    index = pd.date_range("2025-01-01", periods=60 * 24 * 12, freq="1min")
+    boundary = pd.Timestamp("2025-01-12 09:00")  # 4시간봉 마감 (KST)
+    for size in sizes:
+        minute_data = {}
+        for i in range(size):
+            rng = np.random.default_rng(i)
+            close = np.linspace(10_000, 15_000, len(index)) * np.exp(np.cumsum(rng.normal(0, 0.0005, len(index))))
+            minute_data[f"KRW-T{i}"] = pd.DataFrame({"open": close, "high": close * 1.001, "low": close * 0.999,
+                                                     "close": close, "volume": 1.0}, index=index)
+        param = {"rsi_limit": 101, "take_profit_ratio": 1.5, "stop_loss_ratio": 0.5, "risk_ratio": 1 / size}
+        clock = ReplayClock(boundary + pd.Timedelta(seconds=buy_delay - 5), speed=speed)  # 매수 5초 (데이터 시각) 전부터
+        exchange = PaperExchange(minute_data, clock, start_cash=10**8, latency=latency, jitter=latency / 2,
+                                 error_rate=error_rate, seed=size)
+        done = threading.Event()
+        cycle = {}
+
+        with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(open(os.devnull, "w")):
+            bot = CoinBot(None, None, "bench", exchange=exchange, web_client=NullWebClient(), clock=clock,
+                          config={ticker: param for ticker in minute_data},
+                          buy_log_path=os.path.join(tmp, "buy_log.json"), ledger_path=os.path.join(tmp, "trades"))
+            bot.feed = PaperFeed(exchange, bot.exit_engine)
+            execute_buy = bot.execute_buy
+
+            def timed_buy():
+                started = time.perf_counter()
+                execute_buy()
+                cycle["wall"] = time.perf_counter() - started
+                cycle["lag"] = (exchange.now - boundary.value) / 10**9 - buy_delay
+                done.set()
+
+            bot.execute_buy = timed_buy
+            clock.reset()  # 봇 생성에 걸린 시간만큼 재생이 앞서 나가지 않도록
+            bot.scheduler.start()
+            bot.start_trading()
+            finished = done.wait(timeout=120)
+            bot.stop_trading()
+            bot.scheduler.stop()
+            bot.notifier.flush()
+            bot.journal.close()
+
+        if not finished:
+            print(f"    티커 {size}개: 120초 안에 매수 주기가 끝나지 않음")
+            continue
+        print(f"    티커 {size:>3}개: 매수 주기 {cycle['wall']:.2f}초 (데이터 시각으로 봉 마감 + {buy_delay + cycle['lag']:.0f}초에 완료) | "
+              f"거래소 호출 {exchange.calls}회, 연결 오류 {exchange.errors}회 | 체결 {len(exchange.trades)}건 / 보유 {len(bot.buy_flag)}개")
+
+def rising_minutes(tickers, days=12):
+    """꾸준히 오르는 1분봉 (항상 종가 > MA20, RSI 100) → 모든 티커가 매수 조건을 만족"""
+    index = pd.date_range("2025-01-01", periods=60 * 24 * days, freq="1min")
+    data = {}
+    for i in range(tickers):
+        close = np.linspace(10_000, 20_000, len(index)) * (1 + i / 100)
+        data[f"KRW-T{i}"] = pd.DataFrame({"open": close, "high": close * 1.001, "low": close * 0.999,
+                                          "close": close, "volume": 1.0}, index=index)
+    return data
+
+def shard_exchange(index, tickers=80, latency=0.05):
+    """샤드 프로세스마다 따로 만드는 모의 거래소 (호출마다 latency 초 지연, KRW 는 충분, 예산은 코디네이터가 제한)"""
+    sys.stdout = open(os.devnull, "w")  # 샤드 프로세스의 매수 로그 숨김
+    minute_data = rising_minutes(tickers)
+    last = next(iter(minute_data.values())).index[-1]
+    return PaperExchange(minute_data, ReplayClock(last, speed=1), start_cash=10**12, latency=latency,
+                         jitter=latency / 2, seed=index)
+
+def bench_shards(shards=(1, 2, 4), tickers=80, budget=1_000_000, latency=0.05):
+    """티커를 여러 프로세스로 나눠 매수 주기를 한 번 실행: 걸린 시간과 코디네이터 예약이 예산을 넘지 않는지 확인
+
+    티커마다 총 자산의 10% 를 사려고 하므로 (필요 금액 = 예산 x tickers / 10) 샤드들이 같은 KRW 를 두고 경쟁함
+    """
+    from shards import ShardedBot, CoordinatorManager
+
+    minute_data = rising_minutes(tickers)
+    param = {"rsi_limit": 101, "take_profit_ratio": 1.5, "stop_loss_ratio": 0.5, "risk_ratio": 0.1}
+    config = {ticker: dict(param) for ticker in minute_data}
+    for count in shards:
+        main_exchange = SimExchange(minute_data, start_cash=budget)  # 코디네이터가 잔고 / 현재가를 조회하는 거래소
+        main_exchange.set_time(next(iter(minute_data.values())).index[-1])
+        with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(open(os.devnull, "w")):
+            bot = ShardedBot(None, None, "bench", shards=count, config=config, upbit=main_exchange,
+                             get_current_price=main_exchange.get_current_price, web_client=NullWebClient(),
+                             buy_log_path=os.path.join(tmp, "buy_log.json"), ledger_dir=os.path.join(tmp, "trades"),
+                             exchange_factory=functools.partial(shard_exchange, tickers=tickers, latency=latency),
+                             refresh_interval=3600)  # 매수 주기 한 번 동안 잔고를 다시 조회하지 않음 (모의 잔고는 줄지 않으므로)
+            bot.start()
+            elapsed = bot.run_all("execute_buy", timeout=300)
+
+            # 코디네이터 왕복 시간 (샤드가 KRW 를 예약할 때마다 한 번)
+            client = CoordinatorManager(address=bot.server.address, authkey=bot.authkey)
+            client.connect()
+            coordinator = client.coordinator()
+            started = time.perf_counter()
+            for _ in range(1000):
+                coordinator.release(0.0)
+            rpc = (time.perf_counter() - started) / 1000
+
+            stats = bot.coordinator.stats()
+            held = bot.coordinator.positions(list(config))
+            bot.close()
+
+        spent = sum(info["amount_krw"] for info in held.values())
+        print(f"    샤드 {count}개: 매수 주기 {elapsed:.2f}초 | 매수 {len(held)}개, {spent:,.0f}원 / 예산 {budget:,}원 "
+              f"(예산 이내 {spent * 1.001 <= budget}, 미정산 {stats['in_flight']:,.0f}원) | "
+              f"코디네이터 호출 {rpc * 1e6:,.0f}µs")
+
+def import_time(module="trading", repeat=3):
+    """새 프로세스에서 module 을 import 하는 데 걸리는 시간 (가장 빠른 회차)"""
+    code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+    cwd = os.path.dirname(os.path.abspath(__file__))
+    return min(float(subprocess.run([sys.executable, "-c", code], cwd=cwd, capture_output=True, text=True,
+                                    check=True).stdout) for _ in range(repeat))
+
+def startup_time(workdir, name, minute_data, latency, warm_state_path):
+    """CoinBot 생성 → 시작 준비 (prewarm) → 첫 매수 판단까지 걸린 시간, 봉 저장소는 workdir 에서 이어서 사용"""
+    from trading import CoinBot
+    from resampler import MarketData
+
+    last = next(iter(minute_data.values())).index[-1] - pd.Timedelta(minutes=30)
+    source = SimExchange(minute_data)  # 업비트 봉 API 대신 (호출마다 latency 초)
+    source.set_time(last)
+
+    def fetcher(ticker, interval="day", count=200):
+        time.sleep(latency)
+        return source.get_ohlcv(ticker, interval=interval, count=count)
+
+    param = {"rsi_limit": 101, "take_profit_ratio": 1.5, "stop_loss_ratio": 0.5, "risk_ratio": 1 / len(minute_data)}
+    with contextlib.redirect_stdout(open(os.devnull, "w")):
+        started = time.perf_counter()
+        exchange = PaperExchange(minute_data, ReplayClock(last, speed=1), start_cash=10**8, latency=latency, jitter=0)
+        candles = MarketData(CandleStore(os.path.join(workdir, "candles"), fetcher=fetcher, now=last.to_pydatetime))
+        bot = CoinBot(None, None, "bench", exchange=exchange, web_client=NullWebClient(), candles=candles,
+                      config={ticker: param for ticker in minute_data}, warm_state_path=warm_state_path,
+                      buy_log_path=os.path.join(workdir, f"{name}_buy_log.json"),
+                      ledger_path=os.path.join(workdir, f"{name}_trades"))
+        created = time.perf_counter() - started
+        bot.start_prewarm().join()
+        ready = time.perf_counter() - started
+        bot.execute_buy()
+        first = time.perf_counter() - started
+        bought = len(bot.buy_flag)
+        bot.notifier.flush()
+        bot.journal.close()
+    return created, ready, first, bought
+
+def bench_startup(tickers=10, latency=0.05):
+    """import 시간과 첫 매수 판단까지 걸리는 시간: 처음 시작 / 재시작 (저장된 상태 없음) / 재시작 (저장된 상태 사용)"""
+    print(f"    import trading: {import_time() * 1000:.0f}ms")
+    minute_data = rising_minutes(tickers)
+    with tempfile.TemporaryDirectory() as tmp:
+        warm_path = os.path.join(tmp, "warm_state.pkl")
+        runs = [("처음 시작", "cold", warm_path), ("재시작 (상태 없음)", "restart", None),
+                ("재시작 (저장된 상태)", "warm", warm_path)]
+        for label, name, path in runs:
+            created, ready, first, bought = startup_time(tmp, name, minute_data, latency, path)
+            print(f"    {label:<14} 생성 {created * 1000:5.0f}ms | 준비 완료 {ready * 1000:5.0f}ms | "
+                  f"첫 매수 판단 {first * 1000:5.0f}ms (매수 {bought}/{tickers})")
+
+# --- 회귀 비교용 벤치마크 묶음 (python benchmark.py suite / compare) ---
+
+suite_sizes = [10**k for k in range(2, 8)]  # 10² ~ 10⁷ 봉
+loop_max = 10**4       # 반복문 execute() 는 이 크기까지만 (10⁵ 부터는 수십 초)
+screener_max = 10**6   # 스크리너는 티커 x 200봉, 10⁶ 봉 = 5,000 티커
+bot_sizes = (1, 10, 100)
+results_dir = "bench_results"
+
+def bot_cycle_time(tickers, seed=0, repeat=3):
+    """모의 거래소에서 execute_buy (전 티커 매수) + execute_sell (전 티커 익절) 한 번에 걸리는 시간"""
+    from trading import CoinBot
+
+    minute_data = {f"KRW-T{i}": make_ohlcv(60 * 24 * 12, seed=seed + i, freq="1min", volatility=0.001)
+                   for i in range(tickers)}
+    exchange = SimExchange(minute_data, start_cash=10**9)
+    exchange.set_time(next(iter(minute_data.values())).index[-1])
+    # 종가 > MA20 인 티커는 모두 매수하고 (RSI 한도 101), 다음 매도 검사에서 바로 익절 (익절 배수 1.0)
+    # → 매 회차 같은 상태에서 시작
+    param = {"rsi_limit": 101, "take_profit_ratio": 1.0, "stop_loss_ratio": 0.5, "risk_ratio": 1 / tickers}
+
+    with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(open(os.devnull, "w")):
+        bot = CoinBot(None, None, "bench", exchange=exchange, web_client=NullWebClient(),
+                      config={ticker: param for ticker in minute_data},
+                      buy_log_path=os.path.join(tmp, "buy_log.json"), ledger_path=os.path.join(tmp, "trades"))
+
+        def cycle():
+            bot.execute_buy()
+            bot.execute_sell()
+
+        seconds = timeit(cycle, repeat=repeat)
+        bot.notifier.flush()
+        bot.journal.close()
+    return seconds
+
+def run_suite(max_size=10**7, seed=0, repeat=5):
+    """지표 / 백테스트 / 스크리너 / 봇 매매 주기를 크기별로 측정, [{"name", "size", "unit", "seconds"}] 반환
+
+    데이터는 모두 seed 로 만든 가상 OHLCV 라서 네트워크 / 키 파일 없이 같은 입력으로 다시 잴 수 있음
+    """
+    results = []
+
+    def record(name, size, seconds, unit="bars"):
+        results.append({"name": name, "size": size, "unit": unit, "seconds": seconds})
+        print(f"    {name:<22} {size:>12,} {unit:<7} {seconds * 1000:>12.3f}ms")
+
+    params = dict(risk_ratio=1.0, rsi_limit=60, take_profit_ratio=1.15, stop_loss_ratio=0.92, cache=None)
+    for size in [size for size in suite_sizes if size <= max_size]:
+        df = make_ohlcv(size, seed=seed, freq="1min")  # 4시간 간격이면 10⁷ 봉이 pandas 시각 범위 (2262년) 를 넘음
+        rounds = repeat if size < 10**6 else 1
+        record("get_rsi", size, timeit(lambda: get_rsi(df), rounds))
+        backtest = CustomBackTest(df, **params)
+        record("calculate_indicators", size, timeit(backtest.calculate_indicators, rounds))
+        backtest.cache = IndicatorCache(max_bytes=2**40)  # 파라미터 탐색처럼 같은 봉을 다시 계산하는 경우 (캐시 적중)
+        backtest.calculate_indicators()
+        record("indicators_cached", size, timeit(backtest.calculate_indicators, rounds))
+        with np.errstate(over="ignore", invalid="ignore"):  # 10⁶ 봉 이상이면 누적 자산이 float 범위를 넘음 (속도와 무관)
+            record("execute_vectorized", size,
+                   timeit(lambda: CustomBackTest(df, **params).execute_vectorized(verbose=False), rounds))
+        if size <= loop_max:
+            record("execute", size, timeit(lambda: CustomBackTest(df, **params).execute(verbose=False), 1))
+        if 10**3 <= size <= screener_max:
+            # backTesting-ver2 의 매수 후보 계산 (align + screen), 크기 = 티커 수 x 200봉
+            frames = {f"KRW-T{i}": make_ohlcv(200, seed=seed + i) for i in range(size // 200)}
+            record("screener", size, timeit(lambda: screen(align(frames, 200, 240), rsi_limit=45), rounds))
+    for tickers in bot_sizes:
+        record("bot_cycle", tickers, bot_cycle_time(tickers, seed=seed, repeat=repeat), unit="tickers")
+    return results
+
+# --- 오프라인 정확성 검사 (네트워크 / 키 파일 없이, 실패하면 AssertionError) ---
+
+class FakeFetcher:
+    """업비트 봉 API 흉내: now 까지의 봉 중 마지막 count 개, 마지막 봉은 진행 중이라 종가가 아직 다름"""
+    def __init__(self, frames, now, forming=1.01):
+        self.frames = frames  # interval -> DataFrame
+        self.now = pd.Timestamp(now)
+        self.forming = forming  # 진행 중인 봉 종가에 곱하는 값 (1.0 이면 기록된 값 그대로)
+        self.counts = []
+
+    def __call__(self, ticker, interval="minute1", count=200):
+        self.counts.append(count)
+        df = self.frames[interval]
+        df = df[df.index <= self.now].iloc[-count:].copy()
+        df.iloc[-1, df.columns.get_loc('close')] *= self.forming
+        return df
+
+def check_candle_store():
+    """CandleStore 증분 동기화, 진행 중이던 마지막 봉 덮어쓰기, 구간 / 마지막 N 개 조회 (시계는 기본값 kst_now)"""
+    now = pd.Timestamp(kst_now()).floor("min")
+    source = make_ohlcv(600, seed=3, freq="1min")
+    source.index = pd.date_range(end=now, periods=len(source), freq="1min")
+    fetcher = FakeFetcher({"minute1": source}, now - pd.Timedelta(minutes=100))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = CandleStore(tmp, fetcher=fetcher)
+        assert store.sync("KRW-T0", "minute1", count=200) == 200
+
+        # 30분 뒤: 서버 시간대와 관계없이 밀린 봉을 모두 요청해야 함 (UTC 서버에서 1개만 요청하면 빈 구간이 생김)
+        fetcher.now += pd.Timedelta(minutes=30)
+        added = store.sync("KRW-T0", "minute1")
+        assert added == 30, f"증분 동기화로 추가된 봉 {added}개 (기대 30개, 요청 {fetcher.counts[-1]}개)"
+
+        expected = source[source.index <= fetcher.now].iloc[-230:].copy()
+        expected.iloc[-1, expected.columns.get_loc('close')] *= 1.01
+        stored = store.get("KRW-T0", "minute1")
+        cols = ['open', 'high', 'low', 'close', 'volume']
+        assert stored.index.equals(expected.index), "저장된 봉 시각이 거래소 봉과 다름 (빠진 봉 또는 중복)"
+        assert np.array_equal(stored[cols].to_numpy(), expected[cols].to_numpy()), \
+            "진행 중이던 봉이 마감된 값으로 덮어써지지 않음"
+
+        start, end = expected.index[50], expected.index[120]
+        assert store.get("KRW-T0", "minute1", start=start, end=end).index.equals(expected.index[50:121])
+        assert store.get("KRW-T0", "minute1", count=10).index.equals(expected.index[-10:])
+        assert store.get("KRW-T0", "minute1", end=end, count=5).index.equals(expected.index[116:121])
+
+        # 다른 스레드가 동기화 (마지막 봉들을 잘라내고 다시 씀) 하는 동안 읽어도 잘린 파일을 보지 않아야 함
+        store.fetcher = lambda ticker, interval="minute1", count=200: fetcher(ticker, interval, count=100)
+        stop = threading.Event()
+        torn = []
+
+        def reader():
+            while not stop.is_set():
+                df = store.get("KRW-T0", "minute1")
+                if len(df) < 230 or not (np.diff(df.index.asi8) == 60 * 10**9).all():
+                    torn.append(len(df))
+
+        readers = [threading.Thread(target=reader) for _ in range(4)]
+        for thread in readers:
+            thread.start()
+        for i in range(500):
+            fetcher.now = min(fetcher.now + pd.Timedelta(minutes=i % 2), now)
+            store.sync("KRW-T0", "minute1")
+        stop.set()
+        for thread in readers:
+            thread.join()
+        assert not torn, f"동기화 중 get() 이 잘린 봉을 읽음 {len(torn)}회 (봉 {min(torn)}개)"
+    print("[캔들 저장소 검사] 증분 동기화 / 진행 중인 봉 덮어쓰기 / 구간·개수 조회 / 동기화 중 조회 통과")
+
+fixture_intervals = [("minute240", 50), ("day", 10), ("minute60", 30)]  # check_resampler 가 1분봉 1개 다음에 조회하는 순서
+
+def record_fixture(root, days=5, seed=7, ticker="KRW-T0"):
+    """resampler.main() 과 같은 구성 (1분봉 + 거래소 60분 / 4시간 / 일봉) 의 기록을 모의 거래소로 만듦
+
+    거래 없는 1분은 업비트처럼 빠지고, 마지막 1분봉은 일봉 마감 (KST 08:59) 이라 기록된 봉이 모두 마감된 봉임
+    """
+    rng = np.random.default_rng(seed)
+    minute_df = make_ohlcv(60 * 24 * days, seed=seed, freq="1min", volatility=0.002)
+    minute_df.index = pd.date_range(end="2025-01-10 08:59", periods=len(minute_df), freq="1min")
+    minute_df = minute_df.drop(minute_df.index[rng.choice(len(minute_df) - 1, len(minute_df) // 50, replace=False)])
+    exchange = SimExchange({ticker: minute_df})
+    exchange.set_time(minute_df.index[-1])
+    store = CandleStore(root, fetcher=exchange.get_ohlcv, now=minute_df.index[-1].to_pydatetime)
+    store.sync(ticker, "minute1", count=len(minute_df))
+    for interval, _ in fixture_intervals:
+        store.sync(ticker, interval, count=len(minute_df))
+
+def check_resampler(fixtures=None):
+    """기록된 1분봉으로 만든 봉이 기록된 거래소 봉과 같은지 확인
+
+    - resampler.verify: 저장된 1분봉 전체를 다시 묶은 봉과 비교
+    - MarketData: 매일 일봉 마감 시각에 1분봉 1개 (매도 검사) → 4시간봉 → 일봉 → 60분봉 순서로 조회해서
+      과거 봉 채우기와 이후 1분봉 동기화가 모두 거래소 봉과 같은지 비교
+      (조회 전 마지막 30분은 체결 스트림이 끊겼다 이어진 것처럼 일부 분이 빠지고 값이 틀린 체결을 먼저 넣음)
+    fixtures 에 resampler.main() 이 기록한 봉 디렉터리를 주면 그 기록으로, 없으면 record_fixture() 로 만든 기록으로 검사
+    """
+    from resampler import MarketData, verify
+
+    cols = ['open', 'high', 'low', 'close', 'volume']
+    with tempfile.TemporaryDirectory() as tmp:
+        if fixtures is None:
+            fixtures = os.path.join(tmp, "fixtures")
+            record_fixture(fixtures)
+        recorded = CandleStore(fixtures, fetcher=lambda *args, **kwargs: None)  # 기록만 읽음
+        tickers = sorted(name[:-len("_minute1.bin")] for name in os.listdir(fixtures) if name.endswith("_minute1.bin"))
+        assert tickers, f"{fixtures} 에 기록된 1분봉이 없음"
+
+        for ticker in tickers:
+            for interval, _ in fixture_intervals:
+                mismatched, total = verify(recorded, ticker, interval)
+                assert total and not mismatched, f"[{ticker}] {interval} verify: {total}개 봉 중 불일치 {mismatched}개"
+
+            frames = {interval: recorded.get(ticker, interval) for interval in ["minute1"] + [i for i, _ in fixture_intervals]}
+            first, last = frames["minute1"].index[0], frames["minute1"].index[-1]
+            ends = pd.date_range(first.normalize() + pd.Timedelta(days=1, hours=8, minutes=59), last, freq="1D")
+            ends = ends[ends - pd.Timedelta(days=1) >= first]  # 진행 중인 일봉의 1분봉이 모두 기록된 시각만
+            assert len(ends) >= 2, f"[{ticker}] 기록된 1분봉이 너무 짧음 ({first} ~ {last})"
+
+            fetcher = FakeFetcher(frames, ends[0], forming=1.0)
+            market = MarketData(CandleStore(os.path.join(tmp, ticker), fetcher=fetcher,
+                                            now=lambda: fetcher.now.to_pydatetime()))
+            minutes = frames["minute1"]
+            for end in ends:
+                fetcher.now = end
+                # REST 로 받은 1분봉이 체결로 만든 1분봉 (빠진 분 / 틀린 값) 을 고쳐야 함
+                for i, (time, close) in enumerate(minutes['close'][end - pd.Timedelta(minutes=29):end].items()):
+                    if i % 3:
+                        market.add_trade(ticker, time.value + 10**9, close * 1.5, 1.0)
+                market.get_ohlcv(ticker, "minute1", count=1)
+                for interval, count in fixture_intervals:
+                    built = market.get_ohlcv(ticker, interval, count=count)
+                    expected = frames[interval][frames[interval].index <= end].iloc[-count:]
+                    assert built is not None and built.index.equals(expected.index), \
+                        f"[{ticker}] {interval} @ {end}: 봉 시각이 거래소 봉과 다름"
+                    diff = ~np.isclose(built[cols].to_numpy(), expected[cols].to_numpy(), rtol=1e-6)
+                    assert not diff.any(), (f"[{ticker}] {interval} @ {end}: {int(diff.any(axis=1).sum())}개 봉 불일치 "
+                                            f"(첫 불일치 {built.index[diff.any(axis=1)][0]})")
+        print(f"[봉 리샘플러 검사] 티커 {len(tickers)}개, {', '.join(i for i, _ in fixture_intervals)}: "
+              f"verify / MarketData ({len(ends)}일 동안 간격을 섞어 조회) 모두 거래소 봉과 일치")
+
+def check_journal():
+    """쓰는 도중 강제 종료된 포지션 로그를 모두 복구하는지 (처리량은 작게 측정)"""
+    bench_journal(count=200, kills=5)
+
+def check_notifier(count=200, delay=0.3):
+    """슬랙 응답이 느려도 post() 가 기다리지 않고, 밀린 메시지가 합쳐져서 전송되는지"""
+    worst, sent = bench_notifier(count, delay)
+    assert worst < delay / 10, f"post() 최대 {worst * 1e3:.1f}ms (슬랙 응답 {delay * 1e3:.0f}ms 를 기다린 것으로 보임)"
+    assert sent < count, f"메시지 {count}건이 합쳐지지 않고 {sent}회 전송됨"
+
+def check_positions():
+    """여러 스레드가 같은 티커를 동시에 매수 / 매도해도 PositionBook 과 CoinBot 포지션이 어긋나지 않는지"""
+    bench_positions(threads=8, ops=100)
+
+def check_exit_retry(ticks=200):
+    """거래소가 매도를 계속 거절해도 체결마다 매도 스레드 / 주문이 늘지 않고, 재등록 대기 시간이 지난 뒤에만 다시 시도하는지"""
+    from portfolio_backtest import SilentWebClient
+    import trading
+
+    index = pd.date_range("2025-01-01", periods=60 * 24 * 20, freq="1min")
+    close = np.linspace(10_000, 20_000, len(index))  # 꾸준한 상승 → 항상 종가 > MA20 (매수 조건 충족)
+    minute_df = pd.DataFrame({"open": close, "high": close * 1.001, "low": close * 0.999, "close": close,
+                              "volume": 1.0}, index=index)
+    exchange = SimExchange({"KRW-T0": minute_df}, start_cash=10**9)
+    exchange.set_time(index[-1])
+    clock = SimClock(1_735_689_600.0)
+    param = {"rsi_limit": 101, "take_profit_ratio": 1.1, "stop_loss_ratio": 0.9, "risk_ratio": 1.0}
+    attempts = []
+
+    def reject(ticker, volume, *args, **kwargs):
+        attempts.append(ticker)
+        time.sleep(0.05)
+        return None
+
+    exchange.sell_market_order = reject  # 매수는 되고 매도만 계속 거절
+    with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(open(os.devnull, "w")):
+        bot = trading.CoinBot(None, None, "check", exchange=exchange, web_client=SilentWebClient(), clock=clock,
+                      buy_log_path=os.path.join(tmp, "buy_log.json"), config={"KRW-T0": param},
+                      ledger_path=os.path.join(tmp, "trades"))
+        bot.buy_ticker("KRW-T0", param, 100_000, KrwBudget(10**9))
+
+        def storm():
+            for _ in range(ticks):
+                bot.exit_engine.on_tick("KRW-T0", close[-1] * 1.2)
+                time.sleep(0.001)
+            while bot.selling:
+                time.sleep(0.01)
+
+        storm()
+        first = len(attempts)
+        clock.set(clock.now() + trading.exit_retry_delay - 1)
+        bot.scheduler.run_until(clock.now())
+        storm()
+        early = len(attempts)
+        bot.scheduler.run_until(clock.now() + 1)
+        storm()
+        bot.journal.close()
+
+    assert first == 1, f"매도 거절 중 체결 {ticks}건에 매도 주문 {first}회"
+    assert early == 1, f"재등록 대기 시간 ({trading.exit_retry_delay}초) 전에 매도 주문 {early - first}회 더 나감"
+    assert len(attempts) == 2, f"재등록 후 매도 주문 {len(attempts) - early}회 (기대 1회)"
+    assert bot.exit_failures["KRW-T0"] == 2 and "KRW-T0" not in bot.exit_engine.levels
+    print(f"[매도 실패 재시도] 거래소 거절 중 체결 {ticks * 3}건 → 매도 주문 {len(attempts)}회 "
+          f"(다음 재등록 {min(trading.exit_retry_delay * 2, trading.exit_retry_max)}초 뒤)")
+
+def run_checks(fixtures=None):
+    """모든 검사를 실행하고 통과 여부 반환"""
+    ok = True
+    for name, check in [("check_candle_store", check_candle_store),
+                        ("check_resampler", functools.partial(check_resampler, fixtures)),
+                        ("check_notifier", check_notifier),
+                        ("check_journal", check_journal),
+                        ("check_positions", check_positions),
+                        ("check_exit_retry", check_exit_retry)]:
+        try:
+            check()
+        except AssertionError as e:
+            print(f"❌ {name} 실패: {e}")
+            ok = False
+    return ok
+
+def git_commit():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True,
+                               text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return commit + ("-dirty" if dirty else "")
+
+def save_results(results, path=None, seed=0):
+    """측정 결과를 커밋 / 환경 정보와 함께 JSON 으로 저장 (기본 경로: bench_results/<커밋>.json)"""
+    commit = git_commit()
+    path = path or os.path.join(results_dir, f"{commit}.json")
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    report = {
+        "commit": commit,
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "seed": seed,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "machine": f"{platform.system()} {platform.machine()} ({os.cpu_count()} CPU)",
+        "results": results,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    return path
+
+def compare_results(base_path, new_path, threshold=1.25, floor=0.001):
+    """두 JSON 결과를 (name, size) 별로 비교해서 threshold 배 이상 느려진 항목 목록 반환
+
+    floor 초보다 짧은 측정은 floor 로 보고 비교 (아주 짧은 측정의 잡음으로 회귀를 잘못 잡지 않도록)
+    """
+    with open(base_path, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(new_path, encoding="utf-8") as f:
+        new = json.load(f)
+    before = {(row["name"], row["size"]): row["seconds"] for row in base["results"]}
+
+    print(f"[벤치마크 비교] {base['commit']} → {new['commit']} (느려짐 기준 {threshold:.2f}배)")
+    regressions = []
+    for row in new["results"]:
+        old = before.get((row["name"], row["size"]))
+        if old is None:
+            continue
+        ratio = max(row["seconds"], floor) / max(old, floor)
+        flag = ""
+        if ratio >= threshold:
+            flag = "  ⚠️ 느려짐"
+            regressions.append({**row, "before": old, "ratio": ratio})
+        elif ratio <= 1 / threshold:
+            flag = "  ✅ 빨라짐"
+        print(f"    {row['name']:<22} {row['size']:>12,} {row['unit']:<7} "
+              f"{old * 1000:>10.3f}ms → {row['seconds'] * 1000:>10.3f}ms  x{ratio:.2f}{flag}")
+    return regressions
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="코인봇 벤치마크 (인자 없이 실행하면 전체 비교 벤치마크 출력)")
+    commands = parser.add_subparsers(dest="command")
+    suite = commands.add_parser("suite", help="크기별 측정 결과를 JSON 으로 저장")
+    suite.add_argument("--max-size", type=int, default=10**7)
+    suite.add_argument("--seed", type=int, default=0)
+    suite.add_argument("--repeat", type=int, default=5)
+    suite.add_argument("--out", help="저장 경로 (기본: bench_results/<커밋>.json)")
+    compare = commands.add_parser("compare", help="두 JSON 결과 비교, 느려진 항목이 있으면 종료 코드 1")
+    compare.add_argument("base")
+    compare.add_argument("new")
+    compare.add_argument("--threshold", type=float, default=1.25)
+    check = commands.add_parser("check", help="오프라인 정확성 검사, 실패하면 종료 코드 1")
+    check.add_argument("--fixtures", help="resampler.main() 이 기록한 봉 디렉터리 (기본: 모의 거래소로 만든 기록)")
+    return parser.parse_args(argv)
+
+def main():
+    run_checks()
+    bench_backtest(1080)
+    bench_backtest(1_000_000)
+    bench_indicators()
+    bench_indicator_cache()
+    bench_scanner()
+    bench_http_client()
+    bench_exit_engine()
+    bench_notifier()
+    bench_journal()
+    bench_positions()
+    bench_intrabar()
+    bench_metrics()
+    bench_scheduler()
+    bench_ledger()
+    bench_screener()
+    print("[모의 투자] 호출 지연 50ms, 연결 오류 2%, 100배속 재생")
+    bench_paper()
+    print("[샤드] 티커 80개, 호출 지연 50ms, 예산 1,000,000원")
+    bench_shards()
+    print("[시작 시간] 티커 10개, 봉 / 잔고 / 주문 호출 지연 50ms")
+    bench_startup()
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.command == "suite":
+        print(f"[벤치마크 묶음] 최대 {args.max_size:,} 봉, seed {args.seed}")
+        results = run_suite(max_size=args.max_size, seed=args.seed, repeat=args.repeat)
+        print("저장 ......", save_results(results, args.out, seed=args.seed))
+    elif args.command == "compare":
+        sys.exit(1 if compare_results(args.base, args.new, args.threshold) else 0)
+    elif args.command == "check":
+        sys.exit(0 if run_checks(args.fixtures) else 1)
+    else:
+        main()
@@ -0,0 +1,136 @@
+import datetime
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+# 봉 하나를 고정 크기 레코드로 저장 (시각은 datetime64[ns] 정수값, KST 기준)
+candle_dtype = np.dtype([
+    ('time', 'i8'),
+    ('open', 'f8'),
+    ('high', 'f8'),
+    ('low', 'f8'),
+    ('close', 'f8'),
+    ('volume', 'f8'),
+    ('value', 'f8'),
+])
+columns = ['open', 'high', 'low', 'close', 'volume', 'value']
+
+interval_minutes = {
+    "minute1": 1, "minute3": 3, "minute5": 5, "minute10": 10, "minute15": 15,
+    "minute30": 30, "minute60": 60, "minute240": 240,
+    "day": 1440, "week": 10080, "month": 44640,
+}
+
+kst = datetime.timezone(datetime.timedelta(hours=9))  # 업비트 봉 시각 기준 (서머타임 없음)
+
+def kst_now():
+    """현재 KST 시각 (tz 없는 datetime, 저장된 봉 시각과 같은 기준), 서버 시간대가 UTC 여도 같은 값"""
+    return datetime.datetime.now(kst).replace(tzinfo=None)
+
+class CandleStore:
+    """(ticker, interval) 별 OHLCV 봉을 디스크에 저장하고 새 봉만 받아오는 저장소
+
+    파일은 candle_dtype 레코드를 이어 붙인 바이너리이며 np.memmap 으로 읽음.
+    마지막 봉은 아직 진행 중일 수 있으므로 동기화 때마다 다시 받아 덮어씀.
+    """
+    def __init__(self, root="candles", fetcher=None, now=None):
+        self.root = root
+        if fetcher is None:
+            import pyupbit  # 저장된 봉만 읽을 때는 불러오지 않음
+            fetcher = pyupbit.get_ohlcv
+        self.fetcher = fetcher
+        self.now = now or kst_now
+        self.lock = threading.Lock()
+        self.key_locks = {}  # (ticker, interval) 별 잠금, 서로 다른 티커는 동시에 동기화 가능
+        self.file_locks = {}  # (ticker, interval) 별 파일 잠금, 잘라내고 다시 쓰는 동안 get() 이 읽지 않도록 (거래소 조회 중에는 잡지 않음)
+        os.makedirs(root, exist_ok=True)
+
+    def key_lock(self, ticker, interval):
+        with self.lock:
+            return self.key_locks.setdefault((ticker, interval), threading.Lock())
+
+    def file_lock(self, ticker, interval):
+        with self.lock:
+            return self.file_locks.setdefault((ticker, interval), threading.Lock())
+
+    def path(self, ticker, interval):
+        return os.path.join(self.root, f"{ticker}_{interval}.bin")
+
+    def load(self, ticker, interval):
+        """저장된 전체 봉을 memmap 레코드 배열로 반환 (네트워크 사용 안 함)"""
+        path = self.path(ticker, interval)
+        if not os.path.exists(path) or os.path.getsize(path) < candle_dtype.itemsize:
+            return np.empty(0, dtype=candle_dtype)
+        count = os.path.getsize(path) // candle_dtype.itemsize
+        return np.memmap(path, dtype=candle_dtype, mode='r', shape=(count,))
+
+    def sync(self, ticker, interval, count=200, since=None):
+        """마지막으로 저장된 봉 이후의 봉만 받아와 저장, 새로 추가된 봉 개수 반환
+
+        since 를 주면 그 시각부터 봉이 있어야 함: 저장된 첫 봉이 since 보다 뒤면 since 부터 지금까지 다시 받음
+        """
+        step = pd.Timedelta(minutes=interval_minutes[interval])
+        with self.key_lock(ticker, interval):
+            stored = self.load(ticker, interval)
+
+            if len(stored) and (since is None or stored['time'][0] <= pd.Timestamp(since).value):
+                last_time = pd.Timestamp(int(stored['time'][-1]))
+                elapsed = (pd.Timestamp(self.now()) - last_time) / step
+                fetch_count = max(int(elapsed), 0) + 1  # 진행 중이던 마지막 봉 포함
+            elif since is not None:
+                fetch_count = max(int((pd.Timestamp(self.now()) - pd.Timestamp(since)) / step), 0) + 1
+            else:
+                fetch_count = count
+
+            df = self.fetcher(ticker, interval=interval, count=fetch_count)
+            if df is None or df.empty:
+                return 0
+
+            records = to_records(df)
+            # 새로 받은 첫 봉 이후로 저장된 봉은 잘라내고 덮어씀
+            keep = int(np.searchsorted(stored['time'], records['time'][0], side='left')) if len(stored) else 0
+            added = len(records) - (len(stored) - keep)
+            del stored
+
+            path = self.path(ticker, interval)
+            with self.file_lock(ticker, interval), open(path, "ab") as f:
+                f.truncate(keep * candle_dtype.itemsize)
+                f.write(records.tobytes())
+            return added
+
+    def get(self, ticker, interval, start=None, end=None, count=None):
+        """저장된 봉에서 [start, end] 구간 (또는 마지막 count 개)을 DataFrame 으로 반환
+
+        sync() 가 파일 끝을 잘라내고 다시 쓰는 중에는 기다림, memmap 은 잠금 안에서 복사까지 끝냄
+        """
+        with self.file_lock(ticker, interval):
+            stored = self.load(ticker, interval)
+            times = stored['time']
+            lo = 0 if start is None else int(np.searchsorted(times, pd.Timestamp(start).value, side='left'))
+            hi = len(stored) if end is None else int(np.searchsorted(times, pd.Timestamp(end).value, side='right'))
+            if count is not None:
+                lo = max(lo, hi - count)
+            return to_frame(stored[lo:hi])
+
+    def get_ohlcv(self, ticker, interval="day", count=200):
+        """pyupbit.get_ohlcv 대신 사용: 새 봉만 동기화한 뒤 마지막 count 개를 반환"""
+        try:
+            self.sync(ticker, interval, count=count)
+        except Exception as e:
+            print(f"[{ticker}] {interval} 봉 동기화 실패, 저장된 봉 사용: {e}")
+
+        df = self.get(ticker, interval, count=count)
+        return df if len(df) else None
+
+def to_records(df):
+    records = np.empty(len(df), dtype=candle_dtype)
+    records['time'] = pd.DatetimeIndex(df.index).as_unit('ns').asi8
+    for col in columns:
+        records[col] = df[col].to_numpy(dtype=np.float64) if col in df else np.nan
+    return records
+
+def to_frame(records):
+    index = pd.DatetimeIndex(np.asarray(records['time']).astype('datetime64[ns]'))
+    return pd.DataFrame({col: np.array(records[col]) for col in columns}, index=index)
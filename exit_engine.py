@@ -0,0 +1,113 @@
+import asyncio
+import json
+import threading
+import time
+import uuid
+
+import websockets
+
+from metrics import LatencyHistogram
+
+upbit_ws_url = "wss://api.upbit.com/websocket/v1"
+kst_offset = 9 * 3600 * 10**9  # 체결 시각(UTC ms) → KST ns
+
+class ExitEngine:
+    """실시간 체결 스트림을 구독하고 익절/손절 가격을 넘는 체결이 오면 즉시 on_exit 호출
+
+    on_exit(ticker, target_price, trade_price, received_at) 는 스트림 스레드에서 호출되므로 오래 걸리는 작업은 넘겨서 처리해야 함
+    (received_at 은 clock 기준 체결 수신 시각, 매도 주문을 다른 스레드에서 내면 그쪽에서 체결→주문 지연을 잴 때 사용)
+    """
+    def __init__(self, on_exit, url=upbit_ws_url, clock=time.perf_counter, on_trade=None):
+        self.on_exit = on_exit
+        self.on_trade = on_trade  # on_trade(ticker, 시각(KST ns), 체결가, 체결량), 체결로 1분봉을 만들 때 사용
+        self.url = url
+        self.clock = clock
+        self.levels = {}  # ticker -> (익절가, 손절가)
+        self.lock = threading.Lock()
+        self.latency = LatencyHistogram()  # 체결 수신 → on_exit 반환까지 (on_exit 가 주문까지 내면 체결→주문 시간)
+
+        self.codes = []
+        self.running = False
+        self.thread = None
+        self.loop = None
+        self.ws = None
+
+    def set_levels(self, ticker, buy_price, take_profit_ratio, stop_loss_ratio):
+        with self.lock:
+            self.levels[ticker] = (buy_price * take_profit_ratio, buy_price * stop_loss_ratio)
+
+    def remove(self, ticker):
+        with self.lock:
+            self.levels.pop(ticker, None)
+
+    def on_tick(self, ticker, price, received_at=None):
+        """체결 하나를 처리, 매도를 호출했으면 True"""
+        received_at = self.clock() if received_at is None else received_at
+        with self.lock:
+            level = self.levels.get(ticker)
+            if level is None:
+                return False
+
+            take_profit, stop_loss = level
+            if price >= take_profit:
+                target = take_profit
+            elif price <= stop_loss:
+                target = stop_loss
+            else:
+                return False
+
+            # 같은 포지션을 두 번 매도하지 않도록 먼저 제거
+            del self.levels[ticker]
+
+        try:
+            self.on_exit(ticker, target, price, received_at)
+        except Exception as e:
+            print(f"[{ticker}] 매도 호출 중 오류: {e}")
+        self.latency.observe(self.clock() - received_at)
+        return True
+
+    def start(self, codes):
+        if self.running:
+            return
+        self.codes = list(codes)
+        self.running = True
+        self.thread = threading.Thread(target=lambda: asyncio.run(self._run()), daemon=True)
+        self.thread.start()
+
+    def update_codes(self, codes):
+        """감시할 티커 목록 변경 (실행 중이면 다시 연결해서 새 목록으로 구독)"""
+        codes = list(codes)
+        if codes == self.codes:
+            return
+        self.codes = codes
+        if self.running and self.loop is not None and self.ws is not None:
+            asyncio.run_coroutine_threadsafe(self.ws.close(), self.loop)
+
+    def stop(self):
+        self.running = False
+        if self.loop is not None and self.ws is not None:
+            asyncio.run_coroutine_threadsafe(self.ws.close(), self.loop)
+
+    async def _run(self):
+        self.loop = asyncio.get_running_loop()
+        while self.running:
+            try:
+                async with websockets.connect(self.url, ping_interval=60) as ws:
+                    self.ws = ws
+                    await ws.send(json.dumps([
+                        {"ticket": str(uuid.uuid4())[:6]},
+                        {"type": "trade", "codes": self.codes, "isOnlyRealtime": True},
+                    ]))
+                    async for message in ws:
+                        received_at = self.clock()
+                        data = json.loads(message)
+                        self.on_tick(data['code'], float(data['trade_price']), received_at)
+                        if self.on_trade is not None:
+                            self.on_trade(data['code'], data['trade_timestamp'] * 10**6 + kst_offset,
+                                          float(data['trade_price']), float(data['trade_volume']))
+            except Exception as e:
+                if self.running:
+                    print(f"체결 스트림 연결 끊김, 재연결 시도: {e}")
+                    await asyncio.sleep(1)
+            finally:
+                self.ws = None
@@ -0,0 +1,156 @@
+import random
+import re
+import threading
+import time
+from urllib.parse import urlsplit
+
+remaining_req_pattern = re.compile(r"group=([a-z\-]+); min=([0-9]+); sec=([0-9]+)")
+
+def parse_remaining_req(header):
+    """'group=market; min=573; sec=9' → ('market', 9), 형식이 다르면 None"""
+    matched = remaining_req_pattern.search(header or "")
+    if matched is None:
+        return None
+    return matched.group(1), int(matched.group(3))
+
+class RateLimiter:
+    """업비트 Remaining-Req 헤더로 그룹별 (market, candles, order ...) 이번 1초에 남은 요청 수를 추적
+
+    - 1초 구간마다 요청 하나를 먼저 보내고 (probe) 그 응답 헤더의 남은 수만큼만 같은 구간에 더 보냄
+    - 응답을 기다리지 않고 보낼 때마다 남은 수를 미리 차감하고, 늦게 온 헤더는 더 작을 때만 반영
+    - probe 응답의 남은 수에서는 아직 응답이 안 온 다른 요청 수를 빼서 구간 경계에 걸친 요청도 셈
+    - 남은 수가 0 이면 구간이 끝날 때까지 대기 (구간은 probe 응답 시각부터 세므로 서버 구간보다 늦게 끝남)
+    요청 경로가 어느 그룹인지는 첫 응답의 헤더로 알게 되므로 그 전까지는 기다리지 않음.
+    """
+    def __init__(self, clock=time.monotonic, sleep=time.sleep, poll=0.002):
+        self.clock = clock
+        self.sleep = sleep
+        self.poll = poll
+        self.route_groups = {}  # (method, path) -> group
+        self.groups = {}        # group -> [남은 요청 수 (probe 응답 전이면 None), 구간 시작 시각]
+        self.inflight = {}      # (method, path) -> 응답을 기다리는 요청 수
+        self.waits = 0
+        self.lock = threading.Lock()
+
+    def acquire(self, route):
+        while True:
+            with self.lock:
+                group = self.route_groups.get(route)
+                state = self.groups.get(group)
+                now = self.clock()
+                if group is None or state is None or now - state[1] >= 1.0:
+                    if group is not None:
+                        self.groups[group] = [None, now]  # 새 구간의 probe
+                    self.inflight[route] = self.inflight.get(route, 0) + 1
+                    return
+                if state[0] is None:
+                    wait = self.poll  # probe 응답 대기
+                elif state[0] > 0:
+                    state[0] -= 1
+                    self.inflight[route] = self.inflight.get(route, 0) + 1
+                    return
+                else:
+                    wait = state[1] + 1.0 - now
+                self.waits += 1
+            self.sleep(wait)
+
+    def update(self, route, header=None):
+        """요청이 끝날 때마다 호출 (실패했으면 header=None)"""
+        parsed = parse_remaining_req(header)
+        with self.lock:
+            self.inflight[route] -= 1
+            if parsed is None:
+                return
+            group, remaining = parsed
+            self.route_groups[route] = group
+            state = self.groups.get(group)
+            if state is None:
+                return  # 그룹을 처음 알게 된 응답, 다음 요청부터 probe 로 시작
+            if state[0] is None:
+                inflight = sum(count for r, count in self.inflight.items() if self.route_groups.get(r, group) == group)
+                state[:] = [max(0, remaining - inflight), self.clock()]  # 구간은 probe 가 서버에 도착한 뒤부터 시작
+            else:
+                state[0] = min(state[0], remaining)
+
+class HttpClient:
+    """봇 전체 (매수 루프, 매도 스레드, 실시간 매도, 슬랙 전송) 가 함께 쓰는 HTTP 클라이언트
+
+    - keep-alive 연결 풀을 재사용하여 요청마다 TCP / TLS 연결을 새로 맺지 않음
+    - Remaining-Req 헤더 기준으로 그룹별 요청 한도를 지킴 (RateLimiter)
+    - 429 / 연결 실패 / 5xx 는 지터를 준 지수 백오프로 재시도.
+      단 주문 같은 POST / DELETE 는 서버에 도달하지 않은 게 확실한 경우 (연결 시간 초과, 429) 에만 재시도
+    """
+    def __init__(self, pool_size=16, retries=3, backoff=0.2, timeout=10, limiter=None, session=None):
+        self.pool_size = pool_size
+        self.session = session  # 없으면 첫 요청 때 생성 (requests 를 import 할 때 기다리지 않도록)
+        self.limiter = limiter or RateLimiter()
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.request_count = 0
+        self.retry_count = 0
+        self.lock = threading.Lock()
+
+    def connect(self):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        with self.lock:
+            if self.session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.pool_size, max_retries=0)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                self.session = session
+        return self.session
+
+    def request(self, method, url, **kwargs):
+        import requests
+
+        session = self.session or self.connect()
+        method = method.upper()
+        route = (method, urlsplit(url).path)
+        idempotent = method in ("GET", "HEAD")
+        kwargs.setdefault("timeout", self.timeout)
+
+        for attempt in range(self.retries + 1):
+            self.limiter.acquire(route)
+            with self.lock:
+                self.request_count += 1
+            try:
+                resp = session.request(method, url, **kwargs)
+            except requests.RequestException as e:
+                self.limiter.update(route)
+                if attempt == self.retries or not (idempotent or isinstance(e, requests.ConnectTimeout)):
+                    raise
+                print(f"HTTP 요청 실패, 재시도 ({attempt + 1}회): {method} {route[1]} / {e}")
+            else:
+                self.limiter.update(route, resp.headers.get("Remaining-Req"))
+                retryable = resp.status_code == 429 or (idempotent and resp.status_code >= 500)
+                if not retryable or attempt == self.retries:
+                    return resp
+
+            with self.lock:
+                self.retry_count += 1
+            time.sleep(self.backoff * 2 ** attempt * random.uniform(0.5, 1.5))
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request("DELETE", url, **kwargs)
+
+    def install_pyupbit(self):
+        """pyupbit 의 모든 REST 호출 (시세 / 잔고 / 주문) 이 이 클라이언트를 거치도록 연결
+
+        pyupbit 는 요청마다 requests.get / post / delete 를 직접 호출하므로 내부 호출 함수를 바꿔 끼움
+        """
+        from pyupbit import request_api
+        from pyupbit.errors import error_handler
+
+        request_api._call_get = error_handler(lambda url, **kwargs: self.get(url, **kwargs))
+        request_api._call_post = error_handler(lambda url, **kwargs: self.post(url, **kwargs))
+        request_api._call_delete = error_handler(lambda url, **kwargs: self.delete(url, **kwargs))
@@ -0,0 +1,210 @@
+import hashlib
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from indicators import sma_values, rsi_values
+
+cache_max_bytes = 256 * 2**20  # 메모리에 두는 봉 / 지표 배열 합계, 넘으면 오래 안 쓴 것부터 내보냄
+cache_spill_dir = None         # 예: "indicator_cache" 로 지정하면 내보낸 배열을 디스크에 두고 다음에 (다른 프로세스도) 다시 읽음
+
+# 이름 -> (계산 함수, 앞쪽 NaN 개수), 새 봉만 이어서 계산할 때 그만큼 앞 봉을 함께 넘김
+indicator_funcs = {
+    "sma": (sma_values, lambda window=20: window - 1),
+    "rsi": (rsi_values, lambda period=14: period),
+}
+
+class CachedBars:
+    """같은 봉 데이터 (시각, 종가) 하나와 그걸로 계산한 지표 배열들"""
+    __slots__ = ('times', 'close', 'series', 'nbytes')
+
+    def __init__(self, times, close, series=None):
+        self.times = times
+        self.close = close
+        self.series = series or {}  # (지표 이름, 파라미터) -> 배열
+        self.nbytes = times.nbytes + close.nbytes + sum(values.nbytes for values in self.series.values())
+
+def bar_times(index):
+    """(봉 시각 정수 배열, 단위), 단위를 바꾸면 배열을 복사하므로 저장된 단위 그대로 사용"""
+    index = pd.DatetimeIndex(index)
+    return index.asi8, str(index.dtype)
+
+def fingerprint(closes):
+    """종가 합과 이웃한 종가 곱의 합 (순서가 바뀌어도 달라짐), 전체 해시보다 수십 배 빠름"""
+    return np.array([closes.sum(), np.dot(closes[1:], closes[:-1])]).tobytes()
+
+def readonly(array):
+    array.flags.writeable = False
+    return array
+
+class IndicatorCache:
+    """(ticker, interval, 첫 / 마지막 봉 시각, 봉 수, 종가 fingerprint) 별로 계산한 지표 배열을 보관하고 같은 요청에 그대로 돌려줌
+
+    - 파라미터 조합마다 백테스트를 새로 만들어도 같은 봉의 MA20 / RSI 는 한 번만 계산 (반환 배열은 읽기 전용)
+    - 메모리 합계가 max_bytes 를 넘으면 가장 오래 안 쓴 봉 데이터부터 내보내고, spill_dir 이 있으면 디스크에 써 둠
+    - 같은 (ticker, interval) 의 이전 데이터에 새 봉이 붙은 경우 겹치는 봉을 비교해서 같으면 새 봉만 이어서 계산
+      (이전 데이터의 마지막 봉은 진행 중이었을 수 있으므로 다시 계산, 전체 계산과는 마지막 자리 정도의 오차)
+    """
+    def __init__(self, max_bytes=cache_max_bytes, spill_dir=cache_spill_dir):
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir
+        self.frames = OrderedDict()  # key -> CachedBars, 앞쪽일수록 오래 안 쓴 것
+        self.latest = {}             # (ticker, interval, 지표) -> 마지막으로 계산한 key (새 봉 이어 계산용)
+        self.nbytes = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.extends = 0
+        self.misses = 0
+        self.evictions = 0
+        if spill_dir is not None:
+            os.makedirs(spill_dir, exist_ok=True)
+
+    def get(self, df, name, ticker=None, interval=None, **params):
+        """df['close'] 로 계산한 name 지표 배열 (indicator_funcs 의 함수와 같은 값)"""
+        func, warmup = indicator_funcs[name]
+        warmup = warmup(**params)
+        close = df['close']
+        closes = close.to_numpy(dtype=np.float64)
+        if not len(closes):
+            return func(close, **params)
+        times, unit = bar_times(df.index)
+        key = (ticker, interval, unit, int(times[0]), int(times[-1]), len(times), fingerprint(closes))
+        series_key = (name, tuple(sorted(params.items())))
+
+        with self.lock:
+            frame, from_disk = self._lookup(key)
+            if frame is not None and series_key in frame.series:
+                if from_disk:
+                    self.disk_hits += 1
+                else:
+                    self.hits += 1
+                return frame.series[series_key]
+            base = self.frames.get(self.latest.get((ticker, interval, series_key)))
+
+        values = self._extend(base, series_key, func, warmup, params, close, closes, times)
+        if values is None:
+            values = func(close, **params)
+            extended = False
+        else:
+            extended = True
+        values = readonly(values)
+
+        with self.lock:
+            if extended:
+                self.extends += 1
+            else:
+                self.misses += 1
+            frame = self.frames.get(key)
+            if frame is None:
+                frame = CachedBars(readonly(times.copy()), readonly(closes.copy()))
+                self.frames[key] = frame
+                self.nbytes += frame.nbytes
+            if series_key not in frame.series:
+                frame.series[series_key] = values
+                frame.nbytes += values.nbytes
+                self.nbytes += values.nbytes
+            self.latest[(ticker, interval, series_key)] = key
+            self._evict()
+        return values
+
+    def _lookup(self, key):
+        """(메모리 또는 spill_dir 에 있는 CachedBars, 디스크에서 읽었는지)"""
+        frame = self.frames.get(key)
+        if frame is not None:
+            self.frames.move_to_end(key)
+            return frame, False
+        if self.spill_dir is None:
+            return None, False
+        try:
+            with open(self.spill_path(key), "rb") as f:
+                times, close, series = pickle.load(f)
+        except FileNotFoundError:
+            return None, False
+        except Exception as e:
+            print(f"⚠️ 지표 캐시 파일을 읽을 수 없어 다시 계산합니다: {e}")
+            return None, False
+        frame = CachedBars(readonly(times), readonly(close), {k: readonly(v) for k, v in series.items()})
+        self.frames[key] = frame
+        self.nbytes += frame.nbytes
+        self._evict()
+        return frame, True
+
+    @staticmethod
+    def _extend(base, series_key, func, warmup, params, close, closes, times):
+        """base 에 이미 계산된 지표를 겹치는 봉만큼 재사용하고 뒤쪽 봉만 계산, 이어 붙일 수 없으면 None"""
+        if base is None or series_key not in base.series:
+            return None
+        start = int(np.searchsorted(base.times, times[0]))
+        if start >= len(base.times) or base.times[start] != times[0]:
+            return None
+        overlap = min(len(base.times) - start - 1, len(times))  # 이전 데이터의 마지막 봉은 진행 중이었을 수 있음
+        if overlap <= warmup or not (np.array_equal(base.times[start:start + overlap], times[:overlap]) and
+                                     np.array_equal(base.close[start:start + overlap], closes[:overlap], equal_nan=True)):
+            return None
+        tail = func(close.iloc[overlap - warmup:], **params)[warmup:]
+        values = np.concatenate((base.series[series_key][start:start + overlap], tail))
+        values[:warmup] = np.nan  # 잘린 앞부분은 이 데이터만으로 계산할 때처럼 NaN
+        return values
+
+    def _evict(self):
+        while self.nbytes > self.max_bytes and self.frames:
+            key, frame = self.frames.popitem(last=False)
+            self.nbytes -= frame.nbytes
+            self.evictions += 1
+            if self.spill_dir is not None:
+                self._spill(key, frame)
+
+    def _spill(self, key, frame):
+        path = self.spill_path(key)
+        tmp_path = path + ".tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                pickle.dump((frame.times, frame.close, frame.series), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"⚠️ 지표 캐시를 디스크에 쓰지 못했습니다: {e}")
+
+    def spill_path(self, key):
+        name = hashlib.blake2b(repr(key).encode(), digest_size=16).hexdigest()
+        return os.path.join(self.spill_dir, name + ".pkl")
+
+    def clear(self):
+        """메모리와 디스크의 저장분을 모두 비움 (통계는 유지)"""
+        with self.lock:
+            self.frames.clear()
+            self.latest.clear()
+            self.nbytes = 0
+            if self.spill_dir is not None:
+                for name in os.listdir(self.spill_dir):
+                    if name.endswith(".pkl"):
+                        os.remove(os.path.join(self.spill_dir, name))
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.disk_hits + self.extends + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "extends": self.extends,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "frames": len(self.frames),
+                "series": sum(len(frame.series) for frame in self.frames.values()),
+                "bytes": self.nbytes,
+            }
+
+    def summary(self):
+        s = self.stats()
+        return (f"지표 캐시: 적중 {s['hits']:,} (디스크 {s['disk_hits']:,}) / 이어 계산 {s['extends']:,} / "
+                f"계산 {s['misses']:,} (적중률 {s['hit_rate'] * 100:.1f}%) | 봉 데이터 {s['frames']:,}개, "
+                f"지표 {s['series']:,}개, {s['bytes'] / 2**20:,.2f}MB / {self.max_bytes / 2**20:,.0f}MB "
+                f"(내보냄 {s['evictions']:,})")
+
+# 실거래 봇 / 백테스트 / 파라미터 탐색이 같은 프로세스에서 함께 쓰는 캐시
+shared_cache = IndicatorCache()
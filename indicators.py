@@ -0,0 +1,151 @@
+import math
+from collections import deque
+
+import numpy as np
+
+def get_rsi(df, period=14):
+    delta = df['close'].diff()
+    gain = delta.clip(lower=0)
+    loss = -delta.clip(upper=0)
+    avg_gain = gain.rolling(window=period).mean()
+    avg_loss = loss.rolling(window=period).mean()
+    rs = avg_gain / avg_loss
+    return 100 - (100 / (1 + rs))
+
+def sma_values(close, window=20):
+    """close (Series) 의 단순 이동평균 배열, 앞의 window - 1 개는 NaN"""
+    return close.rolling(window=window).mean().to_numpy(dtype=np.float64)
+
+def rsi_values(close, period=14):
+    """get_rsi 와 같은 RSI 배열, 앞의 period 개는 NaN"""
+    delta = close.diff()
+    avg_gain = delta.clip(lower=0).rolling(window=period).mean()
+    avg_loss = (-delta.clip(upper=0)).rolling(window=period).mean()
+    return (100 - (100 / (1 + avg_gain / avg_loss))).to_numpy(dtype=np.float64)
+
+class RollingSum:
+    """고정 길이 윈도우의 합을 봉 하나당 O(1)로 갱신"""
+    def __init__(self, window):
+        self.window = window
+        self.values = deque(maxlen=window)
+        self.total = 0.0
+        self.nonzero = 0  # 윈도우가 전부 0 일 때 누적 오차 없이 정확히 0 을 돌려주기 위함
+        self.pushes = 0
+
+    def push(self, value):
+        if len(self.values) == self.window:
+            old = self.values[0]
+            self.total -= old
+            self.nonzero -= old != 0
+        self.values.append(value)
+        self.total += value
+        self.nonzero += value != 0
+
+        # 빼기를 반복하며 쌓이는 오차를 윈도우 길이마다 한 번씩 정리 (분할 상환 O(1))
+        self.pushes += 1
+        if self.pushes % self.window == 0:
+            self.total = math.fsum(self.values)
+
+    def mean(self, value=None):
+        """윈도우 평균. value 를 주면 그 값이 추가됐을 때의 평균 (상태는 바꾸지 않음)"""
+        total, nonzero, count = self.total, self.nonzero, len(self.values)
+        if value is not None:
+            if count == self.window:
+                old = self.values[0]
+                total -= old
+                nonzero -= old != 0
+            else:
+                count += 1
+            total += value
+            nonzero += value != 0
+
+        if count < self.window:
+            return math.nan
+        return total / self.window if nonzero else 0.0
+
+class SMA:
+    """단순 이동평균 (df['close'].rolling(window).mean() 과 동일)"""
+    def __init__(self, window=20, history=()):
+        self.sum = RollingSum(window)
+        for close in history:
+            self.update(close)
+
+    def update(self, close):
+        self.sum.push(float(close))
+        return self.value
+
+    def peek(self, close):
+        return self.sum.mean(float(close))
+
+    @property
+    def value(self):
+        return self.sum.mean()
+
+class RSI:
+    """단순 이동평균 방식 RSI (get_rsi 와 동일)"""
+    def __init__(self, period=14, history=()):
+        self.gains = RollingSum(period)
+        self.losses = RollingSum(period)
+        self.prev_close = None
+        for close in history:
+            self.update(close)
+
+    def update(self, close):
+        close = float(close)
+        if self.prev_close is not None:
+            delta = close - self.prev_close
+            self.gains.push(max(delta, 0.0))
+            self.losses.push(max(-delta, 0.0))
+        self.prev_close = close
+        return self.value
+
+    def peek(self, close):
+        if self.prev_close is None:
+            return math.nan
+        delta = float(close) - self.prev_close
+        return self._rsi(self.gains.mean(max(delta, 0.0)), self.losses.mean(max(-delta, 0.0)))
+
+    @property
+    def value(self):
+        return self._rsi(self.gains.mean(), self.losses.mean())
+
+    @staticmethod
+    def _rsi(avg_gain, avg_loss):
+        if math.isnan(avg_gain) or math.isnan(avg_loss):
+            return math.nan
+        if avg_loss == 0:
+            return 100.0 if avg_gain > 0 else math.nan
+        return 100 - (100 / (1 + avg_gain / avg_loss))
+
+class IndicatorState:
+    """티커 하나의 MA20 / RSI 를 마감된 봉 기준으로 유지
+
+    update(df) 는 df 의 마지막 행을 진행 중인 봉으로 보고, 그 이전의 새로 마감된 봉만 반영한 뒤
+    진행 중인 봉의 종가를 포함한 (rsi, ma20) 을 반환함.
+    """
+    def __init__(self, ma_window=20, rsi_period=14):
+        self.ma_window = ma_window
+        self.rsi_period = rsi_period
+        self.last_time = None
+        self.sma = None
+        self.rsi = None
+
+    def seed(self, df):
+        closed = df.iloc[:-1]
+        self.sma = SMA(self.ma_window, closed['close'])
+        self.rsi = RSI(self.rsi_period, closed['close'])
+        self.last_time = closed.index[-1] if len(closed) else None
+
+    def update(self, df):
+        closed = df.iloc[:-1]
+        if self.last_time is None or self.last_time not in closed.index:
+            # 처음이거나 봉이 이어지지 않으면 과거 데이터로 다시 초기화
+            self.seed(df)
+        else:
+            for close in closed.loc[closed.index > self.last_time, 'close']:
+                self.sma.update(close)
+                self.rsi.update(close)
+            self.last_time = closed.index[-1]
+
+        close = df['close'].iloc[-1]
+        return self.rsi.peek(close), self.sma.peek(close)
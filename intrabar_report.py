@@ -0,0 +1,84 @@
+import time
+
+import pandas as pd
+
+from backtesting import CustomBackTest
+from candle_store import CandleStore
+
+def compare(data, params, start_cash=1_000_000, fee=0.0005):
+    """티커별로 optimistic (한 봉에 익절/손절이 모두 있으면 익절) 과 intrabar (1분봉으로 판단) 결과 비교
+
+    data: ticker -> (4시간봉 df, 1분봉 df), params: ticker -> CustomBackTest 전략 파라미터
+    """
+    rows = []
+    for ticker, (df, minute_df) in data.items():
+        results = {}
+        for mode in ("optimistic", "intrabar"):
+            backtest = CustomBackTest(df, start_cash=start_cash, fee=fee, minute_df=minute_df, **params[ticker])
+            backtest.execute_vectorized(name=ticker, verbose=False, exit_mode=mode)
+            results[mode] = backtest
+
+        info = results["intrabar"].exit_info
+        optimistic, intrabar = results["optimistic"], results["intrabar"]
+        rows.append({
+            "ticker": ticker,
+            "trades": optimistic.trade_count,
+            "ambiguous": info['ambiguous'],
+            "stop_first": info['stop_first'],
+            "unresolved": info['unresolved'],
+            "ror_optimistic": optimistic.accumulated_ror,
+            "ror_intrabar": intrabar.accumulated_ror,
+            "ror_diff": intrabar.accumulated_ror - optimistic.accumulated_ror,
+            "win_rate_optimistic": optimistic.win_count / optimistic.trade_count * 100 if optimistic.trade_count else 0.0,
+            "win_rate_intrabar": intrabar.win_count / intrabar.trade_count * 100 if intrabar.trade_count else 0.0,
+        })
+    return pd.DataFrame(rows)
+
+def report(table, elapsed=None):
+    print("=" * 60)
+    print("📊 익절/손절 판단 방식별 백테스트 비교 (optimistic → intrabar)")
+    print("-" * 60)
+    for row in table.itertuples():
+        print(f"[{row.ticker}] 거래 {row.trades}회, 한 봉에 익절/손절 모두 {row.ambiguous}회 → 손절 먼저 {row.stop_first}회"
+              + (f" (판단 불가 {row.unresolved}회)" if row.unresolved else ""))
+        print(f"    누적 수익률 {row.ror_optimistic:.4f} → {row.ror_intrabar:.4f} ({row.ror_diff:+.4f}) | "
+              f"승률 {row.win_rate_optimistic:.2f}% → {row.win_rate_intrabar:.2f}%")
+    if len(table):
+        print("-" * 60)
+        print(f"평균 누적 수익률 변화 : {table['ror_diff'].mean():+.4f}")
+    if elapsed is not None:
+        print(f"계산 시간 : {elapsed:.2f}초")
+    print("=" * 60)
+
+def main():
+    params = {
+        "KRW-BTC": {"risk_ratio": 1.0, "rsi_limit": 42, "take_profit_ratio": 1.15, "stop_loss_ratio": 0.97},
+        "KRW-ETH": {"risk_ratio": 1.0, "rsi_limit": 45, "take_profit_ratio": 1.10, "stop_loss_ratio": 0.95},
+        "KRW-XRP": {"risk_ratio": 1.0, "rsi_limit": 60, "take_profit_ratio": 1.15, "stop_loss_ratio": 0.92},
+        "KRW-SOL": {"risk_ratio": 1.0, "rsi_limit": 60, "take_profit_ratio": 1.10, "stop_loss_ratio": 0.93},
+        "KRW-DOGE": {"risk_ratio": 1.0, "rsi_limit": 60, "take_profit_ratio": 1.10, "stop_loss_ratio": 0.93},
+        "KRW-ADA": {"risk_ratio": 1.0, "rsi_limit": 60, "take_profit_ratio": 1.10, "stop_loss_ratio": 0.93},
+        "KRW-AVAX": {"risk_ratio": 1.0, "rsi_limit": 60, "take_profit_ratio": 1.10, "stop_loss_ratio": 0.93},
+        "KRW-LINK": {"risk_ratio": 1.0, "rsi_limit": 60, "take_profit_ratio": 1.10, "stop_loss_ratio": 0.93},
+        "KRW-DOT": {"risk_ratio": 1.0, "rsi_limit": 60, "take_profit_ratio": 1.10, "stop_loss_ratio": 0.93},
+        "KRW-AERGO": {"risk_ratio": 1.0, "rsi_limit": 99, "take_profit_ratio": 1.10, "stop_loss_ratio": 0.93},
+    }
+
+    # 4시간봉 3개월치 + 같은 기간 1분봉 (최초 실행 시에만 내려받고 이후에는 저장소에서 새 봉만 받음)
+    candles = CandleStore()
+    data = {}
+    for ticker in params:
+        print(f"=== {ticker} 데이터 로딩 중 ... ===")
+        df = candles.get_ohlcv(ticker, interval="minute240", count=540)
+        minute_df = candles.get_ohlcv(ticker, interval="minute1", count=60 * 24 * 90)
+        if df is None or df.empty or minute_df is None or minute_df.empty:
+            print(f"[{ticker}] 데이터가 없습니다.")
+            continue
+        data[ticker] = (df, minute_df)
+
+    started = time.perf_counter()
+    table = compare(data, params)
+    report(table, time.perf_counter() - started)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+import json
+import os
+import threading
+import time
+import zlib
+
+class PositionJournal:
+    """포지션 변경 이벤트(buy / average_up / sell / reset)를 파일 끝에 추가만 하는 로그
+
+    - 한 줄 = "crc32 json\\n", 쓰다가 죽어서 잘린 마지막 줄은 로드할 때 버리고 파일을 잘라냄
+    - buy / average_up 은 이벤트 후의 포지션 전체를, sell / reset 은 삭제를 기록하므로
+      같은 이벤트를 여러 번 재생해도 결과가 같음 (스냅샷 교체 직후 죽어도 안전)
+    - compact_every 개마다 현재 포지션을 스냅샷 파일(buy_log.json 형식)로 원자적으로 저장하고 로그를 비움
+    - sync=False 로 기록하면 fsync 를 sync_interval 초마다 한 번씩 모아서 수행
+    """
+    def __init__(self, snapshot_path="buy_log.json", path=None, compact_every=1000, sync_interval=0.05):
+        self.snapshot_path = snapshot_path
+        self.path = path or os.path.splitext(snapshot_path)[0] + ".journal"
+        self.compact_every = compact_every
+        self.sync_interval = sync_interval
+        self.positions = {}
+        self.events = 0
+        self.fd = None
+        self.dirty = False
+        self.last_sync = time.monotonic()
+        self.lock = threading.Lock()
+
+    def load(self):
+        """스냅샷을 읽고 로그를 재생하여 현재 포지션 dict 를 반환"""
+        with self.lock:
+            positions = {}
+            if os.path.exists(self.snapshot_path):
+                with open(self.snapshot_path, "r") as f:
+                    positions = json.load(f)
+
+            good_size = 0
+            events = 0
+            if os.path.exists(self.path):
+                with open(self.path, "rb") as f:
+                    data = f.read()
+                for line in data.splitlines(keepends=True):
+                    event = decode(line)
+                    if event is None:
+                        print(f"⚠️ 포지션 로그 손상 감지, {good_size} 바이트 이후 무시")
+                        break
+                    apply(positions, event)
+                    good_size += len(line)
+                    events += 1
+
+            self.fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+            os.ftruncate(self.fd, good_size)
+            self.positions = positions
+            self.events = events
+            return {ticker: dict(info) for ticker, info in positions.items()}
+
+    def record(self, kind, ticker, info=None, sync=True):
+        event = {"kind": kind, "ticker": ticker, "time": time.time()}
+        if info is not None:
+            event["info"] = info
+
+        with self.lock:
+            if self.fd is None:
+                raise RuntimeError("load() 를 먼저 호출해야 합니다")
+            os.write(self.fd, encode(event))
+            apply(self.positions, event)
+            self.events += 1
+            self.dirty = True
+
+            if sync or time.monotonic() - self.last_sync >= self.sync_interval:
+                self._sync()
+            if self.events >= self.compact_every:
+                self._compact()
+
+    def sync(self):
+        with self.lock:
+            self._sync()
+
+    def compact(self):
+        with self.lock:
+            self._compact()
+
+    def close(self):
+        with self.lock:
+            if self.fd is not None:
+                self._sync()
+                os.close(self.fd)
+                self.fd = None
+
+    def _sync(self):
+        if self.dirty:
+            os.fsync(self.fd)
+            self.dirty = False
+        self.last_sync = time.monotonic()
+
+    def _compact(self):
+        self._sync()
+        tmp_path = self.snapshot_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.positions, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+        fsync_dir(self.snapshot_path)
+
+        # 스냅샷이 안전하게 저장된 뒤에 로그를 비움
+        os.ftruncate(self.fd, 0)
+        os.fsync(self.fd)
+        self.events = 0
+
+def apply(positions, event):
+    if event["kind"] in ("buy", "average_up"):
+        positions[event["ticker"]] = dict(event["info"])
+    else:
+        positions.pop(event["ticker"], None)
+
+def encode(event):
+    payload = json.dumps(event, separators=(",", ":")).encode()
+    return b"%08x %s\n" % (zlib.crc32(payload), payload)
+
+def decode(line):
+    """정상 줄이면 이벤트 dict, 잘렸거나 손상된 줄이면 None"""
+    if not line.endswith(b"\n") or len(line) < 10:
+        return None
+    payload = line[9:-1]
+    try:
+        if int(line[:8], 16) != zlib.crc32(payload):
+            return None
+        return json.loads(payload)
+    except ValueError:
+        return None
+
+def fsync_dir(path):
+    try:
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
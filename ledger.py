@@ -0,0 +1,316 @@
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from candle_store import kst_now
+
+# 끝난 거래 하나의 열 구성 (시각은 datetime64[ns] 정수값, KST 기준, candle_store 와 같음)
+# 분석은 열 하나씩 훑으므로 열마다 따로 연속된 배열 / 파일로 저장
+trade_dtype = np.dtype([
+    ('entry_time', 'i8'),
+    ('exit_time', 'i8'),
+    ('ticker', 'i4'),        # TradeLedger.tickers 의 번호
+    ('buy_price', 'f8'),     # 평균 매수가
+    ('sell_price', 'f8'),
+    ('amount_krw', 'f8'),    # 투자금
+    ('sell_value', 'f8'),    # 매도 금액
+    ('fee', 'f8'),           # 매수 + 매도 수수료
+    ('profit', 'f8'),        # 순수익 = 매도 금액 - 투자금 - 수수료
+])
+day_ns = 86400 * 10**9
+
+def to_ns(value):
+    """datetime / 문자열 / ns 정수 → ns 정수"""
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    return pd.Timestamp(value).value
+
+def index_ns(index):
+    """DatetimeIndex → ns 정수 배열 (저장 단위의 정수값에 배수를 곱함, ns 로 나타낼 수 없는 시각이면 ValueError)"""
+    index = pd.DatetimeIndex(index)
+    scale = np.timedelta64(1, np.datetime_data(index.dtype)[0]) // np.timedelta64(1, 'ns')
+    values = index.asi8
+    if len(values) and max(values.max(), -values.min()) > np.iinfo(np.int64).max // scale:
+        raise ValueError(f"거래 장부는 ns 시각만 저장할 수 있습니다 ({index.min()} ~ {index.max()})")
+    return values * scale
+
+class Trades:
+    """열 이름 → 배열 묶음, trades['profit'] 은 열 하나, trades[mask] / trades[a:b] 는 같은 행만 고른 Trades"""
+    def __init__(self, columns):
+        self.columns = columns
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return self.columns[key]
+        return Trades({name: column[key] for name, column in self.columns.items()})
+
+    def __len__(self):
+        return len(self.columns['exit_time'])
+
+def empty_trades():
+    return Trades({name: np.empty(0, dtype=trade_dtype[name]) for name in trade_dtype.names})
+
+class TradeLedger:
+    """끝난 거래를 열별 배열로 쌓는 장부 (실거래 봇과 백테스트가 함께 사용)
+
+    - path (디렉터리) 를 주면 열마다 <열 이름>.bin 파일 끝에 추가만 하고 np.memmap 으로 읽음.
+      티커 이름은 tickers.txt 에 한 줄씩 저장하고 레코드에는 번호만 기록
+    - path 가 없으면 메모리 배열에만 쌓음 (백테스트용)
+    - 쓰다가 죽어서 열 길이가 다르면 열 때 가장 짧은 길이로 잘라냄
+    """
+    def __init__(self, path=None, capacity=1024):
+        self.path = path
+        self.lock = threading.Lock()
+        self.tickers = []
+        self.ticker_ids = {}
+        self.fds = {}
+        self.size = 0
+        self.buffers = None
+
+        if path is None:
+            self.buffers = {name: np.empty(capacity, dtype=trade_dtype[name]) for name in trade_dtype.names}
+            return
+
+        os.makedirs(path, exist_ok=True)
+        if os.path.exists(self.tickers_path):
+            with open(self.tickers_path, "r") as f:
+                self.tickers = [line.strip() for line in f if line.strip()]
+            self.ticker_ids = {ticker: i for i, ticker in enumerate(self.tickers)}
+        for name in trade_dtype.names:
+            self.fds[name] = os.open(self.column_path(name), os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        self.size = min(os.fstat(fd).st_size // trade_dtype[name].itemsize for name, fd in self.fds.items())
+        for name, fd in self.fds.items():
+            os.ftruncate(fd, self.size * trade_dtype[name].itemsize)
+
+    @property
+    def tickers_path(self):
+        return os.path.join(self.path, "tickers.txt")
+
+    def column_path(self, name):
+        return os.path.join(self.path, f"{name}.bin")
+
+    def __len__(self):
+        return self.size
+
+    def ticker_id(self, ticker):
+        """티커 번호 (처음 보는 티커면 추가), lock 안에서 호출"""
+        if ticker not in self.ticker_ids:
+            if self.path is not None:
+                # 레코드보다 이름을 먼저 기록해야 죽어도 번호가 가리키는 이름이 항상 있음
+                with open(self.tickers_path, "a") as f:
+                    f.write(ticker + "\n")
+                    f.flush()
+                    os.fsync(f.fileno())
+            self.ticker_ids[ticker] = len(self.tickers)
+            self.tickers.append(ticker)
+        return self.ticker_ids[ticker]
+
+    def record(self, ticker, entry_time, exit_time, buy_price, sell_price, amount_krw, sell_value, fee):
+        """거래 하나 추가, 순수익은 매도 금액 - 투자금 - 수수료"""
+        self.extend(ticker, [to_ns(entry_time)], [to_ns(exit_time)], buy_price, sell_price, amount_krw, sell_value, fee)
+
+    def extend(self, ticker, entry_time, exit_time, buy_price, sell_price, amount_krw, sell_value, fee):
+        """같은 티커의 거래 여러 개를 배열로 한 번에 추가 (벡터화 백테스트용)"""
+        count = len(entry_time)
+        columns = {
+            'entry_time': entry_time,
+            'exit_time': exit_time,
+            'buy_price': buy_price,
+            'sell_price': sell_price,
+            'amount_krw': amount_krw,
+            'sell_value': sell_value,
+            'fee': fee,
+        }
+        columns = {name: np.broadcast_to(np.asarray(value, dtype=trade_dtype[name]), count)
+                   for name, value in columns.items()}
+        columns['profit'] = columns['sell_value'] - columns['amount_krw'] - columns['fee']
+        with self.lock:
+            columns['ticker'] = np.full(count, self.ticker_id(ticker), dtype=trade_dtype['ticker'])
+            self._append(columns, count)
+
+    def _append(self, columns, count):
+        if self.fds:
+            for name, fd in self.fds.items():
+                os.write(fd, np.ascontiguousarray(columns[name]).tobytes())
+            for fd in self.fds.values():
+                os.fsync(fd)
+        else:
+            capacity = len(self.buffers['exit_time'])
+            if self.size + count > capacity:
+                capacity = max(self.size + count, 2 * capacity)
+                for name, buffer in self.buffers.items():
+                    grown = np.empty(capacity, dtype=buffer.dtype)
+                    grown[:self.size] = buffer[:self.size]
+                    self.buffers[name] = grown
+            for name, buffer in self.buffers.items():
+                buffer[self.size:self.size + count] = columns[name]
+        self.size += count
+
+    def trades(self):
+        """지금까지의 전체 거래 (파일이면 읽기 전용 memmap 열)"""
+        with self.lock:
+            if not self.fds:
+                return Trades({name: buffer[:self.size] for name, buffer in self.buffers.items()})
+            if self.size == 0:
+                return empty_trades()
+            return Trades({name: np.memmap(self.column_path(name), dtype=trade_dtype[name], mode='r', shape=(self.size,))
+                           for name in trade_dtype.names})
+
+    def report(self, start_cash=None, days=None, now=None):
+        """슬랙으로 보낼 손익 요약 (days 를 주면 최근 days 일 동안 매도한 거래만)"""
+        return recent_report(self.trades(), self.tickers, start_cash=start_cash, days=days, now=now)
+
+    def close(self):
+        with self.lock:
+            for fd in self.fds.values():
+                os.close(fd)
+            self.fds = {}
+
+def read_trades(path):
+    """다른 프로세스가 쓰고 있는 장부 디렉터리를 파일을 고치지 않고 읽음 → (Trades, 티커 이름 목록)
+
+    쓰는 중이면 열 길이가 다를 수 있으므로 가장 짧은 열까지만 읽음 (티커 이름은 레코드보다 먼저 기록되므로 나중에 읽음)
+    """
+    paths = {name: os.path.join(path, f"{name}.bin") for name in trade_dtype.names}
+    size = min(os.path.getsize(p) // trade_dtype[name].itemsize if os.path.exists(p) else 0 for name, p in paths.items())
+    trades = Trades({name: np.fromfile(p, dtype=trade_dtype[name], count=size) for name, p in paths.items()}) \
+        if size else empty_trades()
+    tickers_path = os.path.join(path, "tickers.txt")
+    tickers = []
+    if os.path.exists(tickers_path):
+        with open(tickers_path, "r") as f:
+            tickers = [line.strip() for line in f if line.strip()]
+    return trades, tickers
+
+def combine(parts):
+    """여러 장부의 (Trades, 티커 이름 목록) 을 티커 번호를 다시 매겨 하나로 합침 (매도 시각 순)"""
+    ids = {}
+    columns = {name: [np.empty(0, dtype=trade_dtype[name])] for name in trade_dtype.names}
+    for trades, tickers in parts:
+        remap = np.array([ids.setdefault(ticker, len(ids)) for ticker in tickers], dtype=trade_dtype['ticker'])
+        for name in trade_dtype.names:
+            columns[name].append(remap[trades[name]] if name == 'ticker' else np.asarray(trades[name]))
+    columns = {name: np.concatenate(arrays) for name, arrays in columns.items()}
+    order = np.argsort(columns['exit_time'], kind='stable')
+    return Trades({name: column[order] for name, column in columns.items()}), list(ids)
+
+def between(trades, start=None, end=None):
+    """매도 시각이 [start, end] 인 거래만 (장부는 보통 매도 시각 순이므로 그때는 이진 탐색)"""
+    times = trades['exit_time']
+    start = times.min() if start is None or not len(times) else to_ns(start)
+    end = times.max() if end is None or not len(times) else to_ns(end)
+    if len(times) < 2 or (times[1:] >= times[:-1]).all():
+        return trades[np.searchsorted(times, start, side='left'):np.searchsorted(times, end, side='right')]
+    return trades[(times >= start) & (times <= end)]
+
+def summary(trades):
+    """거래 수 / 승률 / 수익 / 수수료 합계"""
+    profit = trades['profit']
+    count = len(trades)
+    wins = int((profit > 0).sum())
+    amount = float(trades['amount_krw'].sum())
+    net = float(profit.sum())
+    return {
+        "trade_count": count,
+        "win_count": wins,
+        "win_rate": wins / count * 100 if count else 0.0,
+        "amount_krw": amount,
+        "gross_profit": float((trades['sell_value'] - trades['amount_krw']).sum()),
+        "fee": float(trades['fee'].sum()),
+        "net_profit": net,
+        "ror": net / amount * 100 if amount else 0.0,  # 투자금 대비 순수익 %
+    }
+
+def group_stats(keys, trades, size):
+    """정수 key 별 (거래 수, 승리 수, 순수익, 수수료, 투자금) 을 bincount 로 합산"""
+    profit = trades['profit']
+    return pd.DataFrame({
+        "trade_count": np.bincount(keys, minlength=size),
+        "win_count": np.bincount(keys, weights=profit > 0, minlength=size).astype(np.int64),
+        "net_profit": np.bincount(keys, weights=profit, minlength=size),
+        "fee": np.bincount(keys, weights=trades['fee'], minlength=size),
+        "amount_krw": np.bincount(keys, weights=trades['amount_krw'], minlength=size),
+    })
+
+def pnl_by_ticker(trades, tickers):
+    table = group_stats(trades['ticker'], trades, len(tickers))
+    table.index = pd.Index(tickers, name="ticker")
+    return table[table['trade_count'] > 0]
+
+def pnl_by_day(trades):
+    """매도일 (KST) 별 손익"""
+    if not len(trades):
+        return group_stats(np.empty(0, dtype=np.int64), trades, 0)
+    days = trades['exit_time'] // day_ns
+    first = int(days.min())
+    table = group_stats(days - first, trades, int(days.max()) - first + 1)
+    table.index = pd.DatetimeIndex((np.arange(len(table)) + first) * day_ns, name="day")
+    return table[table['trade_count'] > 0]
+
+def drawdown(trades, start_cash):
+    """매도 순서대로 순수익을 누적한 잔액 곡선의 (MDD %, 최대 낙폭 금액, 잔액 곡선)"""
+    times = trades['exit_time']
+    profit = trades['profit']
+    if len(times) > 1 and not (times[1:] >= times[:-1]).all():
+        profit = profit[np.argsort(times, kind='stable')]
+    equity = start_cash + np.cumsum(profit)
+    running_max = np.maximum.accumulate(np.maximum(equity, start_cash))
+    if not len(equity):
+        return 0.0, 0.0, equity
+    return float(((running_max - equity) / running_max).max() * 100), float((running_max - equity).max()), equity
+
+def exposure(trades):
+    """보유 중인 투자금 합의 (최대, 시간 가중 평균, 하나라도 보유한 시간 비율)"""
+    if not len(trades):
+        return {"max_krw": 0.0, "avg_krw": 0.0, "busy_ratio": 0.0}
+    # 같은 시각이면 매도를 먼저 빼도록 매도를 앞에 두고 안정 정렬 (매도 시각 순 장부면 거의 정렬된 두 구간이라 빠름)
+    times = np.concatenate((trades['exit_time'], trades['entry_time']))
+    deltas = np.concatenate((-trades['amount_krw'], trades['amount_krw']))
+    order = np.argsort(times, kind='stable')
+    times, level = times[order], np.cumsum(deltas[order])
+    span = times[-1] - times[0]
+    durations = np.diff(times)
+    held = level[:-1]
+    return {
+        "max_krw": float(level.max()),
+        "avg_krw": float((held * durations).sum() / span) if span else 0.0,
+        "busy_ratio": float(durations[held > 1e-9].sum() / span) if span else 0.0,
+    }
+
+def recent_report(trades, tickers, start_cash=None, days=None, now=None):
+    """report() 와 같고, days 를 주면 now (기본: 현재 KST) 까지 최근 days 일 동안 매도한 거래만"""
+    title = "전체 기간"
+    if days is not None:
+        end = to_ns(now if now is not None else kst_now())
+        trades = between(trades, end - days * day_ns, end)
+        title = f"최근 {days}일"
+    return report(trades, tickers, start_cash=start_cash, title=title)
+
+def report(trades, tickers, start_cash=None, title="전체 기간"):
+    """손익 요약 텍스트 (슬랙 '리포트' 명령 / 백테스트 출력용)"""
+    if not len(trades):
+        return f"📒 거래 장부 ({title}): 끝난 거래가 없습니다."
+    total = summary(trades)
+    held = exposure(trades)
+    lines = [
+        f"📒 거래 장부 ({title}, {pd.Timestamp(int(trades['exit_time'].min())):%Y-%m-%d} ~ "
+        f"{pd.Timestamp(int(trades['exit_time'].max())):%Y-%m-%d})",
+        f"거래 {total['trade_count']}회 | 승률 {total['win_rate']:.2f}% | 순수익 {total['net_profit']:,.0f} 원 "
+        f"(투자금 대비 {total['ror']:.2f}%) | 수수료 {total['fee']:,.0f} 원",
+        f"보유 투자금 최대 {held['max_krw']:,.0f} 원 / 평균 {held['avg_krw']:,.0f} 원 | "
+        f"보유 시간 비율 {held['busy_ratio'] * 100:.1f}%",
+    ]
+    if start_cash:
+        mdd, amount, _ = drawdown(trades, start_cash)
+        lines.append(f"최대 낙폭 (매도 기준) {mdd:.2f}% ({amount:,.0f} 원)")
+
+    lines.append("[티커별]")
+    for row in pnl_by_ticker(trades, tickers).sort_values("net_profit", ascending=False).itertuples():
+        lines.append(f"  {row.Index}: {row.trade_count}회, 승률 {row.win_count / row.trade_count * 100:.0f}%, "
+                     f"순수익 {row.net_profit:,.0f} 원")
+    lines.append("[일별 (최근 7일)]")
+    for row in pnl_by_day(trades).tail(7).itertuples():
+        lines.append(f"  {row.Index:%m-%d}: {row.trade_count}회, 순수익 {row.net_profit:,.0f} 원")
+    return "\n".join(lines)
@@ -0,0 +1,243 @@
+import bisect
+import contextlib
+import datetime
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 지연 시간 버킷 경계 (초)
+default_buckets = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+class LatencyHistogram:
+    """고정 버킷 지연 시간 히스토그램 (초 단위 기록)"""
+    def __init__(self, buckets=default_buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # 마지막 칸은 +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, seconds):
+        with self.lock:
+            self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+            self.count += 1
+            self.sum += seconds
+            self.max = max(self.max, seconds)
+
+    def percentile(self, q):
+        """q (0~100) 분위수가 속한 버킷의 상한값"""
+        with self.lock:
+            if not self.count:
+                return 0.0
+            target = self.count * q / 100
+            seen = 0
+            for bound, count in zip(self.buckets, self.counts):
+                seen += count
+                if seen >= target:
+                    return bound
+            return self.max
+
+    def summary(self, name=""):
+        mean = self.sum / self.count if self.count else 0.0
+        return (f"{name} n={self.count} 평균={mean * 1000:.3f}ms p50<={self.percentile(50) * 1000:.2f}ms "
+                f"p99<={self.percentile(99) * 1000:.2f}ms 최대={self.max * 1000:.3f}ms")
+
+    def table(self):
+        """버킷별 분포를 텍스트 막대로 표시"""
+        lines = []
+        width = max(self.counts) or 1
+        labels = [f"<= {b * 1000:g}ms" for b in self.buckets] + ["> " + f"{self.buckets[-1] * 1000:g}ms"]
+        for label, count in zip(labels, self.counts):
+            if count:
+                lines.append(f"{label:>12} | {'#' * max(1, count * 40 // width)} {count}")
+        return "\n".join(lines)
+
+class Span:
+    """with 블록 실행 시간을 Registry 에 기록 (예외로 끝나면 오류 카운터도 증가)"""
+    __slots__ = ('registry', 'name', 'labels', 'started')
+
+    def __init__(self, registry, name, labels):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = self.registry.clock()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.registry.record(self.name, self.labels, self.started, self.registry.clock() - self.started, exc_type is not None)
+        return False
+
+class Registry:
+    """이름 + 라벨별 지연 시간 히스토그램 / 카운터 모음
+
+    cycle() 블록이 진행 중이면 그동안 (모든 스레드에서) 끝난 span 을 모아 trace_path 에 주기당 JSON 한 줄로 기록
+    """
+    def __init__(self, trace_path=None, clock=time.perf_counter):
+        self.histograms = {}  # (이름, 라벨) -> LatencyHistogram
+        self.counters = {}    # (이름, 라벨) -> 값
+        self.trace_path = trace_path
+        self.clock = clock
+        self.cycles = []      # 진행 중인 주기 트레이스
+        self.lock = threading.Lock()
+
+    def span(self, name, **labels):
+        return Span(self, name, tuple(sorted(labels.items())))
+
+    def timed(self, func, name, **labels):
+        """func 호출마다 span 을 기록하는 함수로 감쌈"""
+        labels = tuple(sorted(labels.items()))
+
+        def wrapper(*args, **kwargs):
+            with Span(self, name, labels):
+                return func(*args, **kwargs)
+        return wrapper
+
+    def histogram(self, name, labels=()):
+        hist = self.histograms.get((name, labels))
+        if hist is None:
+            with self.lock:
+                hist = self.histograms.setdefault((name, labels), LatencyHistogram())
+        return hist
+
+    def register(self, name, histogram, **labels):
+        """다른 곳에서 관리하는 히스토그램도 함께 노출 (예: ExitEngine.latency)"""
+        with self.lock:
+            self.histograms[(name, tuple(sorted(labels.items())))] = histogram
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def record(self, name, labels, started, elapsed, error=False):
+        self.histogram(name, labels).observe(elapsed)
+        if error:
+            self.inc(f"{name}_errors_total", **dict(labels))
+        if self.cycles:
+            event = (name, labels, started, elapsed, threading.current_thread().name, error)
+            with self.lock:
+                for cycle in self.cycles:
+                    cycle['spans'].append(event)
+
+    @contextlib.contextmanager
+    def cycle(self, name):
+        """매수 / 매도 주기 하나를 span 으로 기록하고, trace_path 가 있으면 그 안의 span 들을 트레이스 파일에 추가"""
+        if self.trace_path is None:
+            with self.span(name):
+                yield
+            return
+
+        cycle = {'spans': []}
+        wall = datetime.datetime.now()
+        with self.lock:
+            self.cycles.append(cycle)
+        try:
+            with self.span(name) as span:
+                yield
+        finally:
+            with self.lock:
+                self.cycles.remove(cycle)
+            self._write_trace(name, wall, span.started, cycle['spans'])
+
+    def _write_trace(self, name, wall, started, spans):
+        trace = {
+            "cycle": name,
+            "start": wall.isoformat(timespec="milliseconds"),
+            "duration": self.clock() - started,
+            "spans": [{"name": span_name, "labels": dict(labels), "offset": round(span_started - started, 6),
+                       "duration": round(elapsed, 6), "thread": thread, "error": error}
+                      for span_name, labels, span_started, elapsed, thread, error in spans],
+        }
+        try:
+            with open(self.trace_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(trace, ensure_ascii=False) + "\n")
+        except OSError as e:
+            print(f"트레이스 기록 실패: {e}")
+
+    def render(self, prefix="coinbot"):
+        """Prometheus 텍스트 형식으로 출력"""
+        with self.lock:
+            histograms = sorted(self.histograms.items())
+            counters = sorted(self.counters.items())
+
+        lines = [f"# TYPE {prefix}_latency_seconds histogram"]
+        for (name, labels), hist in histograms:
+            with hist.lock:
+                counts, count, total = list(hist.counts), hist.count, hist.sum
+            base = (("span", name),) + labels
+            seen = 0
+            for bound, bucket_count in zip(hist.buckets + (float("inf"),), counts):
+                seen += bucket_count
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                lines.append(f"{prefix}_latency_seconds_bucket{format_labels(base + (('le', le),))} {seen}")
+            lines.append(f"{prefix}_latency_seconds_sum{format_labels(base)} {total:.9g}")
+            lines.append(f"{prefix}_latency_seconds_count{format_labels(base)} {count}")
+
+        typed = set()
+        for (name, labels), value in counters:
+            if name not in typed:
+                lines.append(f"# TYPE {prefix}_{name} counter")
+                typed.add(name)
+            lines.append(f"{prefix}_{name}{format_labels(labels)} {value:g}")
+        return "\n".join(lines) + "\n"
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in labels)
+    return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(labels, escaped)) + "}"
+
+class Instrumented:
+    """target 의 지정한 메서드 호출마다 span(name, method=...) 을 기록하는 프록시 (나머지 속성은 그대로 전달)"""
+    def __init__(self, target, registry, name, methods):
+        self._target = target
+        for method in methods:
+            if hasattr(target, method):
+                setattr(self, method, registry.timed(getattr(target, method), name, method=method))
+
+    def __getattr__(self, attr):
+        return getattr(self._target, attr)
+
+class MetricsServer:
+    """registry 를 GET /metrics 로 노출하는 로컬 HTTP 서버 (백그라운드 스레드)"""
+    def __init__(self, registry, host="127.0.0.1", port=9100):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self.server = None
+
+    def start(self):
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = registry.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.port = self.server.server_address[1]
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
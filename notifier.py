@@ -0,0 +1,119 @@
+import queue
+import random
+import threading
+import time
+
+from metrics import Registry
+from scanner import TokenBucket
+
+class Notifier:
+    """슬랙 메시지를 백그라운드 스레드에서 전송 (호출하는 쪽은 큐에 넣기만 하고 바로 반환)
+
+    - 쌓여 있는 메시지는 채널별로 하나로 합쳐서 전송
+    - 채널당 초당 1회 전송 제한을 지키고, 429 응답이면 Retry-After 만큼 기다렸다가 재시도
+    - 큐가 backlog 개 이상 밀리면 낮은 우선순위 메시지는 버리고 개수만 요약해서 알림
+    """
+    def __init__(self, web_client, channel, rate=1, max_chars=3500, backlog=100, max_queue=1000, retries=3, metrics=None):
+        self.web_client = web_client
+        self.metrics = metrics or Registry()
+        self.channel = channel
+        self.rate = rate
+        self.buckets = {}  # 채널 -> TokenBucket (전송 스레드에서만 사용)
+        self.max_chars = max_chars
+        self.backlog = backlog
+        self.retries = retries
+        self.queue = queue.Queue(max_queue)
+        self.dropped = 0
+        self.sent = 0
+        self.lock = threading.Lock()
+        self.thread = threading.Thread(target=self._worker, daemon=True)
+        self.thread.start()
+
+    def post(self, text, channel=None, low_priority=False):
+        if low_priority and self.queue.qsize() >= self.backlog:
+            with self.lock:
+                self.dropped += 1
+            self.metrics.inc("slack_dropped_total")
+            return
+        try:
+            self.queue.put_nowait((channel or self.channel, text))
+        except queue.Full:
+            with self.lock:
+                self.dropped += 1
+            self.metrics.inc("slack_dropped_total")
+
+    def flush(self, timeout=10):
+        """큐에 남은 메시지가 모두 전송될 때까지 대기 (종료 시 사용)"""
+        deadline = time.monotonic() + timeout
+        while self.queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+    def _worker(self):
+        while True:
+            batch = [self.queue.get()]
+            while True:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            try:
+                self._send_batch(batch)
+            except Exception as e:
+                print(f"슬랙 메시지 전송 실패: {e}")
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    def _send_batch(self, batch):
+        with self.lock:
+            dropped, self.dropped = self.dropped, 0
+
+        by_channel = {}
+        for channel, text in batch:
+            by_channel.setdefault(channel, []).append(text)
+        if dropped:
+            by_channel.setdefault(self.channel, []).append(f"ℹ️ 메시지가 밀려 알림 {dropped}건을 생략했습니다")
+
+        for channel, texts in by_channel.items():
+            for chunk in self._chunks(texts):
+                self._post(channel, chunk)
+
+    def _chunks(self, texts):
+        chunk = ""
+        for text in texts:
+            if chunk and len(chunk) + len(text) + 1 > self.max_chars:
+                yield chunk
+                chunk = ""
+            chunk = f"{chunk}\n{text}" if chunk else text
+        if chunk:
+            yield chunk
+
+    def _bucket(self, channel):
+        bucket = self.buckets.get(channel)
+        if bucket is None:
+            bucket = self.buckets[channel] = TokenBucket(self.rate)
+        return bucket
+
+    def _post(self, channel, text):
+        from slack_sdk.errors import SlackApiError  # 첫 전송 때 불러옴 (import 시간 단축)
+
+        for attempt in range(self.retries + 1):
+            self._bucket(channel).acquire()
+            try:
+                with self.metrics.span("slack_post"):
+                    self.web_client.chat_postMessage(channel=channel, text=text)
+                self.sent += 1
+                return
+            except SlackApiError as e:
+                if e.response.status_code == 429:
+                    wait = float(e.response.headers.get("Retry-After", 1))
+                else:
+                    wait = 2 ** attempt * random.uniform(0.5, 1.5)
+                print(f"슬랙 메시지 전송 실패 ({attempt + 1}회): {e}")
+            except Exception as e:
+                wait = 2 ** attempt * random.uniform(0.5, 1.5)
+                print(f"슬랙 메시지 전송 실패 ({attempt + 1}회): {e}")
+
+            if attempt < self.retries:
+                time.sleep(wait)
@@ -0,0 +1,130 @@
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from backtesting import CustomBackTest, simulate_vectorized
+from candle_store import CandleStore
+
+# 워커 프로세스에서 공유 메모리에 붙인 티커별 지표 배열
+_worker_shms = []
+_worker_arrays = {}
+
+class SharedIndicators:
+    """티커별 (open, high, low, close, ma20, rsi) 배열을 공유 메모리에 한 번만 올려둠
+
+    워커에는 공유 메모리 이름만 전달되므로 작업마다 배열을 pickle 하지 않음
+    """
+    def __init__(self, data):
+        self.blocks = {}
+        self.shms = []
+
+        for ticker, df in data.items():
+            stacked = np.vstack(CustomBackTest(df).indicator_arrays())
+            shm = shared_memory.SharedMemory(create=True, size=max(stacked.nbytes, 1))
+            np.ndarray(stacked.shape, dtype=np.float64, buffer=shm.buf)[:] = stacked
+            self.shms.append(shm)
+            self.blocks[ticker] = (shm.name, stacked.shape)
+
+    def close(self):
+        for shm in self.shms:
+            shm.close()
+            shm.unlink()
+        self.shms = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def _init_worker(blocks):
+    for ticker, (name, shape) in blocks.items():
+        shm = shared_memory.SharedMemory(name=name)
+        _worker_shms.append(shm)
+        _worker_arrays[ticker] = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+
+def _run_chunk(ticker, combos, start_cash, risk_ratio, fee, window=None):
+    """window=(start, end) 를 주면 그 구간의 봉만 사용 (지표는 전체 구간에서 미리 계산된 것을 잘라 씀)"""
+    arrays = _worker_arrays[ticker]
+    if window is not None:
+        arrays = arrays[:, window[0]:window[1]]
+    rows = []
+    for rsi_limit, take_profit_ratio, stop_loss_ratio in combos:
+        stats = simulate_vectorized(
+            *arrays,
+            start_cash=start_cash,
+            risk_ratio=risk_ratio,
+            rsi_limit=rsi_limit,
+            take_profit_ratio=take_profit_ratio,
+            stop_loss_ratio=stop_loss_ratio,
+            fee=fee
+        )
+        trade_count = stats['trade_count']
+        rows.append((
+            ticker, rsi_limit, take_profit_ratio, stop_loss_ratio,
+            stats['accumulated_ror'], stats['mdd'],
+            stats['win_count'] / trade_count * 100 if trade_count else 0.0,
+            trade_count, stats['total_fee_paid']
+        ))
+    return rows
+
+def load_data(tickers, interval="minute240", count=1080):
+    candles = CandleStore()
+    data = {}
+    for ticker in tickers:
+        df = candles.get_ohlcv(ticker, interval=interval, count=count)
+        if df is None or df.empty:
+            print(f"[{ticker}] 데이터가 없습니다.")
+            continue
+        data[ticker] = df
+        time.sleep(0.1)  # API 부하 방지
+    return data
+
+def optimize(data, rsi_limits, take_profit_ratios, stop_loss_ratios,
+             start_cash=1_000_000, risk_ratio=1.0, fee=0.0005, processes=None, chunk_size=500):
+    """티커 x 파라미터 조합 전체를 프로세스 풀에서 백테스트 후 누적 수익률 순으로 정렬
+
+    data: {ticker: OHLCV DataFrame}
+    """
+    combos = list(itertools.product(rsi_limits, take_profit_ratios, stop_loss_ratios))
+    processes = processes or os.cpu_count()
+
+    with SharedIndicators(data) as shared:
+        with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker, initargs=(shared.blocks,)) as pool:
+            futures = [
+                pool.submit(_run_chunk, ticker, combos[i:i + chunk_size], start_cash, risk_ratio, fee)
+                for ticker in shared.blocks
+                for i in range(0, len(combos), chunk_size)
+            ]
+            rows = [row for future in futures for row in future.result()]
+
+    table = pd.DataFrame(rows, columns=[
+        'ticker', 'rsi_limit', 'take_profit_ratio', 'stop_loss_ratio',
+        'accumulated_ror', 'mdd', 'win_rate', 'trade_count', 'total_fee_paid'
+    ])
+    return table.sort_values(['accumulated_ror', 'mdd'], ascending=[False, True], ignore_index=True)
+
+def main():
+    tickers = ["KRW-BTC", "KRW-BLAST", "KRW-ARK"]
+    data = load_data(tickers)
+
+    start = time.perf_counter()
+    table = optimize(
+        data,
+        rsi_limits=range(30, 100, 2),
+        take_profit_ratios=np.round(np.arange(1.02, 1.31, 0.01), 2),
+        stop_loss_ratios=np.round(np.arange(0.85, 0.995, 0.01), 2)
+    )
+    elapsed = time.perf_counter() - start
+    print(f"🔍 {len(table):,}개 조합 백테스트 완료 ({elapsed:.1f}초)\n")
+
+    # 티커별 상위 5개 조합
+    print(table.groupby('ticker').head(5).to_string())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+import random
+import threading
+import time
+
+import pandas as pd
+
+from candle_store import CandleStore
+from exit_engine import kst_offset
+from sim_exchange import SimExchange
+
+class ReplayClock:
+    """기록된 데이터 시각을 실제 시간의 speed 배로 흘려보내는 시계
+
+    now() 는 Scheduler 와 같은 epoch 초, kst_ns() 는 SimExchange / CandleStore 와 같은 KST ns 정수
+    """
+    def __init__(self, start, speed=100.0, monotonic=time.monotonic):
+        self.start = pd.Timestamp(start).value  # KST
+        self.speed = speed
+        self.monotonic = monotonic
+        self.started = monotonic()
+
+    def reset(self):
+        """지금부터 다시 start 시각으로 재생 (봇 준비가 끝난 뒤 호출)"""
+        self.started = self.monotonic()
+
+    def kst_ns(self):
+        return self.start + int((self.monotonic() - self.started) * self.speed * 10**9)
+
+    def now(self):
+        return (self.kst_ns() - kst_offset) / 10**9
+
+class PaperExchange(SimExchange):
+    """모의 투자용 거래소: 기록된 1분봉을 ReplayClock 시각으로 재생하며 pyupbit 와 같은 메서드를 제공
+
+    - 시각은 clock 이 정하므로 set_time() 은 무시됨
+    - 호출마다 latency ± jitter 초를 실제로 기다리고 (거래소 왕복 시간), error_rate 확률로 ConnectionError,
+      주문은 reject_rate 확률로 거절 (None) 하여 봇의 재시도 / 오류 처리를 시험함
+    - 시장가 주문은 현재 1분봉 종가에서 slippage 만큼 불리하게 체결
+    """
+    def __init__(self, minute_data, clock, start_cash=1_000_000, fee=0.0005, slippage=0.0005,
+                 latency=0.05, jitter=0.02, error_rate=0.0, reject_rate=0.0, seed=None):
+        self.clock = clock
+        super().__init__(minute_data, start_cash=start_cash, fee=fee, slippage=slippage)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.reject_rate = reject_rate
+        self.random = random.Random(seed)
+        self.random_lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+        self.rejects = 0
+
+    @classmethod
+    def from_store(cls, tickers, start=None, speed=100.0, store=None, warmup_days=4, **kwargs):
+        """CandleStore 에 저장된 1분봉으로 생성 (네트워크 사용 안 함)
+
+        start 가 없으면 모든 티커의 1분봉이 있는 첫 시각 + warmup_days (4시간봉 MA20 에 필요한 봉) 부터 재생
+        """
+        store = store or CandleStore()
+        minute_data = {ticker: store.get(ticker, "minute1") for ticker in tickers}
+        minute_data = {ticker: df for ticker, df in minute_data.items() if len(df)}
+        if not minute_data:
+            raise ValueError("저장된 1분봉이 없습니다 (CandleStore 에 minute1 봉을 먼저 받아 두어야 함)")
+        if start is None:
+            start = max(df.index[0] for df in minute_data.values()) + pd.Timedelta(days=warmup_days)
+        return cls(minute_data, ReplayClock(start, speed), **kwargs)
+
+    @property
+    def now(self):
+        return self.clock.kst_ns()
+
+    @now.setter
+    def now(self, value):
+        pass  # 시각은 clock 이 정함
+
+    def finished(self):
+        """기록된 데이터가 모두 지났는지"""
+        return all(self.now > d['time'][-1] for d in self.data.values())
+
+    def _roundtrip(self, order=False):
+        """거래소 왕복 지연과 오류 흉내, 주문을 거절해야 하면 False"""
+        with self.random_lock:
+            delay = max(0.0, self.latency + self.random.uniform(-self.jitter, self.jitter))
+            error = self.random.random() < self.error_rate
+            reject = order and self.random.random() < self.reject_rate
+            self.calls += 1
+            self.errors += error
+            self.rejects += reject
+        time.sleep(delay)
+        if error:
+            raise ConnectionError("모의 거래소 연결 오류")
+        return not reject
+
+    def get_current_price(self, ticker, *args, **kwargs):
+        self._roundtrip()
+        return super().get_current_price(ticker)
+
+    def get_ohlcv(self, ticker, interval="day", count=200, *args, **kwargs):
+        self._roundtrip()
+        return super().get_ohlcv(ticker, interval=interval, count=count)
+
+    def get_balances(self):
+        self._roundtrip()
+        return super().get_balances()
+
+    def get_balance(self, ticker="KRW", *args, **kwargs):
+        self._roundtrip()
+        return super().get_balance(ticker)
+
+    def buy_market_order(self, ticker, price, *args, **kwargs):
+        if not self._roundtrip(order=True):
+            return None
+        return super().buy_market_order(ticker, price)
+
+    def sell_market_order(self, ticker, volume, *args, **kwargs):
+        if not self._roundtrip(order=True):
+            return None
+        return super().sell_market_order(ticker, volume)
+
+class PaperFeed:
+    """모의 거래소의 1분봉 종가를 체결 스트림처럼 ExitEngine.on_tick 으로 흘려보냄 (ExitEngine.start / stop 대신 사용)"""
+    def __init__(self, exchange, engine, interval=0.05):
+        self.exchange = exchange
+        self.engine = engine
+        self.interval = interval
+        self.codes = []
+        self.running = False
+        self.thread = None
+        self.last = {}  # ticker -> 마지막으로 보낸 1분봉 번호
+
+    def start(self, codes):
+        if self.running:
+            return
+        self.codes = list(codes)
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def update_codes(self, codes):
+        self.codes = list(codes)
+
+    def stop(self):
+        self.running = False
+
+    def _run(self):
+        while self.running:
+            for ticker in list(self.codes):
+                if ticker not in self.exchange.data:
+                    continue
+                i = self.exchange.index(ticker)
+                first = self.last.get(ticker, i)
+                # 지난번 이후 마감된 1분봉마다 종가 하나씩 (빠르게 재생해도 중간 가격을 건너뛰지 않음)
+                for price in self.exchange.data[ticker]['close'][first + 1:i + 1]:
+                    self.engine.on_tick(ticker, float(price))
+                self.last[ticker] = i
+            time.sleep(self.interval)
+
+class NullWebClient:
+    """모의 투자 / 부하 시험에서 슬랙으로 보내지 않음 (CoinBot.send 가 이미 화면에 출력)"""
+    def chat_postMessage(self, channel, text):
+        pass
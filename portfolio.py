@@ -0,0 +1,116 @@
+import threading
+import time
+
+
+class Snapshot:
+    """특정 시점의 잔고와 현재가"""
+    def __init__(self, balances, prices, taken_at):
+        self.balances = balances  # currency -> 잔고 dict (get_balances 응답)
+        self.prices = prices      # ticker -> 현재가
+        self.taken_at = taken_at
+
+    @property
+    def krw(self):
+        return self.balance("KRW")
+
+    def balance(self, ticker):
+        currency = ticker.split("-")[-1]
+        info = self.balances.get(currency)
+        return float(info['balance']) if info else 0.0
+
+    def price(self, ticker):
+        return self.prices.get(ticker)
+
+    def total_asset(self, tickers):
+        """KRW 잔고 + 각 티커 평가금액, 현재가를 모르는 티커 목록도 함께 반환"""
+        total = self.krw
+        missing = []
+        for ticker in tickers:
+            price = self.price(ticker)
+            if price is None:
+                missing.append(ticker)
+                continue
+            total += self.balance(ticker) * price
+        return total, missing
+
+    def has_coin(self):
+        for currency, b in self.balances.items():
+            if currency != 'KRW':
+                volume = float(b['balance'])
+                avg_buy_price = float(b.get('avg_buy_price', 0))
+                if volume > 0 and avg_buy_price > 0:
+                    return True
+        return False
+
+class Portfolio:
+    """get_balances() 한 번과 여러 티커 get_current_price() 한 번으로 포트폴리오를 조회하고 ttl 초 동안 재사용
+
+    티커 수와 무관하게 스냅샷 한 번에 REST 요청 2회만 발생함
+    """
+    def __init__(self, upbit, tickers, ttl=10, get_current_price=None, clock=time.monotonic):
+        if get_current_price is None:
+            import pyupbit
+            get_current_price = pyupbit.get_current_price
+        self.upbit = upbit
+        self.tickers = tickers  # 조회할 티커 목록을 돌려주는 함수
+        self.ttl = ttl
+        self.get_current_price = get_current_price
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.current = None
+        self.request_count = 0  # 누적 REST 요청 수
+
+    def snapshot(self, force=False):
+        with self.lock:
+            if force or self.current is None or self.clock() - self.current.taken_at > self.ttl:
+                self.current = self._fetch()
+            return self.current
+
+    def invalidate(self):
+        """주문 후 잔고가 바뀌었으므로 다음 조회 때 새로 받아옴"""
+        with self.lock:
+            self.current = None
+
+    def _fetch(self):
+        tickers = list(self.tickers())
+
+        balances = self.upbit.get_balances() or []
+        self.request_count += 1
+
+        prices = {}
+        if tickers:
+            ret = self.get_current_price(tickers)
+            self.request_count += 1
+            if isinstance(ret, dict):
+                prices = ret
+            elif isinstance(ret, (int, float)) and len(tickers) == 1:
+                prices = {tickers[0]: ret}
+
+        return Snapshot({b['currency']: b for b in balances}, prices, self.clock())
+
+class KrwBudget:
+    """한 매수 주기 동안 여러 스레드가 나눠 쓰는 KRW 잔고
+
+    reserve() 는 잠금 안에서 잔고를 확인하고 차감하므로 동시에 주문해도 잔고를 초과하지 않음
+    """
+    def __init__(self, available, fee_margin=1.001):
+        self.available = available
+        self.fee_margin = fee_margin  # 수수료 0.05%를 감안한 값, 여유롭게 0.1%로 설정
+        self.lock = threading.Lock()
+
+    def reserve(self, amount, min_amount=5000):
+        """최대 amount 원을 예약하고 예약한 주문 금액을 반환 (min_amount 미만이면 예약하지 않음)"""
+        with self.lock:
+            amount = min(amount, self.available / self.fee_margin)
+            if amount < min_amount:
+                return amount
+            self.available -= amount * self.fee_margin
+            return amount
+
+    def release(self, amount):
+        """주문이 실패하면 예약했던 금액을 되돌림"""
+        with self.lock:
+            self.available += amount * self.fee_margin
+
+    def settle(self, amount):
+        """주문이 체결됨 (한 주기 안에서는 이미 차감했으므로 할 일 없음, 샤드 모드의 Coordinator 와 같은 인터페이스)"""
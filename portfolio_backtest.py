@@ -0,0 +1,244 @@
+import contextlib
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from candle_store import CandleStore
+from ledger import exposure, pnl_by_ticker
+from sim_exchange import SimExchange, kst_origin, minute_ns
+from trading import CoinBot
+
+SELL, BUY = 0, 1  # 같은 시각이면 매도를 먼저 처리
+
+event_dtype = np.dtype([('key', 'i8'), ('ticker', 'i4'), ('version', 'i4')])
+
+class EventQueue:
+    """(시각, 종류, 티커 번호, 버전) 이벤트를 NumPy 구조체 배열 하나에 담은 이진 힙
+
+    key = 시각(ns) * 2 + 종류 로 묶어 정수 하나만 비교함
+    """
+    def __init__(self, capacity=1024):
+        self.heap = np.empty(capacity, dtype=event_dtype)
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def push_many(self, times, kind, ticker=-1, version=0):
+        """여러 이벤트를 한 번에 추가 (정렬된 배열은 그 자체로 힙이므로 비어 있을 때는 정렬만 함)"""
+        records = np.empty(len(times), dtype=event_dtype)
+        records['key'] = np.asarray(times, dtype=np.int64) * 2 + kind
+        records['ticker'] = ticker
+        records['version'] = version
+        if self.size == 0:
+            records.sort(order='key')
+            self._reserve(len(records))
+            self.heap[:len(records)] = records
+            self.size = len(records)
+        else:
+            for record in records:
+                self._push(record)
+
+    def push(self, time, kind, ticker=-1, version=0):
+        self._reserve(self.size + 1)
+        self._push((time * 2 + kind, ticker, version))
+
+    def pop(self):
+        """(시각, 종류, 티커 번호, 버전) 반환"""
+        heap = self.heap
+        top = heap[0].copy()
+        self.size -= 1
+        if self.size:
+            last = heap[self.size].copy()
+            i = 0
+            while True:
+                child = 2 * i + 1
+                if child >= self.size:
+                    break
+                if child + 1 < self.size and heap['key'][child + 1] < heap['key'][child]:
+                    child += 1
+                if heap['key'][child] >= last['key']:
+                    break
+                heap[i] = heap[child]
+                i = child
+            heap[i] = last
+        key = int(top['key'])
+        return key // 2, key % 2, int(top['ticker']), int(top['version'])
+
+    def _push(self, record):
+        self._reserve(self.size + 1)
+        heap = self.heap
+        i = self.size
+        self.size += 1
+        key = record[0]
+        while i:
+            parent = (i - 1) // 2
+            if heap['key'][parent] <= key:
+                break
+            heap[i] = heap[parent]
+            i = parent
+        heap[i] = record
+
+    def _reserve(self, size):
+        if size > len(self.heap):
+            grown = np.empty(max(size, 2 * len(self.heap)), dtype=event_dtype)
+            grown[:self.size] = self.heap[:self.size]
+            self.heap = grown
+
+class SilentWebClient:
+    def chat_postMessage(self, channel, text):
+        pass
+
+class PortfolioBacktest:
+    """trading.py 의 CoinBot 을 그대로 모의 거래소와 모의 시계 위에서 실행하는 다종목 백테스트
+
+    - 4시간봉 마감 1분 뒤마다 execute_buy() 실행 (실제 봇과 동일)
+    - 포지션이 바뀔 때마다 1분봉 고가 / 저가가 익절 / 손절가를 처음 넘는 시각을 배열 연산으로 찾아 매도 이벤트로 예약하고
+      그 시각에 execute_sell() 실행
+    """
+    def __init__(self, minute_data, config, start_cash=1_000_000, fee=0.0005, buy_interval=240):
+        self.tickers = list(config)
+        self.config = config
+        self.buy_interval = buy_interval
+        self.exchange = SimExchange(minute_data, start_cash=start_cash, fee=fee)
+        self.start_cash = start_cash
+        self.workdir = tempfile.TemporaryDirectory()
+
+        self.exchange.set_time(min(d['time'][0] for d in self.exchange.data.values()))
+        with contextlib.redirect_stdout(open(os.devnull, "w")):
+            self.bot = CoinBot(None, None, "backtest", exchange=self.exchange, web_client=SilentWebClient(),
+                               buy_log_path=os.path.join(self.workdir.name, "buy_log.json"), config=config,
+                               ledger_path=os.path.join(self.workdir.name, "trades"))
+        self.bot.buy_workers = 1  # 티커 순서대로 잔고를 나눠 써야 결과가 매번 같음
+
+        self.versions = np.zeros(len(self.tickers), dtype=np.int32)
+        self.positions = {}  # ticker -> (평균 매수가, 투자금) 마지막으로 예약한 기준
+        self.equity = []
+
+    def buy_times(self):
+        start = min(d['time'][0] for d in self.exchange.data.values())
+        end = max(d['time'][-1] for d in self.exchange.data.values())
+        step = self.buy_interval * minute_ns
+        first = kst_origin + ((start - kst_origin) // step + 1) * step
+        return np.arange(first, end + 1, step, dtype=np.int64) + minute_ns  # 봉 마감 1분 뒤
+
+    def next_exit(self, ticker, buy_price, param):
+        """현재 시각 다음 1분봉부터 익절 / 손절가를 처음 넘는 1분봉의 시각 (없으면 None)"""
+        d = self.exchange.data[ticker]
+        take_profit = buy_price * param["take_profit_ratio"]
+        stop_loss = buy_price * param["stop_loss_ratio"]
+        start = self.exchange.index(ticker) + 1
+        block = 1024
+        while start < len(d['time']):
+            end = min(start + block, len(d['time']))
+            hit = (d['high'][start:end] >= take_profit) | (d['low'][start:end] <= stop_loss)
+            if hit.any():
+                return int(d['time'][start + int(hit.argmax())])
+            start, block = end, block * 4
+        return None
+
+    def schedule_exits(self, queue):
+        """포지션이 새로 생기거나 바뀐 티커의 매도 이벤트를 다시 예약 (이전 예약은 버전으로 무효화)"""
+        for i, ticker in enumerate(self.tickers):
+            info = self.bot.buy_flag.get(ticker)
+            state = (info['buy_price'], info.get('amount_krw', 0)) if info else None
+            if state == self.positions.get(ticker):
+                continue
+            self.versions[i] += 1
+            self.positions[ticker] = state
+            if state is not None:
+                exit_time = self.next_exit(ticker, state[0], self.config[ticker])
+                if exit_time is not None:
+                    queue.push(exit_time, SELL, i, int(self.versions[i]))
+
+    def run(self, verbose=False):
+        queue = EventQueue()
+        queue.push_many(self.buy_times(), BUY)
+        out = None if verbose else open(os.devnull, "w")
+        started = time.perf_counter()
+        events = 0
+
+        with contextlib.redirect_stdout(out) if out else contextlib.nullcontext():
+            while len(queue):
+                now, kind, ticker, version = queue.pop()
+                if kind == SELL and version != self.versions[ticker]:
+                    continue  # 포지션이 바뀌어 무효가 된 예약
+                events += 1
+
+                self.exchange.set_time(now)
+                self.bot.portfolio.invalidate()
+                if kind == BUY:
+                    self.bot.execute_buy()
+                else:
+                    self.bot.execute_sell()
+                    self.positions.pop(self.tickers[ticker], None)  # 매도 실패 시 다시 예약되도록
+                self.schedule_exits(queue)
+                self.equity.append((now, self.exchange.equity()))
+
+        elapsed = time.perf_counter() - started
+        self.bot.journal.close()
+        self.trades = self.bot.ledger.trades()  # 봇이 매도할 때마다 기록한 거래 장부
+        return self.result(events, elapsed)
+
+    def result(self, events, elapsed):
+        equity = np.array([e for _, e in self.equity]) if self.equity else np.array([self.start_cash])
+        running_max = np.maximum.accumulate(np.maximum(equity, self.start_cash))
+        sells = [t for t in self.exchange.trades if t['side'] == 'ask']
+        wins = sum(1 for t in sells if t['profit'] > 0)
+        fees = sum(t['fee'] for t in self.exchange.trades)
+
+        result = {
+            "events": events,
+            "elapsed": elapsed,
+            "buy_count": len(self.exchange.trades) - len(sells),
+            "sell_count": len(sells),
+            "win_rate": wins / len(sells) * 100 if sells else 0.0,
+            "final_equity": float(equity[-1]),
+            "accumulated_ror": float(equity[-1] / self.start_cash),
+            "mdd": float(((running_max - equity) / running_max * 100).max()),
+            "total_fee_paid": fees,
+            "exposure": exposure(self.trades),
+            "by_ticker": pnl_by_ticker(self.trades, self.bot.ledger.tickers),
+        }
+
+        print("=" * 60)
+        print(f"📊 [{len(self.tickers)}개 종목] CoinBot 포트폴리오 백테스트 결과")
+        print("-" * 60)
+        print(f"처리한 이벤트    : {events:,} ({elapsed:.1f}초)")
+        print(f"매수 / 매도 횟수 : {result['buy_count']} / {result['sell_count']}")
+        print(f"승률             : {result['win_rate']:.2f}%")
+        print(f"누적 수익률      : {result['accumulated_ror']:.4f}")
+        print(f"최종 자산        : {result['final_equity']:,.0f} 원")
+        print(f"거래 수수료 총액 : {fees:,.0f} 원")
+        print(f"최대 낙폭 (MDD)  : {result['mdd']:.2f}%")
+        print(f"보유 투자금      : 최대 {result['exposure']['max_krw']:,.0f} 원 / 평균 {result['exposure']['avg_krw']:,.0f} 원 "
+              f"(보유 시간 {result['exposure']['busy_ratio'] * 100:.1f}%)")
+        for row in result['by_ticker'].itertuples():
+            print(f"  [{row.Index}] 거래 {row.trade_count}회, 승률 {row.win_count / row.trade_count * 100:.0f}%, "
+                  f"순수익 {row.net_profit:,.0f} 원")
+        print("=" * 60)
+        return result
+
+def main():
+    config = {
+        "KRW-BTC": {"rsi_limit": 42, "take_profit_ratio": 1.15, "stop_loss_ratio": 0.97, "risk_ratio": 0.3},
+        "KRW-ETH": {"rsi_limit": 45, "take_profit_ratio": 1.10, "stop_loss_ratio": 0.95, "risk_ratio": 0.3},
+        "KRW-XRP": {"rsi_limit": 60, "take_profit_ratio": 1.15, "stop_loss_ratio": 0.92, "risk_ratio": 0.3},
+    }
+
+    # 1분봉 3개월치 (최초 실행 시에만 내려받고 이후에는 저장소에서 새 봉만 받음)
+    candles = CandleStore()
+    minute_data = {}
+    for ticker in config:
+        print(f"=== {ticker} 1분봉 로딩 중 ... ===")
+        df = candles.get_ohlcv(ticker, interval="minute1", count=60 * 24 * 90)
+        if df is not None:
+            minute_data[ticker] = df
+
+    config = {ticker: param for ticker, param in config.items() if ticker in minute_data}
+    PortfolioBacktest(minute_data, config).run()
+
+if __name__ == "__main__":
+    main()
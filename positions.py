@@ -0,0 +1,65 @@
+import threading
+
+class PositionBook:
+    """티커별 포지션 ({"buy_price", "buy_time", "amount_krw"}) 과 티커별 잠금
+
+    - 같은 티커의 매수 / 추가 매수 / 매도는 lock(ticker) 안에서 순서대로 실행되고, 다른 티커끼리는 동시에 진행됨
+    - 변경은 모두 journal 에 기록되며, 밖으로는 복사본만 돌려주므로 잠금 없이 포지션 dict 를 고칠 수 없음
+    """
+    def __init__(self, journal):
+        self.journal = journal
+        self.positions = journal.load()
+        self.guard = threading.Lock()  # positions / ticker_locks dict 자체를 보호
+        self.ticker_locks = {}
+
+    def lock(self, ticker):
+        """with book.lock(ticker): 로 사용, 같은 스레드에서 다시 잡아도 됨 (RLock)"""
+        with self.guard:
+            return self.ticker_locks.setdefault(ticker, threading.RLock())
+
+    def get(self, ticker, default=None):
+        with self.guard:
+            info = self.positions.get(ticker)
+            return dict(info) if info is not None else default
+
+    def items(self):
+        with self.guard:
+            return [(ticker, dict(info)) for ticker, info in self.positions.items()]
+
+    def __contains__(self, ticker):
+        with self.guard:
+            return ticker in self.positions
+
+    def __len__(self):
+        with self.guard:
+            return len(self.positions)
+
+    def add(self, ticker, amount_krw, price, buy_time):
+        """매수 반영 (이미 있으면 평단가를 갱신하는 추가 매수), (종류, 갱신된 포지션) 반환"""
+        with self.lock(ticker):
+            current = self.get(ticker)
+            if current is None:
+                kind = "buy"
+                info = {"buy_price": price, "buy_time": buy_time, "amount_krw": amount_krw}
+            else:
+                kind = "average_up"
+                prev_amount = current.get("amount_krw", 0)
+                total = prev_amount + amount_krw
+                info = {
+                    "buy_price": (current["buy_price"] * prev_amount + price * amount_krw) / total if total else price,
+                    "buy_time": buy_time,
+                    "amount_krw": total,
+                }
+            self.journal.record(kind, ticker, info)
+            with self.guard:
+                self.positions[ticker] = info
+            return kind, dict(info)
+
+    def remove(self, ticker, kind="sell"):
+        """포지션 삭제 (kind: sell / reset), 삭제된 포지션 반환 (없었으면 None)"""
+        with self.lock(ticker):
+            with self.guard:
+                info = self.positions.pop(ticker, None)
+            if info is not None:
+                self.journal.record(kind, ticker)
+            return info
@@ -0,0 +1,263 @@
+import copy
+import threading
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from candle_store import CandleStore, interval_minutes
+
+# 업비트 분봉 / 일봉은 UTC 0시 (KST 9시) 기준으로 나뉨, 시각은 KST 기준으로 다룸
+kst_origin = pd.Timestamp("1970-01-01 09:00").value
+minute_ns = 60 * 10**9
+max_provisional = 1440  # REST 1분봉 없이 체결로만 만든 1분봉을 이만큼까지 따로 보관 (넘으면 오래된 것부터 확정)
+
+def bar_group(time, minutes):
+    """time(ns) 이 속한 minutes 분봉 번호"""
+    return (time - kst_origin) // (minutes * minute_ns)
+
+def bar_start(time, minutes):
+    return kst_origin + bar_group(time, minutes) * minutes * minute_ns
+
+def fold(agg, bar, minutes):
+    """1분봉 bar 를 진행 중인 봉 agg 에 합침 → (bar 때문에 마감된 봉 또는 None, 새 agg)"""
+    start = bar_start(bar[0], minutes)
+    if agg is not None and agg[0] == start:
+        return None, (start, agg[1], max(agg[2], bar[2]), min(agg[3], bar[3]), bar[4], agg[5] + bar[5])
+    return agg, (start, bar[1], bar[2], bar[3], bar[4], bar[5])
+
+class BarSeries:
+    """한 티커, 한 간격의 봉 (마감된 봉 + 진행 중인 봉)
+
+    진행 중인 봉 = 이미 끝난 1분봉들을 합친 agg + 아직 바뀔 수 있는 마지막 1분봉 minute
+    체결로 만든 1분봉은 REST 1분봉이 올 때까지 provisional 에 따로 두고 조회할 때만 합침,
+    체결 스트림이 끊겨 빠진 분 / 틀린 값이 있어도 REST 1분봉이 오면 그 값으로 바뀜
+    """
+    def __init__(self, minutes, maxlen, since=None):
+        self.minutes = minutes
+        self.closed = deque(maxlen=maxlen)  # (time, open, high, low, close, volume)
+        self.agg = None
+        self.minute = None
+        self.provisional = {}  # 시각 -> 체결로 만든 1분봉 (REST 로 받은 마지막 1분봉 이후)
+        self.since = since  # 이 시각 이전 1분봉은 이미 과거 봉에 포함되어 있으므로 무시
+
+    def add_minute(self, bar, provisional=False):
+        if self.since is not None and bar[0] < self.since:
+            return
+        if provisional and self.minute is not None and bar[0] < self.minute[0]:
+            return  # REST 1분봉으로 이미 확정된 분
+        if provisional and (self.minute is None or bar[0] > self.minute[0]):
+            self.provisional[bar[0]] = bar
+            if len(self.provisional) > max_provisional:  # REST 동기화가 오래 없으면 가장 오래된 분부터 확정
+                self.add_minute(self.provisional[min(self.provisional)])
+            return
+
+        if self.minute is not None:
+            if bar[0] < self.minute[0]:
+                return  # 이미 반영된 1분봉
+            if bar[0] > self.minute[0]:
+                self._fold(self.minute)
+        self.minute = bar
+        if not provisional:
+            for time in [time for time in self.provisional if time <= bar[0]]:
+                del self.provisional[time]
+
+    def _fold(self, bar):
+        closed, self.agg = fold(self.agg, bar, self.minutes)
+        if closed is not None:
+            self.closed.append(closed)
+
+    def bars(self, count):
+        """마지막 count 개 봉 (마지막 봉은 진행 중인 봉)"""
+        bars = list(self.closed)
+        agg = self.agg
+        minutes = [] if self.minute is None else [self.minute]
+        minutes += [self.provisional[time] for time in sorted(self.provisional)]
+        for m in minutes:
+            closed, agg = fold(agg, m, self.minutes)
+            if closed is not None:
+                bars.append(closed)
+        if agg is not None:
+            bars.append(agg)
+        return bars[-count:]
+
+class BarResampler:
+    """1분봉 (또는 체결) 스트림 하나로 여러 간격의 봉을 증분으로 만듦"""
+    def __init__(self, maxlen=2000):
+        self.maxlen = maxlen
+        self.series = {}  # ticker -> {interval: BarSeries}
+        self.trade_minutes = {}  # ticker -> 체결로 만들고 있는 1분봉
+
+    def has(self, ticker, interval):
+        return interval in self.series.get(ticker, {})
+
+    def closed_count(self, ticker, interval):
+        return len(self.series[ticker][interval].closed) if self.has(ticker, interval) else 0
+
+    def seed(self, ticker, interval, df, since=None):
+        """거래소가 준 마감된 봉으로 과거 데이터를 채움 (since 이후 봉은 1분봉으로 만들어짐)"""
+        minutes = interval_minutes[interval]
+        if 1440 % minutes:
+            raise ValueError(f"지원하지 않는 봉 간격: {interval}")
+        series = BarSeries(minutes, self.maxlen, since=None if since is None else pd.Timestamp(since).value)
+        times = pd.DatetimeIndex(df.index).as_unit('ns').asi8
+        for row in zip(times, *(df[col].to_numpy(dtype=np.float64) for col in ('open', 'high', 'low', 'close', 'volume'))):
+            series.closed.append(tuple(row))
+        self.series.setdefault(ticker, {})[interval] = series
+
+    def add_bar(self, ticker, time, open_, high, low, close, volume, interval=None, provisional=False):
+        """1분봉 하나를 반영, 같은 시각의 1분봉이 다시 오면 (진행 중이던 봉) 덮어씀
+
+        provisional: 체결로 만든 1분봉 (이후 REST 로 같은 분 또는 더 늦은 분이 오면 그 값으로 대체됨)
+        """
+        bar = (int(time), float(open_), float(high), float(low), float(close), float(volume))
+        for name, series in self.series.get(ticker, {}).items():
+            if interval is None or name == interval:
+                series.add_minute(bar, provisional)
+
+    def add_trade(self, ticker, time, price, volume):
+        """체결 하나를 현재 1분봉에 반영"""
+        minute = int(time) - (int(time) - kst_origin) % minute_ns
+        bar = self.trade_minutes.get(ticker)
+        if bar is None or minute > bar[0]:
+            bar = (minute, price, price, price, price, volume)
+        elif minute == bar[0]:
+            bar = (minute, bar[1], max(bar[2], price), min(bar[3], price), price, bar[5] + volume)
+        else:
+            return
+        self.trade_minutes[ticker] = bar
+        self.add_bar(ticker, *bar, provisional=True)
+
+    def add_frame(self, ticker, df, interval=None):
+        times = pd.DatetimeIndex(df.index).as_unit('ns').asi8
+        cols = [df[col].to_numpy(dtype=np.float64) for col in ('open', 'high', 'low', 'close', 'volume')]
+        for row in zip(times, *cols):
+            self.add_bar(ticker, *row, interval=interval)
+
+    def get_ohlcv(self, ticker, interval, count=200):
+        bars = self.series[ticker][interval].bars(count)
+        if not bars:
+            return None
+        arr = np.array(bars, dtype=np.float64)
+        df = pd.DataFrame(arr[:, 1:], columns=['open', 'high', 'low', 'close', 'volume'],
+                          index=pd.DatetimeIndex(np.array([b[0] for b in bars], dtype='datetime64[ns]')))
+        df['value'] = df['close'] * df['volume']
+        return df
+
+class MarketData:
+    """1분봉 하나만 받아서 모든 간격의 봉을 pyupbit.get_ohlcv 와 같은 형식으로 제공
+
+    간격마다 처음 한 번만 거래소 봉으로 과거 데이터를 채우고, 이후에는 1분봉만 동기화함
+    """
+    def __init__(self, store=None, resampler=None):
+        self.store = store or CandleStore()
+        self.resampler = resampler or BarResampler()
+        self.fed = {}  # ticker -> 마지막으로 반영한 1분봉 시각
+        self.seeded = {}  # (ticker, interval) -> 과거 데이터를 채울 때 요청한 봉 개수
+        self.lock = threading.Lock()
+        self.ticker_locks = {}
+
+    def ticker_lock(self, ticker):
+        with self.lock:
+            return self.ticker_locks.setdefault(ticker, threading.Lock())
+
+    def get_ohlcv(self, ticker, interval="day", count=200):
+        with self.ticker_lock(ticker):
+            try:
+                if count > self.seeded.get((ticker, interval), 0):
+                    self._seed(ticker, interval, count)
+                else:
+                    self._sync(ticker)
+            except Exception as e:
+                print(f"[{ticker}] {interval} 봉 동기화 실패: {e}")
+            if not self.resampler.has(ticker, interval):
+                return None
+            return self.resampler.get_ohlcv(ticker, interval, count)
+
+    def add_trade(self, ticker, time, price, volume):
+        """체결 스트림에서 받은 체결 반영 (REST 로 받은 1분봉이 오면 그 분까지의 체결 1분봉은 모두 그 값으로 바뀜)"""
+        with self.ticker_lock(ticker):
+            self.resampler.add_trade(ticker, time, price, volume)
+
+    def state(self):
+        """재시작용 상태: 티커별로 잠금을 잡고 만들어 둔 봉과 동기화 위치를 복사"""
+        state = {}
+        for ticker in list(self.resampler.series):
+            with self.ticker_lock(ticker):
+                state[ticker] = copy.deepcopy({
+                    "series": self.resampler.series[ticker],
+                    "trade_minute": self.resampler.trade_minutes.get(ticker),
+                    "fed": self.fed.get(ticker),
+                    "seeded": {interval: count for (t, interval), count in self.seeded.items() if t == ticker},
+                })
+        return state
+
+    def restore(self, state):
+        """state() 로 저장한 봉을 다시 채움, 이후 get_ohlcv 는 과거 봉을 다시 받지 않고 그 뒤의 1분봉만 동기화"""
+        for ticker, saved in state.items():
+            with self.ticker_lock(ticker):
+                self.resampler.series[ticker] = saved["series"]
+                if saved["trade_minute"] is not None:
+                    self.resampler.trade_minutes[ticker] = saved["trade_minute"]
+                if saved["fed"] is not None:
+                    self.fed[ticker] = saved["fed"]
+                for interval, count in saved["seeded"].items():
+                    self.seeded[(ticker, interval)] = count
+
+    def _sync(self, ticker):
+        self.store.sync(ticker, "minute1")
+        self._feed(ticker)
+
+    def _feed(self, ticker):
+        new = self.store.get(ticker, "minute1", start=self.fed.get(ticker))
+        if len(new):
+            self.resampler.add_frame(ticker, new)
+            self.fed[ticker] = new.index[-1]
+
+    def _seed(self, ticker, interval, count):
+        df = self.store.get_ohlcv(ticker, interval=interval, count=count)
+        if df is None or df.empty:
+            return
+        partial_start = df.index[-1]
+        self.seeded[(ticker, interval)] = count
+
+        # 진행 중인 봉에 들어가는 1분봉 확보 (먼저 저장된 1분봉이 그보다 뒤에서 시작하면 앞부분을 다시 받음)
+        self.store.sync(ticker, "minute1", since=partial_start)
+        minute_bars = self.store.get(ticker, "minute1", start=partial_start)
+
+        self.resampler.seed(ticker, interval, df.iloc[:-1], since=partial_start)
+        self.resampler.add_frame(ticker, minute_bars, interval=interval)
+
+        # 다른 간격에도 그 사이 새로 받은 1분봉 반영
+        self.fed.setdefault(ticker, partial_start)
+        self._feed(ticker)
+
+def verify(store, ticker, interval, tolerance=1e-6):
+    """저장된 1분봉으로 만든 봉과 거래소가 준 봉 (같은 저장소에 기록된 것) 을 비교, 불일치 개수 반환"""
+    minute_bars = store.get(ticker, "minute1")
+    expected = store.get(ticker, interval)
+    if not len(minute_bars) or not len(expected):
+        return 0, 0
+
+    resampler = BarResampler(maxlen=len(expected) + 10)
+    resampler.seed(ticker, interval, expected.iloc[:0])
+    resampler.add_frame(ticker, minute_bars)
+    built = resampler.get_ohlcv(ticker, interval, count=len(expected) + 10).iloc[:-1]
+
+    # 1분봉이 다 있는 구간의 봉만 비교 (첫 봉은 앞부분이 잘렸을 수 있음)
+    common = built.index.intersection(expected.index)[1:]
+    cols = ['open', 'high', 'low', 'close', 'volume']
+    diff = ~np.isclose(built.loc[common, cols].to_numpy(), expected.loc[common, cols].to_numpy(), rtol=tolerance)
+    return int(diff.any(axis=1).sum()), len(common)
+
+def main():
+    store = CandleStore()
+    for ticker in ["KRW-BTC", "KRW-ETH"]:
+        store.sync(ticker, "minute1", count=60 * 24 * 3)
+        for interval in ["minute60", "minute240", "day"]:
+            store.sync(ticker, interval, count=20)
+            mismatched, total = verify(store, ticker, interval)
+            print(f"[{ticker}] {interval}: {total}개 봉 중 불일치 {mismatched}개")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from backtesting import simulate_vectorized
+from indicator_cache import shared_cache
+from optimizer import SharedIndicators, _init_worker, _run_chunk, _worker_arrays, load_data
+
+result_columns = [
+    'ticker', 'rsi_limit', 'take_profit_ratio', 'stop_loss_ratio',
+    'accumulated_ror', 'mdd', 'win_rate', 'trade_count', 'total_fee_paid'
+]
+
+def _run_monte_carlo(ticker, param, window, sims, seed, start_cash, risk_ratio, fee):
+    """구간에서 나온 거래별 수익률을 복원 추출로 섞어 sims 개의 잔액 경로를 만들고 (누적 수익률, MDD) 반환"""
+    arrays = _worker_arrays[ticker]
+    if window is not None:
+        arrays = arrays[:, window[0]:window[1]]
+    rsi_limit, take_profit_ratio, stop_loss_ratio = param
+    trade_ror = simulate_vectorized(
+        *arrays,
+        start_cash=start_cash,
+        risk_ratio=risk_ratio,
+        rsi_limit=rsi_limit,
+        take_profit_ratio=take_profit_ratio,
+        stop_loss_ratio=stop_loss_ratio,
+        fee=fee
+    )['trade_ror']
+    if not len(trade_ror):
+        return np.ones(sims), np.zeros(sims)
+
+    rng = np.random.default_rng(seed)
+    growth = 1 + risk_ratio * (trade_ror[rng.integers(0, len(trade_ror), size=(sims, len(trade_ror)))] - 1)
+    equity = start_cash * np.cumprod(growth, axis=1)
+    running_max = np.maximum.accumulate(np.maximum(equity, start_cash), axis=1)
+    mdd = ((running_max - equity) / running_max * 100).max(axis=1)
+    return equity[:, -1] / start_cash, mdd
+
+def folds(length, train_bars, test_bars, step=None):
+    """(train_start, train_end, test_end) 목록, 학습 구간 바로 뒤 test_bars 개 봉이 검증 구간"""
+    step = step or test_bars
+    return [(start, start + train_bars, start + train_bars + test_bars)
+            for start in range(0, length - train_bars - test_bars + 1, step)]
+
+def walk_forward(data, rsi_limits, take_profit_ratios, stop_loss_ratios, train_bars=540, test_bars=90, step=None,
+                 start_cash=1_000_000, risk_ratio=1.0, fee=0.0005, processes=None, chunk_size=500):
+    """학습 구간에서 최적 조합을 고르고 바로 다음 검증 구간에서 성과를 측정하는 과정을 구간을 밀면서 반복
+
+    지표는 티커별로 전체 기간에서 한 번만 계산해 공유 메모리에 두고 모든 구간이 잘라서 사용함
+    반환: 티커 x 구간별 (학습 최적 조합, 학습 / 검증 성과) DataFrame
+    """
+    combos = list(itertools.product(rsi_limits, take_profit_ratios, stop_loss_ratios))
+    processes = processes or os.cpu_count()
+
+    with SharedIndicators(data) as shared:
+        with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker, initargs=(shared.blocks,)) as pool:
+            # 모든 티커 / 구간의 학습을 한 번에 제출해서 코어를 놀리지 않음
+            tasks = {}
+            for ticker, (_, shape) in shared.blocks.items():
+                for fold, (train_start, train_end, test_end) in enumerate(folds(shape[1], train_bars, test_bars, step)):
+                    tasks[(ticker, fold)] = (train_start, train_end, test_end), [
+                        pool.submit(_run_chunk, ticker, combos[i:i + chunk_size], start_cash, risk_ratio, fee,
+                                    (train_start, train_end))
+                        for i in range(0, len(combos), chunk_size)
+                    ]
+
+            best = {}
+            for key, (window, futures) in tasks.items():
+                train = pd.DataFrame([row for future in futures for row in future.result()], columns=result_columns)
+                best[key] = window, train.sort_values(['accumulated_ror', 'mdd'], ascending=[False, True]).iloc[0]
+
+            tests = {
+                key: pool.submit(_run_chunk, key[0], [(row.rsi_limit, row.take_profit_ratio, row.stop_loss_ratio)],
+                                 start_cash, risk_ratio, fee, (window[1], window[2]))
+                for key, (window, row) in best.items()
+            }
+
+            rows = []
+            for (ticker, fold), (window, train) in best.items():
+                test = dict(zip(result_columns, tests[(ticker, fold)].result()[0]))
+                index = data[ticker].index[20:]  # 지표 배열은 20번째 봉부터
+                rows.append({
+                    'ticker': ticker,
+                    'fold': fold,
+                    'train_start': index[window[0]],
+                    'test_start': index[window[1]],
+                    'test_end': index[window[2] - 1],
+                    'rsi_limit': train.rsi_limit,
+                    'take_profit_ratio': train.take_profit_ratio,
+                    'stop_loss_ratio': train.stop_loss_ratio,
+                    'train_ror': train.accumulated_ror,
+                    'test_ror': test['accumulated_ror'],
+                    'test_mdd': test['mdd'],
+                    'test_trades': test['trade_count'],
+                })
+    return pd.DataFrame(rows)
+
+def monte_carlo(data, params, sims=10_000, window=None, start_cash=1_000_000, risk_ratio=1.0, fee=0.0005,
+                processes=None, chunk_size=1000, seed=0):
+    """티커별 파라미터로 나온 거래 순서를 복원 추출로 섞어 누적 수익률 / MDD 분포를 구함
+
+    params: ticker -> (rsi_limit, take_profit_ratio, stop_loss_ratio)
+    반환: ticker -> {'ror': 배열, 'mdd': 배열}
+    """
+    processes = processes or os.cpu_count()
+    seeds = iter(np.random.SeedSequence(seed).spawn(len(params) * (sims // chunk_size + 1)))
+
+    with SharedIndicators({ticker: data[ticker] for ticker in params}) as shared:
+        with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker, initargs=(shared.blocks,)) as pool:
+            futures = {
+                ticker: [
+                    pool.submit(_run_monte_carlo, ticker, tuple(param), window, min(chunk_size, sims - i), next(seeds),
+                                start_cash, risk_ratio, fee)
+                    for i in range(0, sims, chunk_size)
+                ]
+                for ticker, param in params.items()
+            }
+            results = {}
+            for ticker, chunks in futures.items():
+                parts = [future.result() for future in chunks]
+                results[ticker] = {
+                    'ror': np.concatenate([ror for ror, _ in parts]),
+                    'mdd': np.concatenate([mdd for _, mdd in parts]),
+                }
+    return results
+
+def report_walk_forward(table):
+    print("=" * 60)
+    print("📊 워크 포워드 결과 (학습 구간 최적 조합 → 다음 구간 검증)")
+    print("-" * 60)
+    for ticker, rows in table.groupby('ticker', sort=False):
+        for row in rows.itertuples():
+            print(f"[{ticker} #{row.fold}] {row.test_start:%Y-%m-%d} ~ {row.test_end:%Y-%m-%d} | "
+                  f"RSI {row.rsi_limit}, 익절 {row.take_profit_ratio}, 손절 {row.stop_loss_ratio} | "
+                  f"학습 {row.train_ror:.4f} → 검증 {row.test_ror:.4f} (MDD {row.test_mdd:.2f}%, {row.test_trades}회)")
+        print(f"[{ticker}] 검증 구간 이어붙인 누적 수익률 : {rows['test_ror'].prod():.4f} "
+              f"(학습 구간 평균 {rows['train_ror'].mean():.4f})")
+    print("=" * 60)
+
+def report_monte_carlo(results):
+    print("=" * 60)
+    print("🎲 몬테카를로 결과 (거래 순서 복원 추출)")
+    print("-" * 60)
+    for ticker, result in results.items():
+        ror = np.percentile(result['ror'], [5, 50, 95])
+        mdd = np.percentile(result['mdd'], [5, 50, 95])
+        print(f"[{ticker}] {len(result['ror']):,}회 | 누적 수익률 5/50/95% : {ror[0]:.4f} / {ror[1]:.4f} / {ror[2]:.4f} | "
+              f"손실 확률 {(result['ror'] < 1).mean() * 100:.1f}%")
+        print(f"    MDD 5/50/95% : {mdd[0]:.2f}% / {mdd[1]:.2f}% / {mdd[2]:.2f}%")
+    print("=" * 60)
+
+def main():
+    tickers = ["KRW-BTC", "KRW-BLAST", "KRW-ARK"]
+    data = load_data(tickers, count=2160)  # 4시간봉 1년치
+
+    start = time.perf_counter()
+    table = walk_forward(
+        data,
+        rsi_limits=range(30, 100, 2),
+        take_profit_ratios=np.round(np.arange(1.02, 1.31, 0.01), 2),
+        stop_loss_ratios=np.round(np.arange(0.85, 0.995, 0.01), 2)
+    )
+    print(f"🔍 워크 포워드 완료 ({time.perf_counter() - start:.1f}초)\n")
+    report_walk_forward(table)
+
+    # 마지막 구간에서 고른 조합으로 전체 기간의 거래 순서를 섞어 분포 추정
+    start = time.perf_counter()
+    last = table.groupby('ticker').tail(1)
+    params = {row.ticker: (row.rsi_limit, row.take_profit_ratio, row.stop_loss_ratio) for row in last.itertuples()}
+    results = monte_carlo(data, params)
+    print(f"🎲 몬테카를로 완료 ({time.perf_counter() - start:.1f}초)\n")
+    report_monte_carlo(results)
+    print(shared_cache.summary())  # 워크 포워드와 몬테카를로가 같은 봉의 지표를 한 번만 계산
+
+if __name__ == "__main__":
+    main()
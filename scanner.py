@@ -0,0 +1,65 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+class TokenBucket:
+    """초당 rate 개까지 요청을 허용하는 토큰 버킷 (여러 스레드에서 공유)
+
+    capacity 가 1 이면 요청을 1/rate 초 간격으로 고르게 보내므로 어느 1초 구간에서도 한도를 넘지 않음
+    """
+    def __init__(self, rate=10, capacity=1, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = self.capacity
+        self.clock = clock
+        self.sleep = sleep
+        self.updated = clock()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = self.clock()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            self.sleep(wait)
+
+class Scanner:
+    """여러 티커를 스레드 풀에서 동시에 조회하되 거래소 초당 요청 한도를 지킴
+
+    업비트 시세 조회 API 는 초당 10회 제한이므로 기본값을 10 으로 둠
+    """
+    def __init__(self, rate=10, workers=8, retries=3, backoff=0.5, bucket=None):
+        self.bucket = bucket or TokenBucket(rate)
+        self.workers = workers
+        self.retries = retries
+        self.backoff = backoff
+
+    def call(self, fetch, ticker):
+        """fetch(ticker) 를 한도 내에서 호출, 예외나 None 이면 지수 백오프 후 재시도"""
+        for attempt in range(self.retries + 1):
+            self.bucket.acquire()
+            try:
+                result = fetch(ticker)
+                if result is not None:
+                    return result
+            except Exception as e:
+                print(f"[{ticker}] 조회 실패 ({attempt + 1}회): {e}")
+
+            if attempt < self.retries:
+                time.sleep(self.backoff * 2 ** attempt * random.uniform(0.5, 1.5))
+        return None
+
+    def scan(self, tickers, fetch):
+        """(ticker, 결과) 를 완료되는 순서대로 바로바로 돌려줌 (끝내 실패한 티커는 제외)"""
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {pool.submit(self.call, fetch, ticker): ticker for ticker in tickers}
+            for future in as_completed(futures):
+                result = future.result()
+                if result is not None:
+                    yield futures[future], result
@@ -0,0 +1,233 @@
+import itertools
+import math
+import threading
+import time
+
+class SystemClock:
+    """실제 시각 (epoch 초)"""
+    def now(self):
+        return time.time()
+
+class SimClock:
+    """시뮬레이션 시각, Scheduler.run_until() 이 다음 작업 시각으로 바로 옮김"""
+    def __init__(self, start=0.0):
+        self.time = float(start)
+
+    def now(self):
+        return self.time
+
+    def set(self, when):
+        self.time = max(self.time, when)
+
+class Job:
+    __slots__ = ('deadline', 'seq', 'func', 'key', 'group', 'interval', 'offset', 'cancelled', 'running', 'tick')
+
+    def __init__(self, deadline, seq, func, key, group, interval=None, offset=0.0):
+        self.deadline = deadline
+        self.seq = seq
+        self.func = func
+        self.key = key
+        self.group = group
+        self.interval = interval
+        self.offset = offset
+        self.cancelled = False
+        self.running = False
+        self.tick = None
+
+def next_boundary(now, interval, offset=0.0):
+    """now 이후 처음 오는 (interval 배수 + offset) 시각, 업비트 봉 경계는 UTC 0시 (epoch) 기준"""
+    return (math.floor((now - offset) / interval) + 1) * interval + offset
+
+class Scheduler:
+    """해시 타이머 휠로 작업을 정확한 시각에 실행 (봉 마감, 매도 검사 주기 등)
+
+    - tick 초 단위 칸 size 개로 된 휠에 작업을 넣고 꺼내는 것은 O(1), 취소는 표시만 하고 꺼낼 때 버림
+    - 스레드는 가장 빠른 작업 시각까지 한 번에 잠들고, 새 작업이 더 빠르면 깨어나서 다시 계산
+    - clock 을 SimClock 으로 바꾸면 run_until() 이 잠들지 않고 시각만 옮기며 실행 (일주일도 밀리초 단위)
+    - clock 에 speed (배속) 가 있으면 run_forever() 는 그만큼 짧게 잠듦 (모의 투자 ReplayClock)
+    - executor 를 주면 작업을 그 스레드 풀에서 실행 (같은 반복 작업은 이전 실행이 끝나지 않았으면 건너뜀)
+    - 작업에서 난 예외는 on_error(key, e) 로 넘기고 다음 예약은 그대로 유지
+    """
+    def __init__(self, clock=None, tick=1.0, size=4096, executor=None, on_error=None):
+        self.clock = clock or SystemClock()
+        self.tick = tick
+        self.slots = [[] for _ in range(size)]
+        self.cursor = math.floor(self.clock.now() / tick)  # 이 tick 칸부터 다시 확인
+        self.jobs = {}        # key -> Job
+        self.count = 0        # 휠에 들어 있는 작업 수 (취소된 것 포함)
+        self.earliest = None  # 가장 빠른 작업 시각 (None 이면 다음에 다시 계산)
+        self.executor = executor
+        self.on_error = on_error
+        self.seq = itertools.count()
+        self.cond = threading.Condition()
+        self.stopped = False
+        self.wakeups = 0
+        self.fired = 0
+
+    # --- 예약 / 취소 ---
+
+    def at(self, when, func, key=None, group=None):
+        """when (epoch 초) 에 func() 를 한 번 실행"""
+        with self.cond:
+            return self._add(Job(when, next(self.seq), func, key, group))
+
+    def every(self, interval, func, offset=0.0, key=None, group=None):
+        """interval 초 경계 + offset 마다 func() 실행 (예: 4시간봉 마감 1분 뒤 = every(4 * 3600, f, offset=60))"""
+        with self.cond:
+            job = Job(next_boundary(self.clock.now(), interval, offset), next(self.seq), func, key, group, interval, offset)
+            return self._add(job)
+
+    def cancel(self, key=None, group=None):
+        """key 가 같은 작업 또는 group 에 속한 작업을 취소 (둘 다 없으면 전부), 취소한 개수 반환"""
+        with self.cond:
+            if key is not None:
+                jobs = [self.jobs[key]] if key in self.jobs else []
+            else:
+                jobs = [job for job in self.jobs.values() if group is None or job.group == group]
+            for job in jobs:
+                job.cancelled = True
+                self.jobs.pop(job.key, None)
+            self.earliest = None
+            self.cond.notify()
+            return len(jobs)
+
+    def pending(self):
+        with self.cond:
+            return sorted(((job.deadline, job.key) for job in self.jobs.values()), key=lambda item: item[0])
+
+    def _add(self, job):
+        if job.key is None:
+            job.key = ("job", job.seq)
+        old = self.jobs.get(job.key)
+        if old is not None:
+            old.cancelled = True  # 같은 key 는 새 예약으로 교체 (티커별 주기 변경 등)
+        self.jobs[job.key] = job
+        self._insert(job)
+        return job
+
+    def _insert(self, job):
+        job.tick = max(math.floor(job.deadline / self.tick), self.cursor)  # 이미 지난 시각이면 바로 다음 확인 때 실행
+        self.slots[job.tick % len(self.slots)].append(job)
+        self.count += 1
+        if self.earliest is not None and job.deadline < self.earliest:
+            self.earliest = job.deadline
+        self.cond.notify()
+
+    # --- 실행 ---
+
+    def _due(self, now):
+        """now 까지 실행할 작업을 꺼내서 시각 순으로 반환"""
+        now_tick = math.floor(now / self.tick)
+        due = []
+        slots, size = self.slots, len(self.slots)
+        # 휠 한 바퀴 이상 건너뛰면 모든 칸을 한 번씩만 보면 됨
+        for tick in range(max(self.cursor, now_tick - size), now_tick + 1):
+            slot = slots[tick % size]
+            if not slot:
+                continue
+            keep = []
+            for job in slot:
+                if job.cancelled:
+                    self.count -= 1
+                elif job.tick <= now_tick and job.deadline <= now:
+                    due.append(job)
+                    self.count -= 1
+                else:
+                    keep.append(job)
+            slot[:] = keep
+        self.cursor = max(self.cursor, now_tick)  # 현재 칸에는 아직 시각이 안 된 작업이 남을 수 있으므로 다음에도 확인
+        self.earliest = None
+        due.sort(key=lambda job: (job.deadline, job.seq))
+        return due
+
+    def _next_deadline(self):
+        if self.earliest is None and self.count:
+            # 커서부터 한 바퀴 안에서 이번 회차 작업이 있는 첫 칸을 찾고, 없으면 (모두 한 바퀴 뒤) 전체에서 찾음
+            size = len(self.slots)
+            slots = self.slots
+            for tick in range(self.cursor, self.cursor + size):
+                slot = slots[tick % size]
+                if not slot:
+                    continue
+                found = [job.deadline for job in slot if job.tick == tick and not job.cancelled]
+                if found:
+                    self.earliest = min(found)
+                    break
+            else:
+                live = [job.deadline for slot in self.slots for job in slot if not job.cancelled]
+                self.count = len(live)
+                self.earliest = min(live) if live else None
+        return self.earliest
+
+    def _fire(self, job):
+        """반복 작업이면 다음 시각을 먼저 예약하고 실행"""
+        if job.interval is not None and not job.cancelled:
+            # 오래 멈춰 있었다면 밀린 회차를 몰아서 실행하지 않고 다음 경계로 건너뜀
+            job.deadline = next_boundary(max(job.deadline, self.clock.now()), job.interval, job.offset)
+            job.seq = next(self.seq)
+            self._insert(job)
+        elif self.jobs.get(job.key) is job:
+            del self.jobs[job.key]
+
+        if job.running:
+            print(f"⚠️ 이전 실행이 끝나지 않아 건너뜀: {job.key}")
+            return None
+        job.running = True
+        self.fired += 1
+        return job
+
+    def _run(self, job):
+        try:
+            job.func()
+        except Exception as e:
+            if self.on_error is not None:
+                self.on_error(job.key, e)
+            else:
+                print(f"🚨 예약 작업 오류 ({job.key}): {e}")
+        finally:
+            job.running = False
+
+    def run_until(self, end):
+        """SimClock 용: end 까지의 작업을 시각 순서대로 모두 실행 (잠들지 않음)"""
+        while True:
+            with self.cond:
+                deadline = self._next_deadline()
+                if deadline is None or deadline > end:
+                    break
+                self.clock.set(deadline)
+                # deadline 이 가장 빠른 작업이므로 그 앞 칸들에는 실행할 작업이 없음
+                self.cursor = max(self.cursor, math.floor(deadline / self.tick))
+                jobs = [job for job in map(self._fire, self._due(deadline)) if job is not None]
+            for job in jobs:
+                self._run(job)
+        self.clock.set(end)
+
+    def run_forever(self):
+        """실제 시각으로 작업 실행 (stop() 이 호출될 때까지)"""
+        while True:
+            with self.cond:
+                while not self.stopped:
+                    deadline = self._next_deadline()
+                    timeout = None if deadline is None else (deadline - self.clock.now()) / getattr(self.clock, "speed", 1.0)
+                    if timeout is not None and timeout <= 0:
+                        break
+                    self.cond.wait(timeout)
+                    self.wakeups += 1
+                if self.stopped:
+                    return
+                jobs = [job for job in map(self._fire, self._due(self.clock.now())) if job is not None]
+            for job in jobs:
+                if self.executor is not None:
+                    self.executor.submit(self._run, job)
+                else:
+                    self._run(job)
+
+    def start(self):
+        thread = threading.Thread(target=self.run_forever, daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        with self.cond:
+            self.stopped = True
+            self.cond.notify()
@@ -0,0 +1,151 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+from candle_store import CandleStore, interval_minutes
+from scanner import Scanner
+
+class MarketMatrix:
+    """티커 x 봉 2차원 배열 묶음, 모든 티커가 같은 봉 시각 (times, KST ns) 을 공유
+
+    거래가 없어 빠진 봉은 직전 종가로 채우고 거래량 0 (업비트는 거래 없는 봉을 내려주지 않음),
+    첫 봉보다 앞은 NaN
+    """
+    def __init__(self, tickers, times, open_, high, low, close, volume):
+        self.tickers = list(tickers)
+        self.times = times
+        self.open = open_
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+
+    def __len__(self):
+        return len(self.tickers)
+
+def align(frames, count, bar_minutes):
+    """ticker -> OHLCV DataFrame 을 마지막 봉 시각 기준 count 개 봉 격자에 맞춘 MarketMatrix 로 변환"""
+    frames = {ticker: df for ticker, df in frames.items() if df is not None and len(df)}
+    step = bar_minutes * 60 * 10**9
+    last = max((pd.DatetimeIndex(df.index).as_unit('ns').asi8[-1] for df in frames.values()), default=0)
+    times = last - step * np.arange(count - 1, -1, -1, dtype=np.int64)
+
+    shape = (len(frames), count)
+    arrays = {col: np.full(shape, np.nan) for col in ('open', 'high', 'low', 'close')}
+    arrays['volume'] = np.zeros(shape)
+    filled = np.zeros(shape, dtype=bool)
+    for row, df in enumerate(frames.values()):
+        index = pd.DatetimeIndex(df.index).as_unit('ns').asi8
+        keep = index >= times[0]
+        slots = (index[keep] - times[0]) // step
+        for col in arrays:
+            arrays[col][row, slots] = df[col].to_numpy(dtype=np.float64)[keep]
+        filled[row, slots] = True
+
+        # 격자 앞쪽 구간 직전 봉이 있으면 그 종가부터 이어받음
+        before = np.flatnonzero(~keep)
+        if len(before) and not filled[row, 0]:
+            for col in ('open', 'high', 'low', 'close'):
+                arrays[col][row, 0] = df['close'].iloc[before[-1]]
+            filled[row, 0] = True
+
+    # 빠진 봉은 직전 종가 (앞으로 채우기), 시가 / 고가 / 저가도 그 값으로
+    last_filled = np.maximum.accumulate(np.where(filled, np.arange(count), -1), axis=1)
+    rows = np.arange(shape[0])[:, None]
+    close = np.where(last_filled >= 0, arrays['close'][rows, np.maximum(last_filled, 0)], np.nan)
+    for col in ('open', 'high', 'low'):
+        arrays[col] = np.where(filled, arrays[col], close)
+    return MarketMatrix(frames.keys(), times, arrays['open'], arrays['high'], arrays['low'], close, arrays['volume'])
+
+def rolling_mean(values, window):
+    """행마다 window 개 이동평균 (pandas rolling(window).mean() 과 같은 자리에 NaN), 누적합 차이로 한 번에 계산"""
+    out = np.full(values.shape, np.nan)
+    if values.shape[1] < window:
+        return out
+    total = np.cumsum(np.nan_to_num(values), axis=1)
+    total = np.concatenate((np.zeros((len(values), 1)), total), axis=1)
+    valid = np.cumsum(~np.isnan(values), axis=1)
+    valid = np.concatenate((np.zeros((len(values), 1), dtype=valid.dtype), valid), axis=1)
+    full = (valid[:, window:] - valid[:, :-window]) == window
+    out[:, window - 1:] = np.where(full, (total[:, window:] - total[:, :-window]) / window, np.nan)
+    return out
+
+def indicators(close, ma_window=20, rsi_period=14):
+    """모든 티커의 (MA20, RSI) 행렬, indicators.get_rsi 와 같은 단순 이동평균 방식"""
+    ma = rolling_mean(close, ma_window)
+    delta = np.diff(close, axis=1, prepend=np.nan)
+    avg_gain = rolling_mean(np.where(np.isnan(delta), np.nan, np.clip(delta, 0, None)), rsi_period)
+    avg_loss = rolling_mean(np.where(np.isnan(delta), np.nan, np.clip(-delta, 0, None)), rsi_period)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi = 100 - 100 / (1 + avg_gain / avg_loss)
+    return ma, rsi
+
+def screen(matrix, rsi_limit=45, value_bars=6, min_value=0.0):
+    """최신 봉 기준 매수 조건 (종가 > MA20, RSI < rsi_limit) 을 모든 티커에 한 번에 계산
+
+    rsi_limit 은 숫자 하나 또는 티커 순서의 배열, 최근 value_bars 개 봉 거래대금이 min_value 미만이면 제외
+    반환: 조건을 만족하는 티커가 먼저, 그 안에서 거래대금 큰 순으로 정렬된 DataFrame
+    """
+    ma, rsi = indicators(matrix.close)
+    close = matrix.close[:, -1]
+    value = (matrix.close[:, -value_bars:] * matrix.volume[:, -value_bars:]).sum(axis=1)
+    with np.errstate(invalid='ignore'):
+        buy = (close > ma[:, -1]) & (rsi[:, -1] < np.asarray(rsi_limit)) & (value >= min_value)
+
+    table = pd.DataFrame({
+        "close": close,
+        "ma20": ma[:, -1],
+        "rsi": rsi[:, -1],
+        "gap": close / ma[:, -1] - 1,  # MA20 대비 이격
+        "value": value,
+        "buy": buy,
+    }, index=pd.Index(matrix.tickers, name="ticker"))
+    return table.sort_values(["buy", "value"], ascending=[False, False])
+
+def krw_tickers():
+    import pyupbit
+    return pyupbit.get_tickers(fiat="KRW")
+
+class Screener:
+    """KRW 마켓 전체의 최근 count 개 봉을 받아 한 번에 매수 후보를 고름
+
+    봉은 CandleStore 에 저장해 두고 새 봉만 받으며, 요청은 Scanner 로 초당 한도 안에서 동시에 보냄
+    """
+    def __init__(self, store=None, scanner=None, interval="minute240", count=50, list_tickers=None):
+        self.store = store or CandleStore()
+        self.scanner = scanner or Scanner(rate=10)
+        self.interval = interval
+        self.count = count
+        self.list_tickers = list_tickers or krw_tickers
+        self.load_time = 0.0
+        self.scan_time = 0.0
+
+    def load(self, tickers=None):
+        started = time.perf_counter()
+        tickers = tickers if tickers is not None else self.list_tickers()
+        fetch = lambda ticker: self.store.get_ohlcv(ticker, interval=self.interval, count=self.count)
+        frames = dict(self.scanner.scan(tickers, fetch))
+        matrix = align({ticker: frames.get(ticker) for ticker in tickers}, self.count, interval_minutes[self.interval])
+        self.load_time = time.perf_counter() - started
+        return matrix
+
+    def candidates(self, rsi_limit=45, top=None, tickers=None, min_value=0.0):
+        """매수 조건을 만족하는 티커를 거래대금 순으로 (top 개까지)"""
+        matrix = self.load(tickers)
+        started = time.perf_counter()
+        table = screen(matrix, rsi_limit=rsi_limit, min_value=min_value)
+        self.scan_time = time.perf_counter() - started
+        table = table[table["buy"]]
+        return table if top is None else table.head(top)
+
+def main():
+    screener = Screener()
+    table = screener.candidates(rsi_limit=45)
+    print(f"🔍 KRW 마켓 매수 후보 {len(table)}개 (봉 로딩 {screener.load_time:.1f}초, 계산 {screener.scan_time * 1000:.1f}ms)\n")
+    for row in table.itertuples():
+        print(f"📈 {row.Index} | 현재가: {row.close:,.2f} | MA20: {row.ma20:,.2f} ({row.gap * 100:+.2f}%) | "
+              f"RSI: {row.rsi:.2f} | 거래대금: {row.value:,.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,334 @@
+import multiprocessing
+import multiprocessing.connection
+import os
+import shutil
+import tempfile
+import threading
+import time
+from multiprocessing.managers import BaseManager
+
+import trading
+from journal import PositionJournal
+from ledger import combine, read_trades, recent_report
+from notifier import Notifier
+from portfolio import Portfolio
+
+shard_count = 4             # 매매 프로세스 수
+budget_refresh_interval = 1.0  # 이 시간 안에 여러 샤드가 매수 주기를 시작하면 잔고 조회를 한 번만 함
+
+def partition(tickers, shards):
+    """티커를 정렬해서 shards 개로 번갈아 나눔 (같은 config 면 항상 같은 배정), 빈 샤드는 제외"""
+    parts = [[] for _ in range(shards)]
+    for i, ticker in enumerate(sorted(tickers)):
+        parts[i % shards].append(ticker)
+    return [part for part in parts if part]
+
+class Coordinator:
+    """코디네이터 프로세스에만 있는 공유 상태: KRW 예약, 총 자산, 포지션 로그, 슬랙 전송
+
+    샤드는 CoordinatorManager 프록시로 메서드를 호출함 (연결마다 서버 스레드가 따로 있으므로 모두 잠금 안에서 처리)
+    - reserve() 로 예약한 금액은 settle() (체결) / release() (실패) 전까지 in_flight 에 남음
+    - 잔고를 다시 조회하면 in_flight 와 조회 도중 체결된 금액을 빼고 예약 가능 금액을 정하므로
+      두 샤드가 같은 KRW 를 예약할 수 없음 (이미 잔고에 반영된 체결을 한 번 더 빼는 경우는 덜 쓰는 쪽으로만 틀림)
+    """
+    def __init__(self, portfolio, journal, notifier, fee_margin=1.001, refresh_interval=budget_refresh_interval):
+        self.portfolio = portfolio
+        self.journal = journal
+        self.journal.load()
+        self.notifier = notifier
+        self.fee_margin = fee_margin
+        self.refresh_interval = refresh_interval
+        self.lock = threading.Lock()
+        self.refresh_lock = threading.Lock()
+        self.snapshot = None
+        self.available = 0.0
+        self.in_flight = 0.0   # 예약했지만 아직 체결 / 실패가 정해지지 않은 주문 금액
+        self.settled = 0.0     # 누적 체결 금액 (잔고 조회 도중 체결된 금액 계산용)
+        self.reserved = 0.0    # 누적 예약 금액
+
+    # --- KRW 예약 (KrwBudget 과 같은 인터페이스) ---
+
+    def refresh(self):
+        """잔고를 다시 조회해서 예약 가능 금액을 계산 (refresh_interval 안에 다시 부르면 이전 조회를 사용)"""
+        with self.refresh_lock:
+            if self.snapshot is not None and self.portfolio.clock() - self.snapshot.taken_at < self.refresh_interval:
+                return self.snapshot
+            with self.lock:
+                settled = self.settled
+            snapshot = self.portfolio.snapshot(force=True)
+            with self.lock:
+                # 조회 결과에 아직 반영되지 않았을 수 있는 금액: 진행 중인 주문 + 조회 도중 체결된 주문
+                pending = self.in_flight + self.settled - settled
+                self.available = snapshot.krw - pending * self.fee_margin
+                self.snapshot = snapshot
+            return snapshot
+
+    def total_asset(self):
+        """매수 주기 시작: 잔고를 새로 조회하고 모든 샤드의 티커 기준 총 자산 반환"""
+        snapshot = self.refresh()
+        total, missing = snapshot.total_asset(self.portfolio.tickers())
+        for ticker in missing:
+            print(f"⚠️ [{ticker}] 현재가 조회 실패. 총 자산 계산에서 제외됨")
+        return total
+
+    def reserve(self, amount, min_amount=5000):
+        with self.lock:
+            amount = min(amount, self.available / self.fee_margin)
+            if amount < min_amount:
+                return amount
+            self.available -= amount * self.fee_margin
+            self.in_flight += amount
+            self.reserved += amount
+            return amount
+
+    def release(self, amount):
+        with self.lock:
+            self.in_flight -= amount
+            self.available += amount * self.fee_margin
+
+    def settle(self, amount):
+        with self.lock:
+            self.in_flight -= amount
+            self.settled += amount
+
+    def stats(self):
+        with self.lock:
+            return {"available": self.available, "in_flight": self.in_flight, "settled": self.settled,
+                    "reserved": self.reserved}
+
+    # --- 포지션 로그 / 슬랙 ---
+
+    def positions(self, tickers):
+        with self.journal.lock:
+            return {ticker: dict(info) for ticker, info in self.journal.positions.items() if ticker in tickers}
+
+    def record(self, kind, ticker, info=None, sync=True):
+        self.journal.record(kind, ticker, info, sync=sync)
+
+    def post(self, channel, text):
+        self.notifier.post(text, channel)
+
+served = None  # 이 프로세스가 제공하는 Coordinator
+
+def get_served():
+    return served
+
+class CoordinatorManager(BaseManager):
+    pass
+
+CoordinatorManager.register("coordinator", callable=get_served)
+
+class ShardJournal:
+    """샤드의 PositionBook 이 쓰는 포지션 로그, 파일은 코디네이터가 하나만 가짐"""
+    def __init__(self, coordinator, tickers):
+        self.coordinator = coordinator
+        self.tickers = list(tickers)
+
+    def load(self):
+        return self.coordinator.positions(self.tickers)
+
+    def record(self, kind, ticker, info=None, sync=True):
+        self.coordinator.record(kind, ticker, info, sync)
+
+    def close(self):
+        pass
+
+class RelayWebClient:
+    """샤드의 슬랙 메시지를 코디네이터로 넘김 (슬랙 연결과 전송 한도는 코디네이터 하나가 관리)"""
+    def __init__(self, coordinator, prefix):
+        self.coordinator = coordinator
+        self.prefix = prefix
+
+    def chat_postMessage(self, channel, text):
+        self.coordinator.post(channel, f"{self.prefix} {text}")
+
+def run_shard(index, config, address, authkey, commands, done, shards, exchange_factory=None,
+              ledger_dir=trading.trade_ledger_dir):
+    """샤드 프로세스: config 의 티커만 매매하는 CoinBot, commands 큐로 받은 명령을 실행하고 done 에 알림"""
+    manager = CoordinatorManager(address=address, authkey=authkey)
+    manager.connect()
+    coordinator = manager.coordinator()
+
+    bot = trading.CoinBot(None, None, trading.slack_channel,
+                          exchange=exchange_factory(index) if exchange_factory is not None else None,
+                          web_client=RelayWebClient(coordinator, f"[샤드 {index}]"), config=config,
+                          ledger_path=os.path.join(ledger_dir, f"shard{index}"),
+                          coordinator=coordinator, journal=ShardJournal(coordinator, config),
+                          quote_rate=10 / shards,  # 시세 조회 한도는 IP 단위이므로 샤드끼리 나눔
+                          warm_state_path=None if exchange_factory is not None else
+                          f"{os.path.splitext(trading.warm_state_file)[0]}_shard{index}.pkl")
+    bot.start_prewarm()
+    bot.scheduler.start()
+    done.put((index, "ready"))
+
+    while True:
+        message = commands.get()
+        if message is None:
+            break
+        kind, arg, channel = message
+        try:
+            if kind == "command":
+                bot.handle_command(arg, channel)
+            else:
+                getattr(bot, arg)()
+        except Exception as e:
+            bot.send(f"🚨 명령 처리 오류 ({arg}): {e}")
+        done.put((index, arg))
+
+    if bot.running:
+        bot.stop_trading()
+    bot.scheduler.stop()
+    bot.notifier.flush()
+    bot.ledger.close()
+
+class ShardedBot:
+    """티커를 shards 개 프로세스로 나눠 매매하고, 이 프로세스가 KRW 예약 / 포지션 로그 / 슬랙 연결을 맡음
+
+    - 샤드 프로세스는 각자 CoinBot (매수 / 매도 검사, 실시간 체결 스트림) 을 돌리며 GIL 과 REST 대기를 나눠 가짐
+    - 샤드와는 이 컴퓨터 안에서만 통신 (유닉스 소켓, 지원하지 않으면 127.0.0.1) 하고 authkey 로 인증
+    - 슬랙 명령 "시작" / "종료" 는 모든 샤드로 전달하고, "리포트" 는 샤드들의 거래 장부를 합쳐 여기서 한 번만 보냄
+    """
+    def __init__(self, slack_bot_token, slack_app_token, slack_channel, shards=shard_count, config=None,
+                 upbit=None, get_current_price=None, buy_log_path=trading.buy_log_file,
+                 web_client=None, exchange_factory=None, ledger_dir=trading.trade_ledger_dir,
+                 refresh_interval=budget_refresh_interval):
+        global served
+        self.config = dict(config if config is not None else trading.ticker_config)
+        self.slack_channel = slack_channel
+        self.ledger_dir = ledger_dir
+        self.start_cash = None
+        if upbit is None:
+            import pyupbit
+
+            acc_key, sec_key = trading.load_key_info()[:2]
+            trading.http_client.install_pyupbit()
+            upbit = pyupbit.Upbit(acc_key, sec_key)
+
+        if web_client is None:
+            from slack_sdk.web import WebClient
+            web_client = WebClient(token=slack_bot_token)
+        self.web_client = web_client
+        self.socket_mode_client = None
+        if slack_app_token:
+            from slack_sdk.socket_mode import SocketModeClient
+            self.socket_mode_client = SocketModeClient(app_token=slack_app_token, web_client=self.web_client)
+            self.socket_mode_client.socket_mode_request_listeners.append(self.process_slack_events)
+        self.notifier = Notifier(self.web_client, slack_channel)
+
+        portfolio = Portfolio(upbit, lambda: list(self.config), get_current_price=get_current_price)
+        self.coordinator = Coordinator(portfolio, PositionJournal(buy_log_path), self.notifier,
+                                       refresh_interval=refresh_interval)
+        served = self.coordinator
+
+        # 샤드만 접속할 수 있는 로컬 주소로 Coordinator 제공
+        self.socket_dir = None
+        if "AF_UNIX" in multiprocessing.connection.families:
+            self.socket_dir = tempfile.mkdtemp(prefix="coinbot-")
+            address = os.path.join(self.socket_dir, "coordinator.sock")
+        else:
+            address = ("127.0.0.1", 0)
+        self.authkey = os.urandom(16)
+        self.server = CoordinatorManager(address=address, authkey=self.authkey).get_server()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+        ctx = multiprocessing.get_context("spawn")  # 서버 / 슬랙 스레드가 도는 프로세스를 fork 하지 않음
+        self.done = ctx.Queue()
+        self.commands = []
+        self.processes = []
+        for index, tickers in enumerate(partition(self.config, shards)):
+            commands = ctx.Queue()
+            process = ctx.Process(target=run_shard, name=f"shard{index}", daemon=True,
+                                  args=(index, {ticker: self.config[ticker] for ticker in tickers},
+                                        self.server.address, self.authkey, commands, self.done, shards,
+                                        exchange_factory, ledger_dir))
+            self.commands.append(commands)
+            self.processes.append(process)
+
+    def send(self, text, channel=None):
+        print(f"[Slack] {text}")
+        self.notifier.post(text, channel or self.slack_channel)
+
+    def start(self, timeout=120):
+        for process in self.processes:
+            process.start()
+        self.wait("ready", timeout)
+        self.send(f"🚀 코인봇 시작 (샤드 {len(self.processes)}개, 티커 {len(self.config)}개)")
+
+    def wait(self, what, timeout=None):
+        """모든 샤드가 what 을 끝낼 때까지 대기"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        pending = set(range(len(self.processes)))
+        while pending:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            index, finished = self.done.get(timeout=remaining)
+            if finished == what:
+                pending.discard(index)
+
+    def broadcast(self, text, channel=None):
+        for commands in self.commands:
+            commands.put(("command", text, channel))
+
+    def run_all(self, method, timeout=None):
+        """모든 샤드에서 bot.<method>() 를 동시에 실행하고 끝날 때까지 대기 (수동 매수 주기 / 벤치마크용), 걸린 시간 반환"""
+        started = time.perf_counter()
+        for commands in self.commands:
+            commands.put(("call", method, None))
+        self.wait(method, timeout)
+        return time.perf_counter() - started
+
+    def process_slack_events(self, client, req):
+        from slack_sdk.socket_mode.response import SocketModeResponse
+
+        if req.type == "events_api":
+            event = req.payload.get("event", {})
+            client.send_socket_mode_response(SocketModeResponse(envelope_id=req.envelope_id))
+
+            if event.get("type") == "message" and "text" in event:
+                text = event["text"].strip()
+                if text in ("시작", "종료"):
+                    self.broadcast(text, event["channel"])  # 매매 중인지는 각 샤드가 판단
+                elif text.startswith("리포트"):
+                    self.report(text, event["channel"])
+
+    def ensure_start_cash(self):
+        if self.start_cash is None:
+            self.start_cash = self.coordinator.refresh().krw
+        return self.start_cash
+
+    def report(self, text="리포트", channel=None):
+        """모든 샤드의 거래 장부 (ledger_dir/shard*) 를 합친 손익 요약 하나를 전송, "리포트 7" = 최근 7일"""
+        args = text.split()[1:]
+        days = int(args[0]) if args and args[0].isdigit() else None
+        names = os.listdir(self.ledger_dir) if os.path.isdir(self.ledger_dir) else []
+        trades, tickers = combine(read_trades(os.path.join(self.ledger_dir, name))
+                                  for name in sorted(names) if name.startswith("shard"))
+        self.send(recent_report(trades, tickers, start_cash=self.ensure_start_cash(), days=days), channel)
+
+    def close(self, timeout=30):
+        for commands in self.commands:
+            commands.put(None)
+        for process in self.processes:
+            process.join(timeout)
+        self.server.stop_event.set()
+        self.server.listener.close()  # 유닉스 소켓 파일도 삭제됨
+        self.notifier.flush()
+        self.coordinator.journal.close()
+        if self.socket_dir is not None:
+            shutil.rmtree(self.socket_dir, ignore_errors=True)
+
+    def run(self):
+        self.start()
+        if self.socket_mode_client is None:
+            self.broadcast("시작")
+        else:
+            self.socket_mode_client.connect()
+            self.send("🤖 슬랙 Socket Mode 연결 성공. 명령을 기다립니다...")
+        try:
+            for process in self.processes:
+                process.join()
+        finally:
+            self.close()
+
+if __name__ == "__main__":
+    slack_bot_token, slack_app_token = trading.load_key_info()[2:]
+    ShardedBot(slack_bot_token, slack_app_token, trading.slack_channel).run()
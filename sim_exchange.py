@@ -0,0 +1,171 @@
+import threading
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from candle_store import interval_minutes
+from resampler import bar_group, kst_origin, minute_ns
+
+class SimExchange:
+    """기록된 1분봉으로 잔고 / 시장가 주문 / 현재가 / 봉 조회를 흉내내는 모의 거래소
+
+    pyupbit.Upbit 의 주문 / 잔고 메서드와 pyupbit.get_current_price, get_ohlcv 를 같은 형식으로 제공함.
+    현재 시각(now)은 호출하는 쪽에서 set_time() 으로 옮기며, 현재가는 현재 1분봉의 종가임.
+    시장가 주문은 현재가에서 slippage 비율만큼 불리한 가격으로 체결됨.
+    """
+    def __init__(self, minute_data, start_cash=1_000_000, fee=0.0005, slippage=0.0):
+        self.data = {}
+        for ticker, df in minute_data.items():
+            self.data[ticker] = {
+                'time': pd.DatetimeIndex(df.index).as_unit('ns').asi8,
+                **{col: df[col].to_numpy(dtype=np.float64) for col in ('open', 'high', 'low', 'close', 'volume')},
+            }
+        self.fee = fee
+        self.slippage = slippage
+        self.krw = float(start_cash)
+        self.coins = {}   # currency -> [수량, 평균 매수가]
+        self.trades = []  # 체결 기록
+        self.now = None
+        self.lock = threading.RLock()
+        self.bar_cache = {}
+
+    def set_time(self, now):
+        self.now = pd.Timestamp(now).value
+
+    def index(self, ticker):
+        """현재 시각에 해당하는 1분봉 번호 (데이터가 없으면 -1)"""
+        times = self.data[ticker]['time']
+        return int(np.searchsorted(times, self.now, side='right')) - 1
+
+    # --- 시세 ---
+
+    def get_current_price(self, ticker, *args, **kwargs):
+        if isinstance(ticker, str):
+            return self.price(ticker)
+        prices = {t: self.price(t) for t in ticker}
+        return {t: p for t, p in prices.items() if p is not None}
+
+    def price(self, ticker):
+        if ticker not in self.data:
+            return None
+        i = self.index(ticker)
+        return float(self.data[ticker]['close'][i]) if i >= 0 else None
+
+    def get_ohlcv(self, ticker, interval="day", count=200, *args, **kwargs):
+        """현재 시각까지의 봉 (마지막 봉은 진행 중인 봉) 을 pyupbit.get_ohlcv 와 같은 형식으로 반환"""
+        if ticker not in self.data:
+            return None
+        i = self.index(ticker)
+        if i < 0:
+            return None
+
+        d = self.data[ticker]
+        minutes = interval_minutes[interval]
+        if minutes == 1:
+            lo = max(0, i - count + 1)
+            times = d['time'][lo:i + 1]
+            cols = {col: d[col][lo:i + 1] for col in ('open', 'high', 'low', 'close', 'volume')}
+        else:
+            bars = self.bars(ticker, minutes)
+            k = int(np.searchsorted(bars['group'], bars['minute_group'][i]))
+            start = bars['starts'][k]  # 진행 중인 봉의 첫 1분봉
+            lo = max(0, k - count + 1)
+            times = np.append(bars['time'][lo:k], bars['time'][k])
+            cols = {
+                'open': np.append(bars['open'][lo:k], d['open'][start]),
+                'high': np.append(bars['high'][lo:k], d['high'][start:i + 1].max()),
+                'low': np.append(bars['low'][lo:k], d['low'][start:i + 1].min()),
+                'close': np.append(bars['close'][lo:k], d['close'][i]),
+                'volume': np.append(bars['volume'][lo:k], d['volume'][start:i + 1].sum()),
+            }
+
+        df = pd.DataFrame(cols, index=pd.DatetimeIndex(times.astype('datetime64[ns]')))
+        df['value'] = df['close'] * df['volume']
+        return df
+
+    def bars(self, ticker, minutes):
+        """1분봉을 minutes 분봉으로 묶은 결과 (한 번만 계산해서 보관)"""
+        key = (ticker, minutes)
+        if key not in self.bar_cache:
+            if 1440 % minutes:
+                raise ValueError(f"지원하지 않는 봉 간격: {minutes}분")
+            d = self.data[ticker]
+            minute_group = bar_group(d['time'], minutes)
+            starts = np.flatnonzero(np.diff(minute_group, prepend=minute_group[0] - 1))
+            ends = np.append(starts[1:], len(minute_group))
+            self.bar_cache[key] = {
+                'minute_group': minute_group,
+                'group': minute_group[starts],
+                'starts': starts,
+                'time': kst_origin + minute_group[starts] * minutes * minute_ns,
+                'open': d['open'][starts],
+                'high': np.maximum.reduceat(d['high'], starts),
+                'low': np.minimum.reduceat(d['low'], starts),
+                'close': d['close'][ends - 1],
+                'volume': np.add.reduceat(d['volume'], starts),
+            }
+        return self.bar_cache[key]
+
+    # --- 잔고 / 주문 ---
+
+    def get_balances(self):
+        with self.lock:
+            balances = [{"currency": "KRW", "balance": str(self.krw), "locked": "0", "avg_buy_price": "0", "unit_currency": "KRW"}]
+            for currency, (volume, avg_price) in self.coins.items():
+                if volume > 0:
+                    balances.append({"currency": currency, "balance": str(volume), "locked": "0",
+                                     "avg_buy_price": str(avg_price), "unit_currency": "KRW"})
+            return balances
+
+    def get_balance(self, ticker="KRW", *args, **kwargs):
+        with self.lock:
+            if ticker == "KRW":
+                return self.krw
+            return self.coins.get(ticker.split("-")[-1], [0.0, 0.0])[0]
+
+    def buy_market_order(self, ticker, price, *args, **kwargs):
+        """price 원어치를 현재가로 매수 (수수료는 KRW 에서 추가로 차감)"""
+        with self.lock:
+            current = self.price(ticker)
+            cost = price * (1 + self.fee)
+            if current is None or price <= 0 or cost > self.krw + 1e-6:
+                return None
+            current *= 1 + self.slippage
+            volume = price / current
+            currency = ticker.split("-")[-1]
+            held, avg_price = self.coins.get(currency, [0.0, 0.0])
+            self.coins[currency] = [held + volume, (held * avg_price + price) / (held + volume)]
+            self.krw -= cost
+            return self._fill(ticker, "bid", current, volume, price * self.fee)
+
+    def sell_market_order(self, ticker, volume, *args, **kwargs):
+        with self.lock:
+            current = self.price(ticker)
+            currency = ticker.split("-")[-1]
+            held, avg_price = self.coins.get(currency, [0.0, 0.0])
+            if current is None or volume <= 0 or volume > held + 1e-12:
+                return None
+            current *= 1 - self.slippage
+            value = volume * current
+            fee = value * self.fee
+            self.krw += value - fee
+            self.coins[currency] = [held - volume, avg_price]
+            if held - volume <= 1e-12:
+                del self.coins[currency]
+            return self._fill(ticker, "ask", current, volume, fee, profit=(current - avg_price) * volume - fee)
+
+    def _fill(self, ticker, side, price, volume, fee, profit=None):
+        trade = {"uuid": str(uuid.uuid4()), "market": ticker, "side": side, "time": self.now,
+                 "price": price, "volume": volume, "fee": fee, "profit": profit}
+        self.trades.append(trade)
+        return trade
+
+    def equity(self):
+        """KRW + 보유 코인 평가금액"""
+        with self.lock:
+            total = self.krw
+            for currency, (volume, _) in self.coins.items():
+                price = self.price(f"KRW-{currency}")
+                total += volume * (price or 0)
+            return total
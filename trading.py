@@ -1,27 +1,77 @@
-import pyupbit
+import pandas as pd
 import time
-import requests
-import json
-import os
 import datetime
 import threading
-from slack_sdk.web import WebClient
-from slack_sdk.socket_mode import SocketModeClient
-from slack_sdk.socket_mode.request import SocketModeRequest
-from slack_sdk.socket_mode.response import SocketModeResponse
-
-with open("key_info.txt") as f:
-    lines = f.readlines()
-    acc_key = lines[0].strip()
-    sec_key = lines[1].strip()
-    slack_bot_token = lines[2].strip()      # xoxb- 토큰
-    slack_app_token = lines[3].strip()      # xapp- 토큰 (Socket Mode 앱 토큰)
-
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from candle_store import CandleStore, kst_now
+from resampler import MarketData
+from indicators import IndicatorState
+from portfolio import Portfolio, KrwBudget
+from scanner import Scanner, TokenBucket
+from screener import Screener
+from exit_engine import ExitEngine
+from notifier import Notifier
+from journal import PositionJournal
+from positions import PositionBook
+from metrics import Registry, Instrumented, MetricsServer, LatencyHistogram
+from http_client import HttpClient
+from scheduler import Scheduler, SimClock
+from ledger import TradeLedger
+from paper_exchange import PaperExchange, PaperFeed, NullWebClient
+from warm_state import WarmState
+
+# pyupbit / slack_sdk 는 실거래 / 슬랙 연결에만 필요하므로 CoinBot 을 만들 때 불러옴 (import 시간 단축)
+
+key_info_file = "key_info.txt"
 slack_channel = "C095PHAD4E8" # 채널 ID 값으로 읽어와야 함, 채널명: #코인봇-테스트
 buy_log_file = "buy_log.json"
+warm_state_file = "warm_state.pkl"  # 재시작 직후 과거 봉 / 지표를 다시 받지 않도록 저장하는 상태 (실거래에서만 사용)
+warm_max_age = 3 * 3600  # 이보다 오래 멈춰 있었으면 밀린 1분봉을 받는 것보다 과거 봉을 다시 받는 쪽이 요청이 적음
+trade_ledger_dir = "trades"  # 끝난 거래 장부 (열별 바이너리 파일, 슬랙 "리포트" 명령으로 요약)
+universe_size = 0            # 0 이면 config 의 티커만, N 이면 매수 주기마다 KRW 마켓 전체에서 고른 후보 N 개를 추가
+universe_param = {"rsi_limit": 45, "take_profit_ratio": 1.10, "stop_loss_ratio": 0.95, "risk_ratio": 0.1}  # 추가된 티커의 전략
+
+ticker_config = {
+    "KRW-AERGO": {"rsi_limit": 99, "take_profit_ratio": 1.10, "stop_loss_ratio": 0.93, "risk_ratio": 1.0},
+    # "KRW-SNT": {"rsi_limit": 70, "take_profit_ratio": 1.05, "stop_loss_ratio": 0.92, "risk_ratio": 0.5},
+}
+
+# "live" = 업비트 실거래, "paper" = candles/ 에 저장된 1분봉을 재생하는 모의 거래소 (키 / 슬랙 없이 바로 매매 시작)
+trading_mode = "live"
+paper_config = {
+    "speed": 100,          # 데이터 시각을 실제보다 100배 빠르게 재생
+    "start": None,         # 재생 시작 시각 (None 이면 저장된 1분봉 시작 + 4일)
+    "start_cash": 1_000_000,
+    "latency": 0.05,       # 거래소 호출마다 실제로 기다리는 시간 (초) ± jitter
+    "jitter": 0.02,
+    "error_rate": 0.0,     # 호출이 ConnectionError 로 실패할 확률
+    "reject_rate": 0.0,    # 주문이 거절될 확률
+    "slippage": 0.0005,
+}
+metrics_port = 9100  # 로컬 Prometheus 엔드포인트 (http://127.0.0.1:9100/metrics)
+trace_file = None    # 예: "trace.jsonl" 로 지정하면 매수 / 매도 주기마다 span 트레이스를 한 줄씩 기록
+buy_interval = 4 * 3600     # 4시간봉 마감마다 매수 검사
+buy_delay = 60              # 봉 마감 1분 뒤 (마감 직후 봉이 아직 안 만들어졌을 수 있음)
+sell_check_interval = 300   # 매도 검사 주기 (티커별로 config 의 "exit_check_interval" 로 따로 지정 가능)
+exit_retry_delay = 5        # 매도 주문이 실패하면 이 시간 뒤에 익절/손절가를 다시 등록 (연속 실패마다 2배)
+exit_retry_max = 300        # 재등록 대기 시간 상한
+
+# 업비트 / 슬랙 REST 호출이 함께 쓰는 연결 풀 (매수 루프와 매도 스레드가 공유)
+http_client = HttpClient()
+
+def load_key_info(path=key_info_file):
+    """(acc_key, sec_key, slack_bot_token, slack_app_token) 반환"""
+    with open(path) as f:
+        lines = f.readlines()
+        acc_key = lines[0].strip()
+        sec_key = lines[1].strip()
+        slack_bot_token = lines[2].strip()      # xoxb- 토큰
+        slack_app_token = lines[3].strip()      # xapp- 토큰 (Socket Mode 앱 토큰)
+    return acc_key, sec_key, slack_bot_token, slack_app_token
 
 def post_message(token, channel, text):
-    res = requests.post(
+    res = http_client.post(
         "https://slack.com/api/chat.postMessage",
         headers={"Authorization": "Bearer " + token},
         data={"channel": channel, "text": text}
@@ -33,63 +83,111 @@ def send_msg(token, channel, text):
     print(text)
     post_message(token, channel, text)
 
-def get_rsi(df, period=14):
-    delta = df['close'].diff()
-    gain = delta.clip(lower=0)
-    loss = -delta.clip(upper=0)
-    avg_gain = gain.rolling(window=period).mean()
-    avg_loss = loss.rolling(window=period).mean()
-    rs = avg_gain / avg_loss
-    return 100 - (100 / (1 + rs))
-
-def load_buy_log():
-    if os.path.exists(buy_log_file):
-        with open(buy_log_file, "r") as f:
-            return json.load(f)
-    return {}
-
-def save_buy_log(log):
-    with open(buy_log_file, "w") as f:
-        json.dump(log, f)
-
 class CoinBot:
-    def __init__(self, slack_bot_token, slack_app_token, slack_channel):
-        self.upbit = pyupbit.Upbit(acc_key, sec_key)
+    def __init__(self, slack_bot_token, slack_app_token, slack_channel,
+                 exchange=None, web_client=None, buy_log_path=buy_log_file, config=None, clock=None,
+                 ledger_path=trade_ledger_dir, screener=None, coordinator=None, journal=None, quote_rate=10,
+                 candles=None, warm_state_path=None):
+        self.metrics = Registry(trace_path=trace_file)
+        if exchange is None:
+            import pyupbit
+
+            acc_key, sec_key = load_key_info()[:2]
+            http_client.install_pyupbit()
+            self.upbit = pyupbit.Upbit(acc_key, sec_key)
+            self.candles = candles or MarketData(CandleStore())  # 1분봉만 받아서 4시간봉 등을 직접 만듦
+            warm_state_path = warm_state_path or warm_state_file
+            self.get_current_price = pyupbit.get_current_price
+            self.quote_bucket = TokenBucket(rate=quote_rate)  # 업비트 시세 조회 초당 10회 제한 (샤드 모드에서는 샤드 수로 나눔)
+            self.now = kst_now  # 매수 / 매도 시각과 거래 장부는 봉과 같은 KST 기준 (서버 시간대와 무관)
+        else:
+            # 모의 거래소: 주문 / 잔고 / 현재가 / 봉 조회를 모두 exchange 가 처리 (요청 제한 없음)
+            self.upbit = exchange
+            self.candles = candles or exchange
+            self.get_current_price = exchange.get_current_price
+            self.quote_bucket = TokenBucket(rate=1e9, capacity=1e9)
+            self.now = lambda: pd.Timestamp(exchange.now).to_pydatetime(warn=False)  # 매수 / 매도 시각도 모의 시각 기준
         self.slack_channel = slack_channel
-        self.buy_flag = load_buy_log()
 
-        self.config = {
-            "KRW-AERGO": {"rsi_limit": 99, "take_profit_ratio": 1.10, "stop_loss_ratio": 0.93, "risk_ratio": 1.0},
-            # "KRW-SNT": {"rsi_limit": 70, "take_profit_ratio": 1.05, "stop_loss_ratio": 0.92, "risk_ratio": 0.5},
-        }
+        # 거래소 호출마다 지연 시간 기록 (span 이름 exchange, method 라벨로 구분)
+        self.upbit = Instrumented(self.upbit, self.metrics, "exchange",
+                                  ("get_balance", "get_balances", "buy_market_order", "sell_market_order"))
+        self.candles = Instrumented(self.candles, self.metrics, "exchange", ("get_ohlcv",))
+        self.get_current_price = self.metrics.timed(self.get_current_price, "exchange", method="get_current_price")
 
-        self.start_cash = self.get_krw_balance()
-        self.current_cash = self.start_cash
+        # 슬랙 WebClient & SocketModeClient 초기화
+        if web_client is None:
+            from slack_sdk.web import WebClient
+            web_client = WebClient(token=slack_bot_token)
+        self.web_client = web_client
+        self.socket_mode_client = None
+        if slack_app_token:
+            from slack_sdk.socket_mode import SocketModeClient
+            self.socket_mode_client = SocketModeClient(app_token=slack_app_token, web_client=self.web_client)
+            self.socket_mode_client.socket_mode_request_listeners.append(self.process_slack_events)
+
+        # 슬랙 전송은 백그라운드 스레드에서 처리하여 주문 경로가 기다리지 않도록 함
+        self.notifier = Notifier(self.web_client, slack_channel, metrics=self.metrics)
+
+        # 포지션 변경은 buy_log.json 전체를 다시 쓰지 않고 로그에 이벤트만 추가
+        # 매수 루프 / 매도 루프 / 실시간 매도 스레드가 같은 티커를 동시에 고치지 않도록 티커별로 잠금
+        # 샤드 모드에서는 coordinator 가 KRW 예약 / 총 자산 / 포지션 로그를 모든 샤드에 대해 한 곳에서 관리
+        self.coordinator = coordinator
+        self.journal = journal or PositionJournal(buy_log_path)
+        self.buy_flag = PositionBook(self.journal)
+        self.ledger = TradeLedger(ledger_path)
+        self.fee_lock = threading.Lock()
+        self.indicators = {}  # 티커별 MA20 / RSI 상태 (매수 주기마다 새 봉만 반영)
+        self.buy_workers = 8  # 매수 조건 검사를 동시에 실행할 스레드 수
+
+        self.config = dict(config if config is not None else ticker_config)
+        self.base_config = dict(self.config)  # 스크리너가 바꾸지 않는 고정 티커
+
+        # 매수 주기마다 KRW 마켓 전체를 한 번에 걸러 매수 대상 (self.config) 을 다시 구성
+        if screener is None and universe_size and exchange is None and coordinator is None:
+            screener = Screener(scanner=Scanner(bucket=self.quote_bucket))  # 시세 조회 한도를 매수 루프와 공유
+        self.screener = screener
+
+        # 잔고 / 현재가는 주기마다 한 번만 조회해서 매수, 매도, 보유 확인에 함께 사용
+        self.portfolio = Portfolio(self.upbit, lambda: list(self.config), get_current_price=self.get_current_price)
+
+        # 실시간 체결 스트림으로 익절/손절 감시 (주기적인 매도 검사 check_sell 은 스트림 끊김 대비용)
+        self.exit_engine = ExitEngine(self.on_exit_signal, on_trade=getattr(self.candles, "add_trade", None))
+        self.metrics.register("exit_dispatch", self.exit_engine.latency)  # 체결 수신 → 매도 스레드 시작
+        self.tick_to_order = LatencyHistogram()  # 체결 수신 → 매도 주문 완료 (sell_market_order 반환)
+        self.metrics.register("exit_tick_to_order", self.tick_to_order)
+        self.exit_lock = threading.Lock()
+        self.selling = set()       # 매도 스레드가 실행 중인 티커 (같은 티커의 매도 신호는 끝날 때까지 무시)
+        self.exit_failures = {}    # 티커 -> 연속 매도 실패 횟수 (익절/손절가 재등록 대기 시간 계산)
+        self.feed = self.exit_engine  # 체결 스트림 (모의 투자에서는 PaperFeed 가 exit_engine 에 가격을 넣음)
+        self.sync_exit_levels()
+
+        # 시작 자산은 생성자에서 잔고 조회를 기다리지 않고 prewarm() / 첫 매수 주기에서 채움 (재시작이면 저장된 값)
+        self.start_cash = None
+        self.current_cash = None
         self.total_fee_paid = 0
+        self.warm_state = WarmState(warm_state_path) if warm_state_path else None
+        self.prewarm_thread = None
+        self.restore_warm_state()
 
         self.running = False
-        self.total_fee_paid = 0
-
-        # 슬랙 WebClient & SocketModeClient 초기화
-        self.web_client = WebClient(token=slack_bot_token)
-        self.socket_mode_client = SocketModeClient(app_token=slack_app_token, web_client=self.web_client)
-        self.socket_mode_client.socket_mode_request_listeners.append(self.process_slack_events)
 
-        self.sell_thread = None
+        # 봉 마감 / 매도 검사를 정해진 시각에 실행 (clock 에 SimClock 을 주면 잠들지 않고 시뮬레이션)
+        # 실제 시각 (모의 투자 재생 시각 포함) 에서는 매수 주기가 길어져도 매도 검사가 밀리지 않도록 스레드 풀에서 실행
+        executor = None if isinstance(clock, SimClock) else ThreadPoolExecutor(max_workers=4)
+        self.scheduler = Scheduler(clock, executor=executor,
+                                   on_error=lambda key, e: self.send(f"🚨 예약 작업 오류 ({key}): {e}"))
 
         self.send("🚀 코인봇 시작")
 
-    def send(self, text, channel=None):
+    def send(self, text, channel=None, low_priority=False):
         ch = channel if channel else self.slack_channel
         print(f"[Slack] {text}")
-        try:
-            self.web_client.chat_postMessage(channel=ch, text=text)
-        except Exception as e:
-            print(f"슬랙 메시지 전송 실패: {e}")
+        self.notifier.post(text, ch, low_priority=low_priority)
 
     def get_balance(self, ticker):
         try:
-            bal = self.upbit.get_balance(ticker)
+            bal = self.portfolio.snapshot().balance(ticker)
             return bal
         except Exception as e:
             self.send(f"🚨 잔고 조회 실패: {ticker} / {e}")
@@ -97,7 +195,7 @@ class CoinBot:
 
     def get_krw_balance(self):
         try:
-            return self.upbit.get_balance("KRW")
+            return self.portfolio.snapshot().krw
         except Exception as e:
             self.send(f"🚨 KRW 잔고 조회 실패: {e}")
             return 0
@@ -105,9 +203,11 @@ class CoinBot:
     def buy_coin(self, ticker, amount_krw):
         try:
             ret = self.upbit.buy_market_order(ticker, amount_krw)
+            self.portfolio.invalidate()
             if ret:
+                self.metrics.inc("orders_total", side="bid")
                 fee = amount_krw * 0.0005  # 매수 수수료 계산
-                self.total_fee_paid += fee
+                self.add_fee(fee)
                 self.send(f"✅ [{ticker}] 매수 성공: {amount_krw:,.0f}원 (수수료 약 {fee:,.0f}원)")
                 return True
             else:
@@ -120,7 +220,9 @@ class CoinBot:
     def sell_coin(self, ticker, coin_amount):
         try:
             ret = self.upbit.sell_market_order(ticker, coin_amount)
+            self.portfolio.invalidate()
             if ret:
+                self.metrics.inc("orders_total", side="ask")
                 self.send(f"✅ [{ticker}] 매도 성공: {coin_amount}개")
                 return True
             else:
@@ -130,36 +232,151 @@ class CoinBot:
             self.send(f"🚨 시스템 오류 발생 (매도): {e}")
             return False
 
-    def execute_buy(self):
-        print("매수 조건 검사 중 ...... ", datetime.datetime.now())
-
-        for ticker, param in self.config.items():
-            df = pyupbit.get_ohlcv(ticker, interval="minute240", count=50)
-            if df is None or df.empty:
-                self.send(f"❌ [{ticker}] 4시간봉 데이터 없음")
-                continue
-
-            df['ma20'] = df['close'].rolling(window=20).mean()
-            df['rsi'] = get_rsi(df)
-
-            latest = df.iloc[-1]
-            rsi_val = latest['rsi']
-            ma20_val = latest['ma20']
-            close_val = latest['close']
+    def refresh_universe(self, size=None):
+        """스크리너 후보 상위 size 개 + 고정 티커 + 보유 중인 티커로 self.config 를 교체"""
+        size = size or universe_size
+        with self.metrics.span("screener"):
+            candidates = self.screener.candidates(rsi_limit=universe_param["rsi_limit"], top=size)
+
+        config = dict(self.base_config)
+        for ticker in candidates.index:
+            config.setdefault(ticker, dict(universe_param))
+        for ticker, _ in self.buy_flag.items():
+            if ticker in self.config:
+                config.setdefault(ticker, self.config[ticker])  # 보유 중이면 매도 검사를 위해 유지
+
+        added = [ticker for ticker in config if ticker not in self.config]
+        removed = [ticker for ticker in self.config if ticker not in config]
+        self.config = config  # 다른 스레드는 교체 전 / 후 dict 중 하나를 통째로 봄
+        self.feed.update_codes(list(config))
+        print(f"스크리너 ...... {len(candidates)}개 후보, "
+              f"계산 {self.screener.scan_time * 1000:.1f}ms / 로딩 {self.screener.load_time:.1f}초")
+        if added or removed:
+            self.send(f"🔍 매수 대상 변경: 추가 {', '.join(added) or '-'} / 제외 {', '.join(removed) or '-'}", low_priority=True)
+
+    # --- 빠른 시작 / 재시작 ---
+
+    def restore_warm_state(self):
+        """저장된 시작 자산 / 수수료와, 오래되지 않았으면 지표 상태와 만들어 둔 봉을 되살림"""
+        state, age = self.warm_state.load() if self.warm_state is not None else (None, None)
+        if state is None:
+            return
+        self.start_cash = state["start_cash"]
+        self.current_cash = self.start_cash
+        self.total_fee_paid = state["total_fee_paid"]
+        if age <= warm_max_age:
+            self.indicators.update(state["indicators"])
+            if state["candles"] is not None and hasattr(self.candles, "restore"):
+                self.candles.restore(state["candles"])
+        print(f"♻️ 재시작 상태 복원 ...... {age / 60:.0f}분 전 저장, 지표 {len(self.indicators)}개")
+
+    def save_warm_state(self):
+        if self.warm_state is None:
+            return
+        try:
+            self.warm_state.save({
+                "start_cash": self.start_cash,
+                "total_fee_paid": self.total_fee_paid,
+                "indicators": dict(self.indicators),
+                "candles": self.candles.state() if hasattr(self.candles, "state") else None,
+            })
+        except Exception as e:
+            print(f"⚠️ 재시작 상태 저장 실패: {e}")
+
+    def ensure_start_cash(self):
+        if self.start_cash is None:
+            self.start_cash = self.get_krw_balance()
+            self.current_cash = self.start_cash
+        return self.start_cash
+
+    def prewarm(self):
+        """잔고 / 현재가와 티커별 4시간봉 + 지표를 동시에 받아 둠 (첫 매수 주기가 바로 판단할 수 있도록)"""
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.buy_workers) as pool:
+            futures = [pool.submit(self.portfolio.snapshot)]
+            if hasattr(self.candles, "state"):  # 봉을 저장해 두는 MarketData 일 때만 (거래소에서 바로 받으면 두 번 받게 됨)
+                futures += [pool.submit(self.prewarm_ticker, ticker) for ticker in list(self.config)]
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    print(f"⚠️ 시작 준비 중 오류: {e}")
+        self.ensure_start_cash()
+        print(f"시작 준비 완료 ...... {time.perf_counter() - started:.2f}초 ({len(self.config)}개 티커)")
+
+    def prewarm_ticker(self, ticker):
+        self.quote_bucket.acquire()
+        df = self.candles.get_ohlcv(ticker, interval="minute240", count=50)
+        if df is not None and not df.empty:
+            self.indicators.setdefault(ticker, IndicatorState()).update(df)
+
+    def start_prewarm(self):
+        """prewarm() 을 백그라운드에서 시작 (슬랙 연결 등과 동시에 진행), 매수 주기는 끝날 때까지 기다림"""
+        self.prewarm_thread = threading.Thread(target=self.prewarm, daemon=True)
+        self.prewarm_thread.start()
+        return self.prewarm_thread
 
-            # ⬇️ 총 자산 기준 목표 투자금 계산
-            total_asset = self.get_total_asset()
-            target_amount = total_asset * param["risk_ratio"]
+    def execute_buy(self):
+        if self.prewarm_thread is not None:
+            self.prewarm_thread.join()  # 같은 티커의 지표를 동시에 갱신하지 않도록
+        with self.metrics.cycle("buy_cycle"):
+            print("매수 조건 검사 중 ...... ", datetime.datetime.now())
+            if self.screener is not None:
+                try:
+                    self.refresh_universe()
+                except Exception as e:
+                    self.send(f"🚨 스크리너 오류, 기존 매수 대상 유지: {e}")
+            started = time.perf_counter()
+            request_count = self.portfolio.request_count
+
+            # ⬇️ 이번 주기의 총 자산과 KRW 잔고는 한 번만 조회해서 모든 티커가 같은 기준을 사용
+            if self.coordinator is not None:
+                total_asset = self.coordinator.total_asset()  # 모든 샤드의 티커 기준, KRW 는 코디네이터에서 예약
+                budget = self.coordinator
+            else:
+                total_asset = self.get_total_asset()
+                budget = KrwBudget(self.get_krw_balance())
+            self.ensure_start_cash()
+            print("총 자산 ...... ", total_asset)
 
+            # ⬇️ 티커별 조건 검사와 주문을 동시에 실행 (KRW 는 budget 에서 원자적으로 나눠 씀)
+            with ThreadPoolExecutor(max_workers=self.buy_workers) as pool:
+                futures = {pool.submit(self.buy_ticker, ticker, param, total_asset, budget): ticker
+                           for ticker, param in self.config.items()}
+                for future in as_completed(futures):
+                    try:
+                        future.result()
+                    except Exception as e:
+                        self.send(f"🚨 [{futures[future]}] 매수 중 오류 발생: {e}")
+
+            print("잔고/현재가 요청 수 ...... ", self.portfolio.request_count - request_count)
+            print(f"매수 주기 소요 시간 ...... {time.perf_counter() - started:.2f}초 ({len(self.config)}개 티커)")
+        self.save_warm_state()
+
+    def buy_ticker(self, ticker, param, total_asset, budget):
+        self.quote_bucket.acquire()
+        df = self.candles.get_ohlcv(ticker, interval="minute240", count=50)
+        if df is None or df.empty:
+            self.send(f"❌ [{ticker}] 4시간봉 데이터 없음")
+            return
+
+        state = self.indicators.setdefault(ticker, IndicatorState())
+        with self.metrics.span("indicators"):
+            rsi_val, ma20_val = state.update(df)
+
+        latest = df.iloc[-1]
+        close_val = latest['close']
+
+        # ⬇️ 총 자산 기준 목표 투자금 계산
+        target_amount = total_asset * param["risk_ratio"]
+
+        with self.buy_flag.lock(ticker):  # 같은 티커의 매도와 겹치지 않도록 주문 ~ 포지션 기록까지 잠금
             # ⬇️ 현재 투자된 금액 확인
-            current_flag = self.buy_flag.get(ticker, {})
+            current_flag = self.buy_flag.get(ticker, {})  # 잠금 안에서 읽으므로 주문이 끝날 때까지 바뀌지 않음
             current_invest = current_flag.get("amount_krw", 0)
             remain_amount = target_amount - current_invest
 
-            print("총 자산 ...... ", total_asset)
-            print("목표 비중 ...... ", target_amount)
-            print("현재 투자된 금액 ...... ", current_invest)
-            print("남은 투자 금액 ...... ", remain_amount)
+            print(f"[{ticker}] 목표 비중 {target_amount:,.0f} / 현재 투자된 금액 {current_invest:,.0f} / 남은 투자 금액 {remain_amount:,.0f}")
 
             # ✅ 조건 만족 여부 판단 (처음 매수든 추가 매수든)
             rsi_check = rsi_val < param["rsi_limit"]
@@ -172,77 +389,63 @@ class CoinBot:
                 if not price_check:
                     reasons.append(f"종가 {int(close_val):,} <= MA20 {int(ma20_val):,}")
                 reason_text = " & ".join(reasons)
-                self.send(f"[{ticker}] 매수 조건 미충족: ({reason_text})")
-                continue
+                self.send(f"[{ticker}] 매수 조건 미충족: ({reason_text})", low_priority=True)
+                return
 
             # ✅ 목표 금액을 거의 다 썼다면 추가 매수 금지
             if current_invest >= target_amount * 0.98:
-                self.send(f"[{ticker}] 이미 모두 매수된 상태입니다 (총 투자금: {current_invest:,.0f}원)")
-                continue
+                self.send(f"[{ticker}] 이미 모두 매수된 상태입니다 (총 투자금: {current_invest:,.0f}원)", low_priority=True)
+                return
 
-            # ✅ 실제 KRW 잔고와 비교하여 사용할 수 있는 금액 결정
-            krw_balance = self.get_krw_balance()
-            buy_amount = min(remain_amount, krw_balance / 1.001)  # 수수료 0.05%를 감안한 값, 여유롭게 0.1%로 설정
+            # ✅ 남은 KRW 잔고에서 사용할 금액을 예약 (다른 티커와 동시에 주문해도 잔고를 넘지 않음)
+            buy_amount = budget.reserve(remain_amount)
 
-            print("실제 투자 금액 ...... ", buy_amount)
+            print(f"[{ticker}] 실제 투자 금액 ...... ", buy_amount)
 
             if buy_amount < 5000:
-                self.send(f"[{ticker}] 잔고 부족으로 매수 불가 (가능 금액: {buy_amount:,.0f}원)")
-                continue
+                self.send(f"[{ticker}] 잔고 부족으로 매수 불가 (가능 금액: {buy_amount:,.0f}원)", low_priority=True)
+                return
 
             # ✅ 매수 실행
             success = self.buy_coin(ticker, buy_amount)
-            if success:
-                price = pyupbit.get_current_price(ticker)
-                if price is None:
-                    self.send(f"⚠️ [{ticker}] 현재가 조회 실패. 시가 기준 사용")
-                    price = latest['open']
-
-                now_str = datetime.datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
+            if not success:
+                budget.release(buy_amount)
+                return
+            budget.settle(buy_amount)
 
-                if ticker in self.buy_flag:
-                    prev_amount = current_invest
-                    prev_price = self.buy_flag[ticker]["buy_price"]
-
-                    new_amount = buy_amount
-                    new_price = price
-
-                    # ⬇️ 평단가 갱신
-                    avg_price = ((prev_price * prev_amount) + (new_price * new_amount)) / (prev_amount + new_amount)
+            try:
+                price = self.get_current_price(ticker)
+            except Exception:
+                price = None  # 이미 체결된 주문이므로 조회가 실패해도 포지션은 반드시 기록
+            if price is None:
+                self.send(f"⚠️ [{ticker}] 현재가 조회 실패. 시가 기준 사용")
+                price = latest['open']
 
-                    self.buy_flag[ticker]["amount_krw"] = prev_amount + new_amount
-                    self.buy_flag[ticker]["buy_price"] = avg_price
-                    self.buy_flag[ticker]["buy_time"] = now_str
-                else:
-                    self.buy_flag[ticker] = {
-                        "buy_price": price,
-                        "buy_time": now_str,
-                        "amount_krw": buy_amount
-                    }
+            now_str = self.now().strftime("%Y-%m-%dT%H:%M:%S")
 
-                save_buy_log(self.buy_flag)
+            # ⬇️ 처음 매수면 새 포지션, 이미 있으면 평단가 갱신 (추가 매수)
+            self.buy_flag.add(ticker, buy_amount, price, now_str)
+            self.sync_exit_levels([ticker])
 
+    def add_fee(self, fee):
+        with self.fee_lock:
+            self.total_fee_paid += fee
 
     def get_total_asset(self):
-        krw = self.get_krw_balance()
-        total = krw
-
-        for ticker in self.config.keys():
-            try:
-                amount = self.get_balance(ticker)
-                price = pyupbit.get_current_price(ticker)
+        try:
+            snapshot = self.portfolio.snapshot()
+        except Exception as e:
+            self.send(f"🚨 자산 계산 중 오류: {e}")
+            return 0
 
-                if amount is not None and price is not None:
-                    total += amount * price
-                else:
-                    self.send(f"⚠️ [{ticker}] 잔고 또는 현재가 조회 실패. 총 자산 계산에서 제외됨")
-            except Exception as e:
-                self.send(f"🚨 [{ticker}] 자산 계산 중 오류: {e}")
+        total, missing = snapshot.total_asset(self.config.keys())
+        for ticker in missing:
+            self.send(f"⚠️ [{ticker}] 잔고 또는 현재가 조회 실패. 총 자산 계산에서 제외됨")
 
         return total
 
     def check_sell_condition(self, ticker, buy_price, take_profit_ratio, stop_loss_ratio):
-        df_1m = pyupbit.get_ohlcv(ticker, interval="minute1", count=1)
+        df_1m = self.candles.get_ohlcv(ticker, interval="minute1", count=1)
         if df_1m is None or df_1m.empty:
             return False, None
 
@@ -259,57 +462,85 @@ class CoinBot:
         else:
             return False, None
 
-    def execute_sell(self):
-        print("매도 조건 검사 중 ...... ", datetime.datetime.now())
-        print("총 자산 ...... ", self.get_total_asset())
+    def execute_sell(self, tickers=None):
+        """보유 중인 코인의 익절/손절 검사 (tickers 를 주면 그 티커만)"""
+        with self.metrics.cycle("sell_cycle"):
+            print("매도 조건 검사 중 ...... ", datetime.datetime.now())
+            print("총 자산 ...... ", self.get_total_asset())
 
-        for ticker, buy_info in list(self.buy_flag.items()):
+            for ticker, buy_info in self.buy_flag.items():
+                if tickers is not None and ticker not in tickers:
+                    continue
+                buy_price = buy_info['buy_price']
+                param = self.config.get(ticker)
+                if param is None:
+                    continue
+
+                should_sell, price = self.check_sell_condition(
+                    ticker, buy_price,
+                    param["take_profit_ratio"],
+                    param["stop_loss_ratio"]
+                )
+
+                if should_sell:
+                    self.sell_position(ticker, price)
+
+                else:
+                    # 매도 조건 미충족 → 현재 수익률 출력
+                    current_price = self.portfolio.snapshot().price(ticker)
+                    if current_price is None:
+                        current_price = buy_price  # fallback
+
+                    profit_percent = ((current_price - buy_price) / buy_price) * 100
+                    print(f"........ 매도 안 함 : {ticker}의 수익률 = {profit_percent:.2f}%")
+
+    def sell_position(self, ticker, price, received_at=None):
+        """보유 중인 ticker 를 전량 매도하고 수익을 보고 (price: 도달한 익절가 또는 손절가)
+
+        received_at: 체결 스트림에서 온 매도 신호면 체결 수신 시각 (exit_engine.clock 기준), 주문까지 걸린 시간을 기록
+        """
+        with self.buy_flag.lock(ticker):  # 같은 티커의 추가 매수 / 중복 매도 신호와 겹치지 않도록 잠금
+            buy_info = self.buy_flag.get(ticker)
+            if buy_info is None:
+                return  # 이미 매도됨
             buy_price = buy_info['buy_price']
             amount_krw = buy_info.get("amount_krw", 0)
-            param = self.config.get(ticker)
-            if param is None:
-                continue
-
-            should_sell, price = self.check_sell_condition(
-                ticker, buy_price,
-                param["take_profit_ratio"],
-                param["stop_loss_ratio"]
-            )
-
-            if should_sell:
-                coin_amount = self.get_balance(ticker)
-                if coin_amount == 0:
-                    self.send(f"[{ticker}] 잔고 없음, 매수 상태 초기화")
-                    self.buy_flag.pop(ticker)
-                    save_buy_log(self.buy_flag)
-                    continue
 
-                success = self.sell_coin(ticker, coin_amount)
-                if success:
-                    price_df = pyupbit.get_current_price([ticker])
+            coin_amount = self.get_balance(ticker)
+            if coin_amount == 0:
+                self.send(f"[{ticker}] 잔고 없음, 매수 상태 초기화")
+                self.buy_flag.remove(ticker, kind="reset")
+                self.sync_exit_levels([ticker])
+                return
 
-                    if isinstance(price_df, dict) and ticker in price_df:
-                        current_price = price_df[ticker]
-                    elif isinstance(price_df, float):
-                        current_price = price_df
-                    else:
-                        self.send(f"⚠️ [{ticker}] 현재가 조회 실패 → 매도 체결가 정확도 낮음")
-                        current_price = price  # fallback
+            success = self.sell_coin(ticker, coin_amount)
+            if received_at is not None:
+                self.tick_to_order.observe(self.exit_engine.clock() - received_at)
+            if success:
+                price_df = self.get_current_price([ticker])
 
-                    sell_value = current_price * coin_amount
-                    fee = sell_value * 0.0005
-                    self.total_fee_paid += fee
+                if isinstance(price_df, dict) and ticker in price_df:
+                    current_price = price_df[ticker]
+                elif isinstance(price_df, float):
+                    current_price = price_df
+                else:
+                    self.send(f"⚠️ [{ticker}] 현재가 조회 실패 → 매도 체결가 정확도 낮음")
+                    current_price = price  # fallback
 
-                    # 개별 수익 계산 (amount_krw 기준)
-                    profit_amount = sell_value - amount_krw
-                    net_profit = profit_amount - fee
-                    profit_percent = (profit_amount / amount_krw) * 100 if amount_krw > 0 else 0
+                sell_value = current_price * coin_amount
+                fee = sell_value * 0.0005
+                self.add_fee(fee)
 
-                    result_type = "익절" if current_price >= buy_price else "손절"
-                    target_label = "목표가" if result_type == "익절" else "손절가"
-                    emoji = "📈" if result_type == "익절" else "📉"
+                # 개별 수익 계산 (amount_krw 기준)
+                profit_amount = sell_value - amount_krw
+                net_profit = profit_amount - fee
+                profit_percent = (profit_amount / amount_krw) * 100 if amount_krw > 0 else 0
 
-                    profit_msg = f"""
+                result_type = "익절" if current_price >= buy_price else "손절"
+                target_label = "목표가" if result_type == "익절" else "손절가"
+                emoji = "📈" if result_type == "익절" else "📉"
+
+                profit_msg = f"""
     {emoji} [{ticker}] {result_type} 매도
     매도가: {current_price:,.0f}원
     {target_label}: {price:,.0f}원
@@ -321,62 +552,96 @@ class CoinBot:
     수수료: {fee:,.0f} 원
     순수익: {net_profit:,.0f} 원
     """
-                    self.send(profit_msg)
-                    self.buy_flag.pop(ticker)
-                    save_buy_log(self.buy_flag)
-
+                self.send(profit_msg)
+                self.buy_flag.remove(ticker)
+                # 수수료는 매수 (buy_coin 과 같은 계산) + 매도
+                self.ledger.record(ticker, buy_info["buy_time"], self.now(), buy_price, current_price,
+                                   amount_krw, sell_value, amount_krw * 0.0005 + fee)
+                with self.exit_lock:
+                    self.exit_failures.pop(ticker, None)
+                self.sync_exit_levels([ticker])
             else:
-                # 매도 조건 미충족 → 현재 수익률 출력
-                price_df = pyupbit.get_current_price([ticker])
-                if isinstance(price_df, dict) and ticker in price_df:
-                    current_price = price_df[ticker]
-                elif isinstance(price_df, float):
-                    current_price = price_df
+                self.retry_exit_levels(ticker)
+
+    def retry_exit_levels(self, ticker):
+        """매도 실패 후 익절/손절가를 바로 다시 걸지 않고 연속 실패 횟수에 따라 늘어나는 시간 뒤에 다시 등록
+
+        거래소가 주문을 계속 거절할 때 체결마다 매도 주문이 나가지 않도록 함 (그 사이에는 주기적인 매도 검사가 대신함)
+        """
+        with self.exit_lock:
+            failures = self.exit_failures[ticker] = self.exit_failures.get(ticker, 0) + 1
+        delay = min(exit_retry_delay * 2 ** (failures - 1), exit_retry_max)
+        self.send(f"⚠️ [{ticker}] 매도 {failures}회 연속 실패, {delay:.0f}초 뒤 실시간 익절/손절 감시 재개")
+        self.scheduler.at(self.scheduler.clock.now() + delay, lambda: self.sync_exit_levels([ticker]),
+                          key=("exit_retry", ticker))
+
+    def sync_exit_levels(self, tickers=None):
+        """buy_flag 의 포지션 기준으로 실시간 매도 엔진의 익절/손절가를 갱신 (tickers 를 주면 그 티커만)
+
+        티커 잠금 안에서 포지션을 읽고 반영하므로 다른 스레드의 매수 / 매도 결과를 덮어쓰지 않음
+        """
+        if tickers is None:
+            tickers = set(self.exit_engine.levels) | {ticker for ticker, _ in self.buy_flag.items()}
+
+        for ticker in tickers:
+            with self.buy_flag.lock(ticker):
+                buy_info = self.buy_flag.get(ticker)
+                param = self.config.get(ticker)
+                if buy_info is None or param is None:
+                    self.exit_engine.remove(ticker)
                 else:
-                    current_price = buy_price  # fallback
-
-                profit_percent = ((current_price - buy_price) / buy_price) * 100
-                print(f"........ 매도 안 함 : {ticker}의 수익률 = {profit_percent:.2f}%")
-
-    def wait_until_next_4h_candle(self):
-        now = datetime.datetime.now()
-        next_hour = (now.hour // 4 + 1) * 4
-        if next_hour == 24:
-            next_time = datetime.datetime(now.year, now.month, now.day) + datetime.timedelta(days=1)
-        else:
-            next_time = datetime.datetime(now.year, now.month, now.day, next_hour)
-        next_time += datetime.timedelta(minutes=1)  # 1분 지연
-
-        while self.running and datetime.datetime.now() < next_time:
-            time.sleep(5)  # 5초씩 나눠서 자주 체크
-
-    def sell_loop(self):
-        while self.running:
-            try:
-                # 매도 대상이 있을 때만 실행
-                if self.has_coin_to_sell():
-                    self.execute_sell()
-                    time.sleep(300)
-                else:
-                    # 보유 중인 코인이 없으면 10분 정도 기다렸다가 다시 확인
-                    print(f"매도 할 코인이 없음")
-                    time.sleep(600)
-            except Exception as e:
-                self.send(f"🚨 매도 중 오류 발생: {e}")
-                time.sleep(60)
+                    self.exit_engine.set_levels(ticker, buy_info['buy_price'], param["take_profit_ratio"], param["stop_loss_ratio"])
+
+    def on_exit_signal(self, ticker, price, trade_price, received_at=None):
+        """체결 스트림 스레드에서 호출되므로 매도는 별도 스레드에서 실행"""
+        with self.exit_lock:
+            if ticker in self.selling:
+                return  # 이 티커의 매도가 아직 진행 중
+            self.selling.add(ticker)
+        print(f"⚡ [{ticker}] 체결가 {trade_price:,.2f} → 매도 기준가 {price:,.2f} 도달")
+        threading.Thread(target=self.sell_on_signal, args=(ticker, price, received_at), daemon=True).start()
+
+    def sell_on_signal(self, ticker, price, received_at=None):
+        try:
+            with self.metrics.cycle("exit_cycle"):
+                self.sell_position(ticker, price, received_at)
+        finally:
+            with self.exit_lock:
+                self.selling.discard(ticker)
+
+    def check_sell(self, tickers=None):
+        """예약된 매도 검사, 보유 중인 코인이 없으면 건너뜀"""
+        if not self.has_coin_to_sell():
+            print(f"매도 할 코인이 없음")
+            return
+        self.execute_sell(tickers)
+
+    def schedule_trading(self):
+        """매수 (4시간봉 마감 1분 뒤) / 매도 검사 작업 예약, 모두 "trading" 그룹이라 한 번에 취소 가능
+
+        업비트 봉은 UTC 0시 기준이므로 4시간봉 마감은 한국 시각 01, 05, 09, 13, 17, 21시
+        """
+        self.scheduler.every(buy_interval, self.execute_buy, offset=buy_delay, key="buy", group="trading")
+
+        own = [ticker for ticker, param in self.config.items() if param.get("exit_check_interval")]
+        for ticker in own:
+            self.scheduler.every(self.config[ticker]["exit_check_interval"], lambda t=ticker: self.check_sell([t]),
+                                 key=("sell", ticker), group="trading")
+        # 스크리너가 매수 대상을 바꿔도 따라가도록 검사 시점의 config 로 대상을 정함
+        self.scheduler.every(sell_check_interval, lambda: self.check_sell(self.shared_sell_tickers()),
+                             key="sell", group="trading")
+
+    def shared_sell_tickers(self):
+        """매도 검사 주기를 따로 정하지 않은 티커"""
+        return [ticker for ticker, param in self.config.items() if not param.get("exit_check_interval")]
 
     def has_coin_to_sell(self):
         """보유 중인 매도할 코인이 있는지 확인"""
-        balances = self.upbit.get_balances()
-        for b in balances:
-            if b['currency'] != 'KRW':
-                volume = float(b['balance'])
-                avg_buy_price = float(b.get('avg_buy_price', 0))
-                if volume > 0 and avg_buy_price > 0:
-                    return True
-        return False
-
-    def process_slack_events(self, client: SocketModeClient, req: SocketModeRequest):
+        return self.portfolio.snapshot().has_coin()
+
+    def process_slack_events(self, client, req):
+        from slack_sdk.socket_mode.response import SocketModeResponse
+
         if req.type == "events_api":
             event = req.payload.get("event", {})
 
@@ -386,41 +651,65 @@ class CoinBot:
 
             # 메시지 이벤트 처리
             if event.get("type") == "message" and "text" in event:
-                text = event["text"].strip()
-                channel = event["channel"]
+                self.handle_command(event["text"].strip(), event["channel"])
 
-                if text == "시작" and not self.running:
-                    self.running = True
-                    self.send("✅ 매매 시작합니다!", channel)
+    def handle_command(self, text, channel=None):
+        """슬랙 명령 처리 (샤드 모드에서는 코디네이터가 받은 명령을 각 샤드에서 호출)"""
+        if text == "시작" and not self.running:
+            self.start_trading(channel)
 
-                    # 매도 루프 별도 스레드 시작
-                    sell_thread = threading.Thread(target=self.sell_loop, daemon=True)
-                    self.sell_thread = sell_thread  # ⬅️ 추적용으로 저장
-                    sell_thread.start()
+        elif text.startswith("리포트"):
+            # "리포트" = 전체 기간, "리포트 7" = 최근 7일
+            args = text.split()[1:]
+            days = int(args[0]) if args and args[0].isdigit() else None
+            self.send(self.ledger.report(start_cash=self.ensure_start_cash(), days=days, now=self.now()), channel)
 
-                    # 매수 루프는 메인 루프에서 실행 (아래 참고)
-                elif text == "종료" and self.running:
-                    self.running = False
-                    self.send("🛑 매매를 중단합니다.", channel)
+        elif text == "종료" and self.running:
+            self.stop_trading(channel)
 
-    def run(self):
-        # Socket Mode 연결 시작
-        self.socket_mode_client.connect()
-        self.send("🤖 슬랙 Socket Mode 연결 성공. 명령을 기다립니다...")
+    def start_trading(self, channel=None):
+        self.running = True
+        self.send("✅ 매매 시작합니다!", channel)
+        self.schedule_trading()
+        self.feed.start(list(self.config))
 
-        while True:
-            try:
-                # 매수 루프
-                if self.running:
-                    self.wait_until_next_4h_candle()
-                    if self.running:  # 다시 한 번 확인
-                        self.execute_buy()
-                        # time.sleep(60)
-                else:
-                    time.sleep(5)  # 매매 중단 상태에서는 짧게 쉬기
-            except Exception as e:
-                self.send(f"🚨 매수 중 오류 발생: {e}")
+    def stop_trading(self, channel=None):
+        self.running = False
+        self.scheduler.cancel(group="trading")  # 이미 실행 중인 검사는 끝까지 진행
+        self.feed.stop()
+        self.save_warm_state()
+        self.send("🛑 매매를 중단합니다.", channel)
+
+    def run(self):
+        MetricsServer(self.metrics, port=metrics_port).start()
+        print(f"지표 엔드포인트 ...... http://127.0.0.1:{metrics_port}/metrics")
+
+        # 잔고 / 봉 조회는 슬랙 연결과 동시에 진행
+        self.start_prewarm()
+        if self.socket_mode_client is None:
+            # 슬랙 앱 토큰 없이 (모의 투자) 실행하면 명령을 기다리지 않고 바로 매매 시작
+            self.start_trading()
+        else:
+            # Socket Mode 연결 시작
+            self.socket_mode_client.connect()
+            self.send("🤖 슬랙 Socket Mode 연결 성공. 명령을 기다립니다...")
+
+        # 예약된 작업이 없으면 잠들어 있다가 "시작" 명령으로 예약되면 깨어남
+        self.scheduler.run_forever()
+
+def paper_bot(config=None, **kwargs):
+    """저장된 1분봉을 paper_config 배속으로 재생하는 모의 거래소에 연결된 CoinBot (업비트 키 / 슬랙 불필요)"""
+    config = dict(config if config is not None else ticker_config)
+    exchange = PaperExchange.from_store(list(config), **{**paper_config, **kwargs})
+    bot = CoinBot(None, None, slack_channel, exchange=exchange, web_client=NullWebClient(), config=config,
+                  clock=exchange.clock, buy_log_path="paper_buy_log.json", ledger_path="paper_trades")
+    bot.feed = PaperFeed(exchange, bot.exit_engine)
+    return bot
 
 if __name__ == "__main__":
-    bot = CoinBot(slack_bot_token, slack_app_token, slack_channel)
+    if trading_mode == "paper":
+        bot = paper_bot()
+    else:
+        slack_bot_token, slack_app_token = load_key_info()[2:]
+        bot = CoinBot(slack_bot_token, slack_app_token, slack_channel)
     bot.run()
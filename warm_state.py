@@ -0,0 +1,43 @@
+import os
+import pickle
+import time
+
+from journal import fsync_dir
+
+warm_state_version = 2  # 저장하는 봇 상태 구조가 바뀌면 올림 (이전 파일은 무시하고 새로 받음)
+
+class WarmState:
+    """재시작 직후 바로 매매할 수 있도록 봇 상태 (지표, 만들어 둔 봉, 시작 자산 등) 를 저장하는 파일
+
+    - 봇이 직접 쓰고 읽는 로컬 파일이므로 pickle 로 저장하고, 임시 파일에 쓴 뒤 교체하여 반쯤 쓴 파일이 남지 않음
+    - 버전이 다르거나 읽을 수 없으면 무시, 얼마나 오래된 상태인지 (age 초) 는 쓰는 쪽이 판단
+    """
+    def __init__(self, path="warm_state.pkl", clock=time.time):
+        self.path = path
+        self.clock = clock
+
+    def save(self, state):
+        data = pickle.dumps({"version": warm_state_version, "saved_at": self.clock(), "state": state},
+                            protocol=pickle.HIGHEST_PROTOCOL)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        fsync_dir(self.path)
+        return len(data)
+
+    def load(self):
+        """(저장된 상태 dict, 저장 후 지난 초), 쓸 수 없으면 (None, None)"""
+        try:
+            with open(self.path, "rb") as f:
+                saved = pickle.load(f)
+        except FileNotFoundError:
+            return None, None
+        except Exception as e:
+            print(f"⚠️ 재시작 상태 파일을 읽을 수 없어 무시합니다: {e}")
+            return None, None
+        if not isinstance(saved, dict) or saved.get("version") != warm_state_version:
+            return None, None
+        return saved["state"], self.clock() - saved["saved_at"]